@@ -0,0 +1,50 @@
+"""
+Deterministic offline embedder for the benchmarks.
+
+Hashes word tokens into a fixed number of dimensions (a normalized bag of
+words), so runs need no API key or network and produce the same vectors every
+time. An optional per-request delay stands in for the embedding API's latency.
+"""
+
+import re
+import math
+import time
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from agno.embedder.base import Embedder
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+@dataclass
+class HashingEmbedder(Embedder):
+    id: str = "offline-hashing"
+    dimensions: int = 256
+    request_latency: float = 0.0
+
+    requests: int = 0
+    texts: int = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        self.texts += len(texts)
+        if self.request_latency:
+            time.sleep(self.request_latency)
+        return [self._embed(text) for text in texts]
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embeddings([text])[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
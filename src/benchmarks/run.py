@@ -0,0 +1,218 @@
+"""
+Vault operations benchmark.
+
+Generates a synthetic vault, then times every note_utils / tag_utils tool and
+the VaultEmbedder cold, no-op and incremental syncs plus search, using the
+offline embedder. Results are written as JSON so runs can be compared across
+commits.
+
+Run from src/:
+    python -m benchmarks.run --notes 2000 --out bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+from typing import Callable, List
+
+from benchmarks.synthetic_vault import generate_vault
+
+
+class Timings:
+    def __init__(self):
+        self.results = []
+
+    def measure(self, name: str, fn: Callable, repeat: int = 5, **extra):
+        """Times `fn` `repeat` times; the first run is reported separately as the cold run."""
+        samples: List[float] = []
+        error = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                break
+            samples.append((time.perf_counter() - started) * 1000)
+
+        result = {"name": name, "runs": len(samples), **extra}
+        if samples:
+            warm = samples[1:] or samples
+            result.update({
+                "first_ms": round(samples[0], 3),
+                "min_ms": round(min(warm), 3),
+                "median_ms": round(statistics.median(warm), 3),
+                "p95_ms": round(sorted(warm)[max(0, int(len(warm) * 0.95) - 1)], 3),
+                "max_ms": round(max(warm), 3),
+            })
+        if error:
+            result["error"] = error
+        self.results.append(result)
+        print(f"  {name}: " + (f"median {result['median_ms']} ms (first {result['first_ms']} ms)" if samples else error),
+              file=sys.stderr)
+        return result
+
+
+def bench_tools(timings: Timings, vault_path: str, repeat: int):
+    from tools.tools import note_utils, tag_utils
+
+    journal = sorted(os.listdir(note_utils.daily_path))[-1]
+    some_note = os.path.join("Daily", "Journal", journal)
+
+    timings.measure("note_utils.search_note_file[word]", lambda: note_utils.search_note_file("habit"), repeat)
+    timings.measure("note_utils.search_note_file[phrase]", lambda: note_utils.search_note_file("deep work"), repeat)
+    timings.measure("note_utils.search_note_file[hebrew]", lambda: note_utils.search_note_file("תובנה"), repeat)
+    timings.measure("note_utils.search_note_file[miss]", lambda: note_utils.search_note_file("zzzz-nothing"), repeat)
+    timings.measure("note_utils.search_by_tag", lambda: note_utils.search_by_tag("thought"), repeat)
+    timings.measure("tag_utils.get_vault_tags", tag_utils.get_vault_tags, repeat)
+    timings.measure("tag_utils.get_tag_counts", tag_utils.get_tag_counts, repeat)
+    from tools.tag_suggester import get_tag_suggester
+    suggester = get_tag_suggester(vault_path)
+    timings.measure("tag_suggester.suggest", lambda: suggester.suggest("Finished a book about deep work habits\nתובנה חדשה"), repeat)
+    timings.measure("note_utils.get_recently_modified_notes", lambda: note_utils.get_recently_modified_notes(7), repeat)
+    timings.measure("note_utils.list_directory", lambda: note_utils.list_directory("Daily/Journal"), repeat)
+    timings.measure("note_utils.read_note", lambda: note_utils.read_note(some_note), repeat)
+    timings.measure("note_utils.get_daily_note", note_utils.get_daily_note, repeat)
+    timings.measure("note_utils.append_to_note",
+                    lambda: note_utils.append_to_note(some_note, "benchmark line #thought"), repeat)
+
+    counter = iter(range(10 ** 9))
+    timings.measure("note_utils.create_note",
+                    lambda: note_utils.create_note(f"Notes/bench-{next(counter)}.md", "created by benchmark #idea"), repeat)
+
+
+def bench_embedder(timings: Timings, vault_path: str, repeat: int, latency: float, changed: int):
+    from benchmarks.offline_embedder import HashingEmbedder
+    from tools.vault_embedder import VaultEmbedder
+
+    embedder = HashingEmbedder(request_latency=latency)
+    holder = {}
+
+    def cold():
+        holder["ve"] = VaultEmbedder(vault_path, embedder=embedder)
+
+    timings.measure("VaultEmbedder.cold_sync", cold, repeat=1)
+    ve = holder.get("ve")
+    if ve is None:
+        return
+    timings.measure("VaultEmbedder.noop_sync", ve.sync, repeat)
+
+    notes = sorted(ve.index.paths())[:changed]
+
+    def incremental():
+        for rel_path in notes:
+            with open(os.path.join(vault_path, rel_path), "a", encoding="utf-8") as f:
+                f.write(f"\nincremental edit {time.time()}\n")
+        ve.sync()
+
+    timings.measure("VaultEmbedder.incremental_sync", incremental, repeat, changed_notes=len(notes))
+    timings.measure("VaultEmbedder.query", lambda: ve.query("deep work habit", top_k=5), repeat)
+    timings.results.append({"name": "vector_table_before_maintenance", **ve.table_stats()})
+    timings.measure("VaultEmbedder.maintain", ve.maintain, repeat=1)
+    timings.results.append({"name": "vector_table_after_maintenance", **ve.table_stats()})
+    timings.results.append({"name": "offline_embedder", "requests": embedder.requests, "texts": embedder.texts})
+    timings.results.append({"name": "query_cache", **ve.query_cache.stats()})
+    bench_recall(timings, vault_path, ve, embedder, repeat)
+
+
+RECALL_QUERIES = ["deep work habit", "morning energy", "sleep health family", "writing feedback",
+                  "עבודה עמוקה", "הרגל שינה", "question answer clarity", "reading book insight"]
+
+
+def bench_recall(timings: Timings, vault_path: str, lance_ve, embedder, repeat: int, top_k: int = 10):
+    """
+    Builds the NumPy backend from the embedding cache and reports its recall@k: the exact
+    search against the LanceDB table's exact vector search (differences are ties:
+    float16 rounding and the offline embedder's many equal scores),
+    and the keyword pre-filter against the exact search.
+    """
+    from tools.vault_embedder import VaultEmbedder
+
+    numpy_ve = VaultEmbedder(vault_path, embedder=embedder, backend="numpy")
+    store = numpy_ve.vector_db
+
+    def keys(docs):
+        return {(doc.name, doc.content) for doc in docs}
+
+    def recall(expected_fn, found_fn, label):
+        recalls = []
+        for query in RECALL_QUERIES:
+            expected = keys(expected_fn(query))
+            recalls.append(len(expected & keys(found_fn(query))) / max(1, len(expected)))
+        result = {"name": f"numpy_recall_at_{top_k}[{label}]",
+                  "mean": round(sum(recalls) / len(recalls), 3), "min": round(min(recalls), 3)}
+        timings.results.append(result)
+        print(f"  numpy recall@{top_k} [{label}]: mean {result['mean']}, min {result['min']}", file=sys.stderr)
+
+    def exact(query):
+        return store._search(query, top_k, None, prefilter=False)
+
+    def prefiltered(query):
+        return store._search(query, top_k, None, prefilter=True)
+
+    timings.measure("NumpyVectorDb.search[exact]", lambda: [exact(q) for q in RECALL_QUERIES], repeat,
+                    queries=len(RECALL_QUERIES))
+    timings.measure("NumpyVectorDb.search[prefilter]", lambda: [prefiltered(q) for q in RECALL_QUERIES], repeat,
+                    queries=len(RECALL_QUERIES))
+    recall(lambda q: lance_ve.vector_db.vector_search(q, top_k), exact, "exact_vs_lancedb")
+    recall(exact, prefiltered, "prefilter_vs_exact")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vault tools and the vault embedder")
+    parser.add_argument("--notes", type=int, default=1000)
+    parser.add_argument("--journal-days", type=int, default=365)
+    parser.add_argument("--mean-chars", type=int, default=1500)
+    parser.add_argument("--hebrew-ratio", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--changed", type=int, default=10, help="Notes edited per incremental sync")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per embedding request")
+    parser.add_argument("--skip-embedder", action="store_true")
+    parser.add_argument("--vault", help="Generate into this directory and keep it (default: temporary)")
+    parser.add_argument("--out", help="Write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    vault_path = args.vault or tempfile.mkdtemp(prefix="bench-vault-")
+    try:
+        started = time.perf_counter()
+        summary = generate_vault(vault_path, notes=args.notes, journal_days=args.journal_days, seed=args.seed,
+                                 hebrew_ratio=args.hebrew_ratio, mean_chars=args.mean_chars)
+        os.makedirs(os.path.join(vault_path, ".assistant"), exist_ok=True)
+        print(f"Generated vault in {time.perf_counter() - started:.1f}s: {summary}", file=sys.stderr)
+
+        # tools.tools reads VAULT_PATH at import time.
+        os.environ["VAULT_PATH"] = vault_path
+        timings = Timings()
+        bench_tools(timings, vault_path, args.repeat)
+        if not args.skip_embedder:
+            bench_embedder(timings, vault_path, args.repeat, args.latency, args.changed)
+
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "vault": summary,
+                "args": vars(args),
+            },
+            "results": timings.results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(output)
+        else:
+            print(output)
+    finally:
+        if not args.vault:
+            shutil.rmtree(vault_path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Synthetic Obsidian vault generator for the benchmarks.
+
+Builds a reproducible vault (same seed -> same files) shaped like the real
+one: Atlas MOCs, Efforts, Encounters and daily journal notes, with a mix of
+Hebrew and English text, tags, wikilinks and a configurable note size
+distribution.
+"""
+
+import os
+import time
+import random
+import argparse
+import datetime
+from typing import List
+
+ENGLISH_WORDS = (
+    "focus habit goal insight idea project review energy morning evening deep work meeting "
+    "reading book article note link system process friction momentum clarity question answer "
+    "pattern emotion tired motivated plan schedule priority effort progress reflection learning "
+    "practice writing thinking research design build test ship feedback family health sleep"
+).split()
+
+HEBREW_WORDS = (
+    "היום הרגשתי עייף מאוד אבל הצלחתי להתרכז בעבודה עמוקה רעיון חדש מטרה הרגל שאלה תשובה "
+    "משפחה בריאות שינה קריאה ספר כתיבה חשיבה למידה תוכנית פרויקט סקירה התקדמות מחשבה תובנה "
+    "בוקר ערב פגישה זמן אנרגיה מוטיבציה קשה קל טוב רע חשוב"
+).split()
+
+TAGS = [
+    "#daily", "#thought", "#idea", "#insight", "#book", "#goal", "#habit", "#question",
+    "#emotion/tough_day", "#emotion/good_day", "#work", "#health", "#learning", "#project",
+]
+
+FOLDERS = ["Atlas", "Efforts/On", "Efforts/Ongoing", "Efforts/Simmering", "Encounters", "Notes"]
+
+
+def _sentence(rng: random.Random, hebrew_ratio: float) -> str:
+    words = HEBREW_WORDS if rng.random() < hebrew_ratio else ENGLISH_WORDS
+    sentence = " ".join(rng.choice(words) for _ in range(rng.randint(6, 16)))
+    return sentence[0].upper() + sentence[1:] + "."
+
+
+def _body(rng: random.Random, target_chars: int, hebrew_ratio: float, titles: List[str],
+          tag_prob: float, link_prob: float) -> str:
+    lines = []
+    size = 0
+    section = 0
+    while size < target_chars:
+        if size == 0 or rng.random() < 0.15:
+            section += 1
+            line = f"## {rng.choice(ENGLISH_WORDS).title()} {section}"
+        else:
+            line = _sentence(rng, hebrew_ratio)
+            if rng.random() < tag_prob:
+                line += " " + rng.choice(TAGS)
+            if titles and rng.random() < link_prob:
+                line += f" [[{rng.choice(titles)}]]"
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def _note_size(rng: random.Random, distribution: str, mean_chars: int) -> int:
+    if distribution == "fixed":
+        return mean_chars
+    if distribution == "uniform":
+        return rng.randint(mean_chars // 4, mean_chars * 7 // 4)
+    # lognormal: most notes short, a long tail of big ones (like real vaults)
+    return max(80, int(rng.lognormvariate(0, 0.9) * mean_chars / 1.5))
+
+
+def generate_vault(path: str, notes: int = 1000, journal_days: int = 365, seed: int = 0,
+                   hebrew_ratio: float = 0.3, size_distribution: str = "lognormal", mean_chars: int = 1500,
+                   tag_prob: float = 0.15, link_prob: float = 0.1) -> dict:
+    """
+    Writes a synthetic vault to `path` and returns a summary of what was generated.
+
+    :param notes: Number of regular (non-journal) notes.
+    :param journal_days: Number of daily journal notes, ending today.
+    :param hebrew_ratio: Fraction of sentences written in Hebrew.
+    :param size_distribution: "lognormal", "uniform" or "fixed".
+    :param mean_chars: Typical note size in characters.
+    :param tag_prob: Probability that a line ends with a tag.
+    :param link_prob: Probability that a line ends with a wikilink.
+    """
+    rng = random.Random(seed)
+    titles = [f"{rng.choice(ENGLISH_WORDS).title()} {rng.choice(ENGLISH_WORDS).title()} {i}" for i in range(notes)]
+    total_chars = 0
+
+    for title in titles:
+        folder = rng.choice(FOLDERS)
+        body = _body(rng, _note_size(rng, size_distribution, mean_chars), hebrew_ratio, titles, tag_prob, link_prob)
+        if folder == "Atlas":
+            body = f"# {title} MOC\n" + "\n".join(f"- [[{rng.choice(titles)}]]" for _ in range(10)) + "\n" + body
+        os.makedirs(os.path.join(path, folder), exist_ok=True)
+        note_path = os.path.join(path, folder, f"{title}.md")
+        with open(note_path, "w", encoding="utf-8") as f:
+            f.write(body)
+        mtime = time.time() - rng.uniform(0, 2 * 365 * 86400)
+        os.utime(note_path, (mtime, mtime))
+        total_chars += len(body)
+
+    journal_path = os.path.join(path, "Daily", "Journal")
+    os.makedirs(journal_path, exist_ok=True)
+    today = datetime.date.today()
+    for offset in range(journal_days):
+        day = today - datetime.timedelta(days=offset)
+        name = f"{day.strftime('%Y-%m-%d')}-{day.strftime('%A')}.md"
+        body = f"# {day.isoformat()}\n## 📝 Notes\n<!-- AI -->\n" + _body(
+            rng, _note_size(rng, size_distribution, mean_chars // 2), hebrew_ratio, titles, tag_prob * 2, link_prob
+        )
+        note_path = os.path.join(journal_path, name)
+        with open(note_path, "w", encoding="utf-8") as f:
+            f.write(body)
+        mtime = time.time() - offset * 86400
+        os.utime(note_path, (mtime, mtime))
+        total_chars += len(body)
+
+    templates = os.path.join(path, "Extras", "Templates")
+    os.makedirs(templates, exist_ok=True)
+    with open(os.path.join(templates, "Daily.md"), "w", encoding="utf-8") as f:
+        f.write("# {{date}}\n## 📝 Notes\n<!-- AI -->\n")
+
+    return {"notes": notes, "journal_days": journal_days, "chars": total_chars, "seed": seed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Obsidian vault")
+    parser.add_argument("--path", required=True, help="Directory to write the vault to")
+    parser.add_argument("--notes", type=int, default=1000)
+    parser.add_argument("--journal-days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hebrew-ratio", type=float, default=0.3)
+    parser.add_argument("--size-distribution", choices=["lognormal", "uniform", "fixed"], default="lognormal")
+    parser.add_argument("--mean-chars", type=int, default=1500)
+    args = parser.parse_args()
+
+    print(generate_vault(args.path, args.notes, args.journal_days, args.seed, args.hebrew_ratio,
+                         args.size_distribution, args.mean_chars))
@@ -5,7 +5,7 @@ from datetime import date
 
 from agno.playground import Playground, serve_playground_app
 from agno.agent import Agent
-from tools.git_auto_sync import GitAutoSync
+from tools.git_auto_sync import get_git_sync
 # from agno.models.openai import OpenAIChat
 # from agno.memory.memory import Memory
 # from agno.storage.agent.sqlite import SqliteAgentStorage
@@ -73,16 +73,13 @@ def setup_workflow(vault_path):
         os.makedirs(assitant_path)
 
     # === Initialize Workflow ===
-    print("Starting vault syncing...")
+    # Returns right away; the vault is embedded in the background (see ObsidianWorkflow.status).
+    print("Starting vault syncing in the background...")
     obsidian_workflow = ObsidianWorkflow(vault_path, workflow_id="testagent")
-    obsidian_workflow.sync_vault()
 
-    # Git syncing
+    # Git syncing (shared with the workflow, already running if it started it)
     print("Starting git syncing...")
-    git = GitAutoSync(vault_path)
-    git_thread = threading.Thread(target=git.run)
-    print("Starting Git sync thread...")
-    git_thread.start()
+    get_git_sync(vault_path).start()
     print("Git sync thread started.")
 
     return obsidian_workflow
@@ -135,7 +132,23 @@ def main():
     else:
         print("No result to display.")
 
-app = Playground(agents = [ObsidianWorkflow.tagging_agent], workflows=[create_agent("../../vaults/Obsidian-DB/")]).get_app()
+_app = None
+_app_lock = threading.Lock()
+
+def get_app():
+    """Builds the Playground app on first use, so importing this module starts nothing."""
+    global _app
+    with _app_lock:
+        if _app is None:
+            workflow = create_agent(os.getenv("VAULT_PATH", "../../vaults/Obsidian-DB/"))
+            _app = Playground(agents = [workflow.tagging_agent], workflows=[workflow]).get_app()
+        return _app
+
+def __getattr__(name):
+    # "obsidian:app" (as served below) resolves here.
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     serve_playground_app("obsidian:app", reload=True)
\ No newline at end of file
@@ -124,6 +124,13 @@ class VaultOverviewAgent:
         "7. Focus on providing a high-level understanding of the vault, rather than getting bogged down in the details of individual notes.",
         "8. Consider the vault's purpose and goals when creating the overview, and highlight the aspects that are most relevant to achieving those goals."
     ]
+    section_prompt = """
+        Below are the current statistics for the "{title}" section of the vault overview.
+        Write 2-4 sentences describing what they say about how the vault is organized and used.
+        Use only these statistics; do not call any tools and do not repeat the list.
+
+        {stats}
+    """
 
 class TaggingAgent:
     description = """You are responsible for tagging notes/journal entries with existing tags from the vault.
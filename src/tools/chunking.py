@@ -0,0 +1,98 @@
+"""
+Markdown chunking for the vault embedder.
+
+Splits a note into heading sections, and sections that are too long into
+paragraph- and line-bounded pieces. Every chunk keeps its character offsets
+into the note so search hits can point at (and tools can return) just the
+matching section.
+
+iter_headings() is the one place that tells headings from '#' lines inside
+fenced code blocks (``` or ~~~); note_search builds note outlines with it.
+"""
+
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+MAX_CHUNK_CHARS = 2000
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE_RE = re.compile(r"^\s*(`{3,}|~{3,})")
+
+
+class Chunk(NamedTuple):
+    start: int
+    end: int
+    heading: str
+    text: str
+
+
+def iter_headings(lines: Iterable[str]) -> Iterator[Tuple[int, int, str]]:
+    """
+    Yields (0-based line index, level, title) for each heading outside fenced code blocks.
+    A fence closes only on the character that opened it, repeated at least as many times.
+    """
+    fence = None
+    for i, line in enumerate(lines):
+        line = line.rstrip("\r\n")
+        match = _FENCE_RE.match(line)
+        if match:
+            marker = match.group(1)
+            if fence is None:
+                fence = marker
+            elif marker[0] == fence[0] and len(marker) >= len(fence):
+                fence = None
+            continue
+        if fence is None:
+            match = _HEADING_RE.match(line)
+            if match:
+                yield i, len(match.group(1)), match.group(2)
+
+
+def _sections(text: str) -> List[tuple]:
+    """Returns (start, end, heading path) for each heading-delimited section."""
+    sections = []
+    trail: List[tuple] = []
+    section_start = 0
+    section_heading = ""
+    lines = text.splitlines(keepends=True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+
+    for i, level, title in iter_headings(lines):
+        offset = offsets[i]
+        if offset > section_start:
+            sections.append((section_start, offset, section_heading))
+        trail = [(lvl, t) for lvl, t in trail if lvl < level] + [(level, title)]
+        section_start = offset
+        section_heading = " > ".join(t for _, t in trail)
+
+    if offsets[-1] > section_start:
+        sections.append((section_start, offsets[-1], section_heading))
+    return sections
+
+
+def _split_points(text: str, start: int, end: int, max_chars: int) -> List[int]:
+    """Cuts [start, end) into pieces of at most max_chars, preferring blank lines, then line ends."""
+    points = []
+    while end - start > max_chars:
+        window = text[start:start + max_chars]
+        cut = window.rfind("\n\n")
+        if cut <= 0:
+            cut = window.rfind("\n")
+        cut = cut + 1 if cut > 0 else max_chars
+        start += cut
+        points.append(start)
+    return points
+
+
+def chunk_markdown(text: str, max_chars: int = MAX_CHUNK_CHARS) -> List[Chunk]:
+    """Splits a note into heading- and size-bounded chunks. Whitespace-only chunks are dropped."""
+    chunks = []
+    for start, end, heading in _sections(text):
+        bounds = [start] + _split_points(text, start, end, max_chars) + [end]
+        for chunk_start, chunk_end in zip(bounds, bounds[1:]):
+            chunk_text = text[chunk_start:chunk_end]
+            if chunk_text.strip():
+                chunks.append(Chunk(chunk_start, chunk_end, heading, chunk_text))
+    return chunks
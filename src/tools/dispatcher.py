@@ -0,0 +1,173 @@
+"""
+Per-sender message dispatcher for the WhatsApp bot.
+
+Messages are queued per sender and handled by a bounded pool of worker
+threads: one sender's messages run strictly in arrival order (never two at
+once), while different senders are served in parallel. Queues are bounded per
+sender and in total; submit() refuses messages beyond that so the caller can
+reply that the bot is overloaded.
+
+A slot can be reserved before its text is known (a voice note that is still
+being transcribed) so later messages from the same sender wait behind it.
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from tools.telemetry import span
+
+DISPATCH_WORKERS = 4
+MAX_QUEUE_PER_SENDER = 10
+MAX_PENDING = 200
+
+_CANCELLED = object()
+
+
+class MessageSlot:
+    def __init__(self, sender: str, message=None):
+        self.sender = sender
+        self.message = message
+        self.enqueued_at = time.monotonic()
+
+    @property
+    def ready(self) -> bool:
+        return self.message is not None
+
+
+class MessageDispatcher:
+    def __init__(self, handler: Callable[[str, str], None], workers: int = DISPATCH_WORKERS,
+                 max_queue_per_sender: int = MAX_QUEUE_PER_SENDER, max_pending: int = MAX_PENDING):
+        """
+        :param handler: Called as handler(sender, message) on a worker thread.
+        :param max_queue_per_sender: Messages one sender may have waiting (including the running one).
+        :param max_pending: Messages waiting across all senders.
+        """
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queue_per_sender = max_queue_per_sender
+        self.max_pending = max_pending
+
+        self._queues: Dict[str, deque] = {}
+        # Senders in _ready or being handled; a sender is never in both or twice.
+        self._scheduled = set()
+        self._ready = deque()
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        self._handled = 0
+        self._failed = 0
+        self._rejected = 0
+        self._max_wait = 0.0
+
+    # ----------------- Internal Utilities -----------------
+
+    def _schedule(self, sender: str):
+        """Queues a sender for a worker if its next message is ready. Caller holds _cond."""
+        queue = self._queues.get(sender)
+        if not queue:
+            self._queues.pop(sender, None)
+            return
+        if sender in self._scheduled or not queue[0].ready:
+            return
+        self._scheduled.add(sender)
+        self._ready.append(sender)
+        self._cond.notify()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._ready and not self._stopping:
+                    self._cond.wait()
+                if not self._ready:
+                    return
+                sender = self._ready.popleft()
+                slot = self._queues[sender].popleft()
+                wait = time.monotonic() - slot.enqueued_at
+                self._max_wait = max(self._max_wait, wait)
+
+            if slot.message is not _CANCELLED:
+                try:
+                    # Root of the message's span tree; the wait includes transcription for voice notes.
+                    with span("dispatcher.message", queue_wait_ms=round(wait * 1000)):
+                        self.handler(sender, slot.message)
+                    with self._cond:
+                        self._handled += 1
+                except Exception as e:
+                    with self._cond:
+                        self._failed += 1
+                    print(f"⚠️ Handling message from {sender} failed: {e}")
+
+            with self._cond:
+                self._pending -= 1
+                self._scheduled.discard(sender)
+                # Back of the line, so a chatty sender can't starve the others.
+                self._schedule(sender)
+
+    # ----------------- Core Methods -----------------
+
+    def start(self):
+        """Starts the worker threads. Idempotent."""
+        if self._threads:
+            return
+        self._stopping = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"dispatch-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Finishes messages that are ready, then stops the workers."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def reserve(self, sender: str) -> Optional[MessageSlot]:
+        """
+        Takes the next place in the sender's queue without a message yet; fill() or cancel() it later.
+        Returns None when the sender's queue or the dispatcher is full.
+        """
+        with self._cond:
+            queue = self._queues.get(sender)
+            if self._pending >= self.max_pending or (queue and len(queue) >= self.max_queue_per_sender):
+                self._rejected += 1
+                return None
+            slot = MessageSlot(sender)
+            self._queues.setdefault(sender, deque()).append(slot)
+            self._pending += 1
+            return slot
+
+    def fill(self, slot: MessageSlot, message: str):
+        with self._cond:
+            slot.message = message
+            self._schedule(slot.sender)
+
+    def cancel(self, slot: MessageSlot):
+        """Releases a reserved place; messages queued behind it move up."""
+        self.fill(slot, _CANCELLED)
+
+    def submit(self, sender: str, message: str) -> bool:
+        """Queues a message; returns False (nothing queued) when the sender or the dispatcher is overloaded."""
+        slot = self.reserve(sender)
+        if slot is None:
+            return False
+        self.fill(slot, message)
+        return True
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "senders": len(self._queues),
+                "busy": len(self._scheduled) - len(self._ready),
+                "handled": self._handled,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "max_wait_seconds": round(self._max_wait, 3),
+            }
@@ -0,0 +1,205 @@
+"""
+Embedding cache for Obsidian Assistant
+
+Content-addressed, persistent cache in front of an agno Embedder. Vectors are
+keyed by a hash of (model, dimensions, text) and stored as float16 blobs in a
+local SQLite file, with least-recently-used eviction once the cache grows past
+its size budget. Text that was embedded once (before a rename, a move or a
+table rebuild) is never sent to the embedding API again.
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from agno.embedder.base import Embedder
+from agno.embedder.openai import OpenAIEmbedder
+
+CACHE_FILENAME = "embedding_cache.db"
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+# Single-text lookups (search queries) are also kept in memory, most recent first.
+RECENT_QUERIES = 256
+
+
+def embed_texts(embedder: Embedder, texts: List[str]) -> List[List[float]]:
+    """Embeds a list of texts in as few embedding API requests as the embedder allows."""
+    if hasattr(embedder, "get_embeddings"):
+        return embedder.get_embeddings(texts)
+    if isinstance(embedder, OpenAIEmbedder):
+        params = {"input": texts, "model": embedder.id, "encoding_format": embedder.encoding_format}
+        if embedder.user is not None:
+            params["user"] = embedder.user
+        if embedder.id.startswith("text-embedding-3"):
+            params["dimensions"] = embedder.dimensions
+        if embedder.request_params:
+            params.update(embedder.request_params)
+        response = embedder.client.embeddings.create(**params)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    return [embedder.get_embedding(text) for text in texts]
+
+
+@dataclass
+class CachedEmbedder(Embedder):
+    embedder: Optional[Embedder] = None
+    cache_path: Optional[str] = None
+    max_bytes: int = MAX_CACHE_BYTES
+    recent_queries: int = RECENT_QUERIES
+
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+
+    def __post_init__(self):
+        if self.embedder is None:
+            self.embedder = OpenAIEmbedder()
+        self.dimensions = self.embedder.dimensions
+        self.model_id = f"{getattr(self.embedder, 'id', type(self.embedder).__name__)}:{self.dimensions}"
+
+        self._lock = threading.Lock()
+        self._recent: "OrderedDict[str, List[float]]" = OrderedDict()
+        if self.cache_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.cache_path or ":memory:", check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    # ----------------- Internal Utilities -----------------
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_id}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join('?' * len(part))})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float16).astype(np.float32).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+                self._conn.commit()
+        return found
+
+    def _stored_sizes(self, keys: List[str]) -> Dict[str, int]:
+        """Sizes of the vectors already stored under `keys`. Caller holds _lock."""
+        sizes = {}
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            sizes.update(self._conn.execute(
+                f"SELECT key, LENGTH(vector) FROM embeddings WHERE key IN ({', '.join('?' * len(part))})", part
+            ).fetchall())
+        return sizes
+
+    def _store(self, items: List[Tuple[str, List[float]]]):
+        now = time.time()
+        blobs = {key: np.asarray(vector, dtype=np.float16).tobytes() for key, vector in items if vector}
+        rows = [(key, blob, now) for key, blob in blobs.items()]
+        with self._lock:
+            # A key stored again replaces its vector; only the size difference is new.
+            replaced = self._stored_sizes(list(blobs))
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows)
+            self._bytes += sum(len(blob) - replaced.get(key, 0) for key, blob in blobs.items())
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _remember(self, key: str, vector: List[float]):
+        with self._lock:
+            self._recent[key] = vector
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.recent_queries:
+                self._recent.popitem(last=False)
+
+    def _recall(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._recent.get(key)
+            if vector is not None:
+                self._recent.move_to_end(key)
+            return vector
+
+    def _evict(self):
+        """Drops least recently used vectors until the cache is back under 90% of its budget."""
+        target = int(self.max_bytes * 0.9)
+        while self._bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                self._bytes = 0
+                break
+            dropped = []
+            for key, size in rows:
+                if self._bytes <= target:
+                    break
+                dropped.append((key,))
+                self._bytes -= size
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", dropped)
+
+    # ----------------- Embedder interface -----------------
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Batch lookup; only texts missing from the cache are sent to the wrapped embedder, once each."""
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(list(set(keys)))
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = embed_texts(self.embedder, list(missing.values()))
+            fresh = list(zip(missing.keys(), vectors))
+            self._store(fresh)
+            found.update(fresh)
+        return [found[key] for key in keys]
+
+    def get_embedding(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self._recall(key)
+        if vector is not None:
+            self.hits += 1
+            return vector
+        vector = self.get_embeddings([text])[0]
+        self._remember(key, vector)
+        return vector
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        key = self._key(text)
+        vector = self._recall(key)
+        if vector is not None:
+            self.hits += 1
+            return vector, None
+        found = self._lookup([key])
+        if key in found:
+            self.hits += 1
+            self._remember(key, found[key])
+            return found[key], None
+        self.misses += 1
+        embedding, usage = self.embedder.get_embedding_and_usage(text)
+        self._store([(key, embedding)])
+        self._remember(key, embedding)
+        return embedding, usage
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"entries": count, "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
@@ -1,28 +1,117 @@
+import os
 import time
 import logging
+import threading
 from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
 from git import Repo, GitCommandError, InvalidGitRepositoryError, NoSuchPathError
 import sys
 
+from tools.ignore_rules import DEFAULT_IGNORES, ensure_git_excludes
+from tools.telemetry import traced
+
+# Seconds without new writes before local changes are committed and pushed.
+COMMIT_DEBOUNCE = 30
+# Upper bound on how long a steady stream of writes can postpone a commit.
+COMMIT_MAX_DELAY = 300
+PULL_INTERVAL = 300
+# Retry delays while the remote is unreachable: 15s, 30s, 60s, ... up to 30 minutes.
+BACKOFF_BASE = 15
+BACKOFF_MAX = 30 * 60
+
+
+class PullChanges(NamedTuple):
+    """Markdown files a pull changed, as repository-relative paths."""
+    before: str
+    after: str
+    changed: Set[str]
+    deleted: Set[str]
+    renamed: Dict[str, str]
+
+    def paths(self) -> Set[str]:
+        """Every path whose state changed, including both sides of each rename."""
+        return self.changed | self.deleted | set(self.renamed) | set(self.renamed.values())
+
+
+def diff_markdown(repo: Repo, before: str, after: str) -> PullChanges:
+    """Classifies the .md paths that differ between two commits (with rename detection)."""
+    changed, deleted, renamed = set(), set(), {}
+    fields = repo.git.diff("--name-status", "-M", "-z", "--no-color", before, after).split("\0")
+    i = 0
+    while i < len(fields) and fields[i]:
+        status = fields[i][0]
+        if status in ("R", "C"):
+            old, new = fields[i + 1], fields[i + 2]
+            i += 3
+            if status == "R" and old.endswith(".md") and new.endswith(".md"):
+                renamed[old] = new
+                continue
+            if status == "R" and old.endswith(".md"):
+                deleted.add(old)
+            if new.endswith(".md"):
+                changed.add(new)
+            continue
+        path = fields[i + 1]
+        i += 2
+        if not path.endswith(".md"):
+            continue
+        (deleted if status == "D" else changed).add(path)
+    return PullChanges(before, after, changed, deleted, renamed)
+
+
 class GitAutoSync:
-    def __init__(self, repo_path: str, branch: str = "main", interval: int = 300):
+    def __init__(self, repo_path: str, branch: str = "main", interval: int = PULL_INTERVAL,
+                 debounce: float = COMMIT_DEBOUNCE, max_delay: float = COMMIT_MAX_DELAY,
+                 clock: Callable[[], float] = time.monotonic):
         """
         Initialize GitAutoSync.
 
+        Reads and writes never wait on the remote: writers call mark_dirty() and a
+        background thread (start()) commits and pushes in debounced batches, pulls
+        every `interval` seconds or on request_pull(), and backs off exponentially
+        while the remote is unreachable.
+
         :param repo_path: Path to the local Git repository.
         :param branch: Branch to pull from and push to.
-        :param interval: Time in seconds between syncs (default: 300 = 5 min).
+        :param interval: Time in seconds between pulls (default: 300 = 5 min).
+        :param debounce: Quiet time in seconds after the last write before committing.
+        :param max_delay: Commit at the latest this many seconds after the first pending write.
+        :param clock: Monotonic time in seconds used for scheduling; injectable for tests.
         """
         self.repo_path = repo_path
         self.branch = branch
         self.interval = interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.clock = clock
         self.repo = self._load_repo()
+        if ensure_git_excludes(self.repo_path):
+            logging.info("Added the assistant's data folders to .git/info/exclude.")
+        # Serializes git commands between the background thread and direct sync() calls.
+        self._lock = threading.Lock()
+
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+        self._dirty_since: Optional[float] = None
+        self._last_write: Optional[float] = None
+        self._unpushed = False
+        self._pull_requested = False
+        self._next_pull = self.clock()
+        self._failures = 0
+        self._retry_at = 0.0
+        self.last_error: Optional[str] = None
+        self.last_pull: Optional[PullChanges] = None
+        self._subscribers: List[Callable[[PullChanges], None]] = []
+        self._unpublished: List[PullChanges] = []
 
         logging.basicConfig(
             level=logging.INFO,
             format="%(asctime)s [%(levelname)s] %(message)s",
             handlers=[logging.StreamHandler(sys.stdout)]
         )
+        # One-time migration; the removals go out with the next commit.
+        self._untrack_ignored()
 
     def _load_repo(self):
         try:
@@ -34,59 +123,268 @@ class GitAutoSync:
             logging.error(f"Failed to load Git repository: {e}")
             raise
 
-    def sync(self):
-        """
-        Perform a pull → add → commit → push cycle.
-        """
-        # Adding detailed logging for debugging
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        logging.info("Starting sync cycle...")
-        logging.info("Starting sync cycle...")
+    # ----------------- Git operations -----------------
+
+    def subscribe(self, callback: Callable[[PullChanges], None]):
+        """Registers callback(changes), called after every pull that brought in new commits."""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
 
+    def _head(self) -> Optional[str]:
         try:
-            origin = self.repo.remotes.origin
+            return self.repo.head.commit.hexsha
+        except ValueError:
+            # No commits yet.
+            return None
 
-            logging.info("Pulling latest changes...")
-            try:
-                origin.pull(self.branch)
-                logging.info("Pull successful.")
-            except GitCommandError as e:
-                logging.error(f"Error during pull: {e}")
+    @traced("git.pull")
+    def _pull(self):
+        before = self._head()
+        self.repo.remotes.origin.pull(self.branch)
+        after = self._head()
+        logging.info("Pull successful.")
+        if before and after and before != after:
+            changes = diff_markdown(self.repo, before, after)
+            self.last_pull = changes
+            self._unpublished.append(changes)
+            logging.info(f"Pulled {before[:7]}..{after[:7]}: {len(changes.changed)} changed, "
+                         f"{len(changes.deleted)} deleted, {len(changes.renamed)} renamed notes.")
 
-            if self.repo.is_dirty(untracked_files=True):
-                logging.info("Changes detected. Committing...")
+    def _publish(self):
+        """Hands pulled changes to subscribers, outside the git lock so commits are not held up."""
+        while True:
+            with self._cond:
+                if not self._unpublished:
+                    return
+                changes = self._unpublished.pop(0)
+            for callback in list(self._subscribers):
                 try:
-                    self.repo.git.add(A=True)
-                    self.repo.index.commit(f"Auto commit at {timestamp}")
-                    logging.info("Commit successful.")
+                    callback(changes)
                 except Exception as e:
-                    logging.error(f"Error during commit: {e}")
-                self.repo.index.commit(f"Auto commit at {timestamp}")
+                    logging.error(f"Pull subscriber {callback} failed: {e}")
+
+    def _untrack_ignored(self):
+        """
+        Stops tracking the assistant's own data (DEFAULT_IGNORES, e.g. .assistant/) that an
+        older commit added. Only the built-in patterns are applied: files the user tracks
+        despite their own .gitignore are left alone.
+        """
+        patterns = [arg for p in DEFAULT_IGNORES if p != ".git/" for arg in ("-x", p)]
+        tracked = self.repo.git.ls_files("-ci", "-z", *patterns).split("\0")
+        tracked = [path for path in tracked if path]
+        for i in range(0, len(tracked), 500):
+            self.repo.git.rm("--cached", "--quiet", "--", *tracked[i:i + 500])
+        for path in tracked:
+            logging.info(f"Untracked {path} (assistant data).")
+
+    @traced("git.commit")
+    def _commit(self) -> bool:
+        """Commits all local changes; returns False when there was nothing to commit."""
+        if not self.repo.is_dirty(untracked_files=True):
+            return False
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # The default ignores are in .git/info/exclude, so add -A skips the assistant's data.
+        self.repo.git.add(A=True)
+        self.repo.index.commit(f"Auto commit at {timestamp}")
+        logging.info("Commit successful.")
+        return True
+
+    @traced("git.push")
+    def _push(self):
+        self.repo.remotes.origin.push(self.branch).raise_if_error()
+        logging.info("Changes pushed successfully.")
+
+    @traced("git.sync")
+    def sync(self):
+        """
+        Perform a pull → add → commit → push cycle, blocking until it is done.
+        """
+        with self._lock:
+            logging.info("Starting sync cycle...")
+            try:
                 try:
-                    origin.push(self.branch)
-                    logging.info("Changes pushed successfully.")
+                    self._pull()
                 except GitCommandError as e:
-                    logging.error(f"Error during push: {e}")
-                logging.info("Changes pushed successfully.")
+                    logging.error(f"Error during pull: {e}")
+
+                if self._commit():
+                    try:
+                        self._push()
+                    except GitCommandError as e:
+                        logging.error(f"Error during push: {e}")
+                else:
+                    logging.info("No changes to commit.")
+
+            except GitCommandError as e:
+                logging.error(f"Git command failed: {e}")
+        self._publish()
+
+    # ----------------- Background coordinator -----------------
+
+    def mark_dirty(self, *_):
+        """
+        Records that the vault was written. Cheap and non-blocking; accepts (and ignores)
+        the changed paths so it can subscribe to the vault watcher directly.
+        """
+        now = self.clock()
+        with self._cond:
+            if self._dirty_since is None:
+                self._dirty_since = now
+            self._last_write = now
+            self._cond.notify()
+
+    def request_pull(self):
+        """Asks the background thread to pull as soon as the remote is reachable."""
+        with self._cond:
+            self._pull_requested = True
+            self._cond.notify()
+
+    def _commit_due(self, now: float) -> Optional[float]:
+        """Seconds until pending writes should be committed (<= 0: now), or None if there are none."""
+        if self._dirty_since is None and not self._unpushed:
+            return None
+        if self._dirty_since is None:
+            return 0.0
+        return min(self._last_write + self.debounce, self._dirty_since + self.max_delay) - now
+
+    def _next_wakeup(self, now: float) -> float:
+        waits = [self._next_pull - now]
+        commit_in = self._commit_due(now)
+        if commit_in is not None:
+            waits.append(commit_in)
+        if self._pull_requested:
+            waits.append(0.0)
+        wait = min(waits)
+        if self._failures:
+            wait = max(wait, self._retry_at - now)
+        return max(wait, 0.0)
+
+    def _cycle(self, pull: bool, commit: bool):
+        with self._lock:
+            try:
+                # Commit before pulling so incoming changes merge instead of clashing with the worktree.
+                if commit and self._commit():
+                    self._unpushed = True
+                if pull:
+                    self._pull()
+                if commit and self._unpushed:
+                    self._push()
+                    self._unpushed = False
+            except Exception as e:
+                with self._cond:
+                    if commit:
+                        # A rejected push usually means the remote moved on; pull before retrying.
+                        self._pull_requested = True
+                    self._failures += 1
+                    delay = min(BACKOFF_BASE * 2 ** (self._failures - 1), BACKOFF_MAX)
+                    self._retry_at = self.clock() + delay
+                    self.last_error = str(e)
+                logging.error(f"Git sync failed ({self._failures} in a row), retrying in {delay}s: {e}")
+                failed = True
             else:
-                logging.info("No changes to commit.")
+                failed = False
+        self._publish()
+        if failed:
+            return False
+        with self._cond:
+            if self._failures:
+                logging.info("Git remote reachable again.")
+            self._failures = 0
+            self.last_error = None
+        return True
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._stop:
+                    now = self.clock()
+                    wait = self._next_wakeup(now)
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if self._stop:
+                    return
+                now = self.clock()
+                pull = self._pull_requested or now >= self._next_pull
+                commit_in = self._commit_due(now)
+                commit = commit_in is not None and commit_in <= 0
+                if commit:
+                    # Writes arriving while this commit runs start a new batch.
+                    self._dirty_since = self._last_write = None
+                if pull:
+                    self._pull_requested = False
+
+            if self._cycle(pull, commit):
+                if pull:
+                    with self._cond:
+                        self._next_pull = self.clock() + self.interval
+            elif commit:
+                with self._cond:
+                    # Keep the batch pending; the retry commits whatever is there by then.
+                    self._unpushed = True
+
+    def start(self):
+        """Starts the background sync thread (idempotent)."""
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return self._thread
+            self._stop = False
+            self._thread = threading.Thread(target=self._loop, name="git-sync", daemon=True)
+            self._thread.start()
+            logging.info(f"Git sync started: pull every {self.interval}s, commit {self.debounce}s after the last write.")
+            return self._thread
 
-        except GitCommandError as e:
-            logging.error(f"Git command failed: {e}")
+    def stop(self, flush: bool = True):
+        """Stops the background thread; with flush, commits and pushes pending writes first."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+            pending = self._dirty_since is not None or self._unpushed
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if flush and pending:
+            self._cycle(pull=False, commit=True)
+
+    def status(self) -> dict:
+        with self._cond:
+            now = self.clock()
+            return {
+                "running": bool(self._thread and self._thread.is_alive()),
+                "dirty": self._dirty_since is not None,
+                "unpushed": self._unpushed,
+                "failures": self._failures,
+                "retry_in": max(0.0, round(self._retry_at - now, 1)) if self._failures else None,
+                "next_pull_in": round(self._next_pull - now, 1),
+                "last_error": self.last_error,
+            }
 
     def run(self, interval: int = 300):
         """
-        Continuously sync the repository every `self.interval` seconds.
+        Continuously sync the repository in the foreground; pulls every `self.interval` seconds.
         """
         if interval:
             self.interval = interval
 
         logging.info(f"Starting auto-sync every {self.interval} seconds...")
-        while True:
-            logging.info(f"Sync cycle started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            self.sync()
-            time.sleep(self.interval)
+        self.mark_dirty()
+        self.start().join()
+
+
+# Single sync coordinator per repository.
+_git_syncs: Dict[str, GitAutoSync] = {}
+_git_syncs_lock = threading.Lock()
+
+
+def get_git_sync(repo_path: str) -> GitAutoSync:
+    key = os.path.abspath(repo_path)
+    with _git_syncs_lock:
+        git = _git_syncs.get(key)
+        if git is None:
+            git = GitAutoSync(key)
+            _git_syncs[key] = git
+        return git
 
 
 # g = GitAutoSync(repo_path="..\..\Vaults\Obsidian-DB", branch="main", interval=3)
-# g.run()
\ No newline at end of file
+# g.run()
@@ -0,0 +1,235 @@
+"""
+Ignore rules for the vault.
+
+One set of rules, compiled once per vault, decides which files belong to the
+vault: built-in defaults (git internals and the assistant's own derived data
+under .assistant/) plus the vault's .gitignore and .git/info/exclude. Git
+staging gets the same defaults through .git/info/exclude; every scanner
+(scan_markdown, the vault watcher, the note tools) walks the vault through
+IgnoreRules.walk() or checks ignored().
+
+Supports the common .gitignore syntax: comments, negation (!), directory-only
+patterns (trailing /), anchored patterns (leading or inner /), *, ?, [...]
+and **. Nested .gitignore files below the vault root are not read.
+"""
+
+import os
+import re
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Never committed and never scanned: git internals, the assistant's indexes,
+# vector tables and agent databases, and SQLite side files.
+DEFAULT_IGNORES = [
+    ".git/",
+    ".assistant/",
+    "*.db-journal",
+    "*.db-wal",
+    "*.db-shm",
+]
+# Obsidian does not show dot-folders (.obsidian settings, .trash), so the
+# scanners skip them as well; git still syncs them.
+SCAN_IGNORES = [".*/"]
+
+_EXCLUDE_HEADER = "# Added by Obsidian Assistant: derived data that should not be synced"
+
+
+def _glob_to_regex(pattern: str) -> str:
+    out, i = [], 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+            continue
+        if c == "*":
+            out.append(".*" if pattern.startswith("**", i) else "[^/]*")
+            i += 2 if pattern.startswith("**", i) else 1
+            continue
+        if c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        elif c == "\\" and i + 1 < len(pattern):
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def compile_rule(line: str) -> Optional[Tuple["re.Pattern", bool, bool]]:
+    """Compiles one .gitignore line into (regex, negated, directory_only), or None for blanks/comments."""
+    line = line.rstrip("\n").rstrip()
+    if not line or line.startswith("#"):
+        return None
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    elif line.startswith("\\"):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    anchored = "/" in line
+    line = line.lstrip("/")
+    regex = _glob_to_regex(line)
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    return re.compile(f"^{regex}$", re.DOTALL), negated, dir_only
+
+
+class IgnoreRules:
+    def __init__(self, vault_path: str, defaults: List[str] = None):
+        self.vault_path = os.path.abspath(vault_path)
+        self.defaults = list(DEFAULT_IGNORES if defaults is None else defaults)
+        self._lock = threading.Lock()
+        self._sources: Dict[str, Optional[int]] = {}
+        self._rules: List[Tuple["re.Pattern", bool, bool]] = []
+        self._cache: Dict[Tuple[str, bool], bool] = {}
+        self._load()
+
+    # ----------------- Internal Utilities -----------------
+
+    def _source_files(self) -> List[str]:
+        return [
+            os.path.join(self.vault_path, ".git", "info", "exclude"),
+            os.path.join(self.vault_path, ".gitignore"),
+        ]
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        lines = list(self.defaults)
+        sources = {}
+        for path in self._source_files():
+            sources[path] = self._mtime(path)
+            if sources[path] is None:
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    lines.extend(f.readlines())
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"⚠️ Could not read ignore file {path}: {e}")
+        rules = [rule for rule in map(compile_rule, lines) if rule]
+        with self._lock:
+            self._rules = rules
+            self._sources = sources
+            self._cache = {}
+
+    def _match(self, rel_path: str, is_dir: bool) -> bool:
+        ignored = False
+        for regex, negated, dir_only in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                ignored = not negated
+        return ignored
+
+    # ----------------- Core Methods -----------------
+
+    def refresh(self) -> bool:
+        """Recompiles the rules if .gitignore or .git/info/exclude changed; returns whether they did."""
+        if all(self._mtime(path) == mtime for path, mtime in self._sources.items()):
+            return False
+        self._load()
+        return True
+
+    def ignored(self, path: str, is_dir: bool = False) -> bool:
+        """Whether a vault path (relative or absolute) is ignored, itself or through a parent folder."""
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.vault_path)
+        rel_path = path.replace(os.sep, "/").strip("/")
+        if not rel_path or rel_path == ".":
+            return False
+        if rel_path.startswith("../"):
+            return True
+        key = (rel_path, is_dir)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        parts = rel_path.split("/")
+        result = False
+        for depth in range(1, len(parts)):
+            if self.ignored("/".join(parts[:depth]), is_dir=True):
+                result = True
+                break
+        else:
+            result = self._match(rel_path, is_dir)
+        if len(self._cache) > 100_000:
+            self._cache = {}
+        self._cache[key] = result
+        return result
+
+    def walk(self, top: Optional[str] = None) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """os.walk over the vault that never descends into ignored folders and leaves out ignored files."""
+        top = top or self.vault_path
+        for root, dirs, files in os.walk(top):
+            rel_root = os.path.relpath(root, self.vault_path)
+            prefix = "" if rel_root == "." else rel_root + "/"
+            dirs[:] = [d for d in dirs if not self.ignored(prefix + d, is_dir=True)]
+            yield root, dirs, [f for f in files if not self.ignored(prefix + f)]
+
+
+def ensure_git_excludes(vault_path: str, patterns: List[str] = None) -> bool:
+    """Adds the default ignore patterns missing from .git/info/exclude; returns whether it changed."""
+    patterns = DEFAULT_IGNORES if patterns is None else patterns
+    exclude = os.path.join(vault_path, ".git", "info", "exclude")
+    if not os.path.isdir(os.path.join(vault_path, ".git")):
+        return False
+    try:
+        with open(exclude, encoding="utf-8") as f:
+            existing = f.read()
+    except FileNotFoundError:
+        existing = ""
+    present = {line.strip() for line in existing.splitlines()}
+    missing = [p for p in patterns if p not in present and p != ".git/"]
+    if not missing:
+        return False
+    os.makedirs(os.path.dirname(exclude), exist_ok=True)
+    with open(exclude, "a", encoding="utf-8") as f:
+        if existing and not existing.endswith("\n"):
+            f.write("\n")
+        if _EXCLUDE_HEADER not in present:
+            f.write(_EXCLUDE_HEADER + "\n")
+        f.write("\n".join(missing) + "\n")
+    return True
+
+
+# Compiled rules per (vault, scope).
+_rules: Dict[Tuple[str, bool], IgnoreRules] = {}
+_rules_lock = threading.Lock()
+
+
+def get_ignore_rules(vault_path: str, for_git: bool = False) -> IgnoreRules:
+    """
+    Returns the vault's compiled ignore rules. The default (scanner) rules also skip
+    dot-folders; for_git=True gives the rules git staging follows.
+    """
+    key = (os.path.abspath(vault_path), for_git)
+    with _rules_lock:
+        rules = _rules.get(key)
+        if rules is None:
+            defaults = DEFAULT_IGNORES if for_git else DEFAULT_IGNORES + SCAN_IGNORES
+            rules = IgnoreRules(key[0], defaults)
+            _rules[key] = rules
+        return rules
@@ -0,0 +1,105 @@
+"""
+Modification-time index for Obsidian Assistant
+
+Notes kept sorted by mtime, so "the N most recent notes" and "notes modified
+since T" are a bisect plus a slice instead of a stat of every file. A change
+log numbers every update so other subsystems can ask for "what changed since
+my cursor" and catch up on just those notes.
+
+Not thread-safe on its own; VaultIndex owns one and calls it under its lock.
+"""
+
+import bisect
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+# Sorts after any path, so bisect_right((t, _LAST)) skips every note modified exactly at t.
+_LAST = "\U0010ffff"
+
+
+class Changes(NamedTuple):
+    """Notes changed or deleted since a cursor; `full` means the cursor was unknown and `changed` is every note."""
+    changed: Set[str]
+    deleted: Set[str]
+    cursor: str
+    full: bool
+
+
+class MtimeIndex:
+    def __init__(self):
+        # (mtime_ns, rel_path), oldest first
+        self._order: List[Tuple[int, str]] = []
+        self._mtimes: Dict[str, int] = {}
+        # rel_path -> (seq, deleted), least recently changed first
+        self._log: "OrderedDict[str, Tuple[int, bool]]" = OrderedDict()
+        self._seq = 0
+        # Cursors from another process (or index) don't carry over.
+        self.epoch = uuid.uuid4().hex[:8]
+
+    # ----------------- Internal Utilities -----------------
+
+    def _drop(self, rel_path: str):
+        mtime_ns = self._mtimes.pop(rel_path, None)
+        if mtime_ns is None:
+            return
+        i = bisect.bisect_left(self._order, (mtime_ns, rel_path))
+        if i < len(self._order) and self._order[i] == (mtime_ns, rel_path):
+            del self._order[i]
+
+    def _record(self, rel_path: str, deleted: bool):
+        self._seq += 1
+        self._log[rel_path] = (self._seq, deleted)
+        self._log.move_to_end(rel_path)
+
+    # ----------------- Core Methods -----------------
+
+    def set(self, rel_path: str, mtime_ns: int):
+        """Records that a note was created or changed."""
+        if self._mtimes.get(rel_path) != mtime_ns:
+            self._drop(rel_path)
+            self._mtimes[rel_path] = mtime_ns
+            bisect.insort(self._order, (mtime_ns, rel_path))
+        self._record(rel_path, deleted=False)
+
+    def remove(self, rel_path: str):
+        if rel_path not in self._mtimes:
+            return
+        self._drop(rel_path)
+        self._record(rel_path, deleted=True)
+
+    def recent(self, limit: int) -> List[Tuple[str, int]]:
+        """The `limit` most recently modified notes as (rel_path, mtime_ns), newest first."""
+        if limit <= 0:
+            return []
+        return [(path, mtime_ns) for mtime_ns, path in reversed(self._order[-limit:])]
+
+    def modified_since(self, mtime_ns: int, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Notes modified after `mtime_ns`, newest first, at most `limit` of them."""
+        start = bisect.bisect_right(self._order, (mtime_ns, _LAST))
+        if limit is not None:
+            start = max(start, len(self._order) - limit)
+        return [(path, t) for t, path in reversed(self._order[start:])]
+
+    def cursor(self) -> str:
+        return f"{self.epoch}:{self._seq}"
+
+    def changes_since(self, cursor: Optional[str]) -> Changes:
+        """
+        Notes changed or deleted after `cursor` (from cursor() or an earlier Changes), in
+        O(changes). Without a cursor, or with one from another epoch, every note is reported.
+        """
+        epoch, _, seq = (cursor or "").partition(":")
+        if epoch != self.epoch or not seq.isdigit():
+            return Changes(set(self._mtimes), set(), self.cursor(), True)
+        since = int(seq)
+        changed, deleted = set(), set()
+        for rel_path in reversed(self._log):
+            entry_seq, was_deleted = self._log[rel_path]
+            if entry_seq <= since:
+                break
+            (deleted if was_deleted else changed).add(rel_path)
+        return Changes(changed, deleted, self.cursor(), False)
+
+    def __len__(self) -> int:
+        return len(self._order)
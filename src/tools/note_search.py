@@ -0,0 +1,227 @@
+"""
+Budgeted search and reading for the note tools.
+
+Search results come back ranked, one page at a time, each with a few
+surrounding-line snippets instead of the whole note. A page stops at `limit`
+results or when its JSON would exceed `max_bytes` (roughly 4 bytes per
+token), whichever comes first; `next_cursor` fetches the next page.
+read_section returns one heading section or line range of a note under the
+same byte budget.
+"""
+
+import os
+import re
+import json
+import base64
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+from tools.chunking import iter_headings
+from tools.tag_index import get_tag_index
+from tools.vault_index import get_vault_index
+
+DEFAULT_LIMIT = 10
+DEFAULT_MAX_BYTES = 4000
+SNIPPET_CONTEXT = 1
+MAX_SNIPPETS = 3
+MAX_SNIPPET_LINE = 200
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _size(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def encode_cursor(key: str, offset: int) -> str:
+    """Opaque cursor for the page starting at `offset` of the results for `key`."""
+    digest = hashlib.md5(key.encode("utf-8")).hexdigest()[:8]
+    return base64.urlsafe_b64encode(f"{digest}:{offset}".encode("ascii")).decode("ascii")
+
+
+def decode_cursor(key: str, cursor: Optional[str]) -> int:
+    """Returns the offset a cursor points at; raises ValueError if it belongs to another search."""
+    if not cursor:
+        return 0
+    try:
+        digest, offset = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii").split(":")
+        offset = int(offset)
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if digest != hashlib.md5(key.encode("utf-8")).hexdigest()[:8] or offset < 0:
+        raise ValueError("The cursor belongs to a different search.")
+    return offset
+
+
+def _clip(line: str, terms: List[str]) -> str:
+    """Shortens a long line to MAX_SNIPPET_LINE characters around the first match."""
+    if len(line) <= MAX_SNIPPET_LINE:
+        return line
+    lower = line.lower()
+    hits = [lower.find(t) for t in terms if t and lower.find(t) >= 0]
+    start = max(min(hits) - MAX_SNIPPET_LINE // 3, 0) if hits else 0
+    end = start + MAX_SNIPPET_LINE
+    return ("…" if start else "") + line[start:end] + ("…" if end < len(line) else "")
+
+
+def snippets(text: str, terms: List[str], context: int = SNIPPET_CONTEXT,
+             max_snippets: int = MAX_SNIPPETS) -> List[Dict]:
+    """
+    Lines matching any of `terms` (case-insensitive) with `context` lines around them.
+    Overlapping windows are merged; line numbers are 1-based.
+    """
+    terms = [t.lower() for t in terms if t]
+    lines = text.splitlines()
+    windows: List[List[int]] = []
+    for i, line in enumerate(lines):
+        lower = line.lower()
+        if not any(t in lower for t in terms):
+            continue
+        start, end = max(i - context, 0), min(i + context, len(lines) - 1)
+        if windows and start <= windows[-1][1] + 1:
+            windows[-1][1] = end
+        else:
+            if len(windows) == max_snippets:
+                break
+            windows.append([start, end])
+    return [
+        {"line": start + 1, "text": "\n".join(_clip(l, terms) for l in lines[start:end + 1])}
+        for start, end in windows
+    ]
+
+
+def _read(vault_path: str, rel_path: str) -> Optional[str]:
+    try:
+        with open(os.path.join(vault_path, rel_path), "r", encoding="utf-8") as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _page(vault_path: str, key: str, ranked: List[Tuple[str, float]], terms: List[str],
+          limit: int, cursor: Optional[str], max_bytes: int) -> Dict:
+    """Builds one page of results with snippets, within `limit` results and `max_bytes`."""
+    offset = decode_cursor(key, cursor)
+    limit = max(int(limit), 1)
+    page = {"total": len(ranked), "results": [], "next_cursor": None}
+    used = _size(page) + 64
+    position = offset
+    while position < len(ranked) and len(page["results"]) < limit:
+        rel_path, score = ranked[position]
+        text = _read(vault_path, rel_path)
+        result = {"path": rel_path, "score": score, "snippets": snippets(text, terms) if text else []}
+        size = _size(result) + 1
+        # Always return at least one result, trimmed to its first snippet if need be.
+        if used + size > max_bytes and page["results"]:
+            break
+        if used + size > max_bytes:
+            result["snippets"] = result["snippets"][:1]
+            if result["snippets"]:
+                room = max(max_bytes - used - _size({**result, "snippets": []}) - 32, 0)
+                snippet = result["snippets"][0]
+                snippet["text"] = snippet["text"].encode("utf-8")[:room].decode("utf-8", "ignore")
+            page["truncated"] = True
+            size = _size(result) + 1
+        page["results"].append(result)
+        used += size
+        position += 1
+    if position < len(ranked):
+        page["next_cursor"] = encode_cursor(key, position)
+    return page
+
+
+def search_notes(vault_path: str, query: str, limit: int = DEFAULT_LIMIT, cursor: Optional[str] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES) -> Dict:
+    """Ranked note name/content search with snippets, one page at a time."""
+    ranked = get_vault_index(vault_path).search_ranked(query)
+    terms = [query] + [w for w in _TOKEN_RE.findall(query) if len(w) > 2]
+    return _page(vault_path, f"notes:{query}", ranked, terms, limit, cursor, max_bytes)
+
+
+def search_tag(vault_path: str, tag: str, limit: int = DEFAULT_LIMIT, cursor: Optional[str] = None,
+               max_bytes: int = DEFAULT_MAX_BYTES) -> Dict:
+    """
+    Notes tagged with `tag` or a nested tag, best first: notes using the tag itself before
+    those only using a nested tag, then the most recently modified.
+    """
+    index = get_tag_index(vault_path)
+    key = "#" + tag.lstrip("#").lower()
+    ranked = []
+    for rel_path in index.notes_with_tag(tag):
+        exact = any(t.lower() == key for t in index.tags_for_note(rel_path))
+        try:
+            mtime_ns = os.stat(os.path.join(vault_path, rel_path)).st_mtime_ns
+        except OSError:
+            continue
+        ranked.append((rel_path, 1.0 if exact else 0.5, mtime_ns))
+    ranked.sort(key=lambda item: (-item[1], -item[2], item[0]))
+    return _page(vault_path, f"tag:{key}", [(p, s) for p, s, _ in ranked], [key], limit, cursor, max_bytes)
+
+
+def outline(text: str) -> List[Dict]:
+    """Headings of a note (outside code blocks) with their level and 1-based line number."""
+    return [{"heading": title, "level": level, "line": i + 1} for i, level, title in iter_headings(text.splitlines())]
+
+
+def section_range(text: str, heading: str) -> Optional[Tuple[int, int]]:
+    """
+    1-based inclusive line range of the section under `heading` (matched case-insensitively,
+    with or without leading #'s), ending before the next heading of the same or a higher level.
+    """
+    wanted = heading.strip().lstrip("#").strip().lower()
+    headings = outline(text)
+    total = len(text.splitlines())
+    for i, h in enumerate(headings):
+        if h["heading"].lower() != wanted:
+            continue
+        end = total
+        for later in headings[i + 1:]:
+            if later["level"] <= h["level"]:
+                end = later["line"] - 1
+                break
+        return h["line"], end
+    return None
+
+
+def read_section(vault_path: str, rel_path: str, heading: Optional[str] = None, start_line: Optional[int] = None,
+                 end_line: Optional[int] = None, max_bytes: int = DEFAULT_MAX_BYTES) -> Dict:
+    """
+    Returns part of a note: the section under `heading`, or lines start_line..end_line (1-based,
+    inclusive). Without either, returns the note's outline and its first lines. Content past
+    `max_bytes` is cut at a line boundary and `next_line` says where to continue.
+    """
+    text = _read(vault_path, rel_path)
+    if text is None:
+        return {"error": f"Note '{rel_path}' not found."}
+    lines = text.splitlines()
+    result: Dict = {"file_name": rel_path, "total_lines": len(lines)}
+
+    if heading:
+        found = section_range(text, heading)
+        if found is None:
+            result["error"] = f"Heading '{heading}' not found."
+            result["headings"] = [h["heading"] for h in outline(text)]
+            return result
+        start, end = found
+        if start_line:
+            start = max(start, int(start_line))
+    elif start_line or end_line:
+        start = max(int(start_line or 1), 1)
+        end = min(int(end_line or len(lines)), len(lines))
+    else:
+        result["headings"] = outline(text)
+        start, end = 1, len(lines)
+
+    room = max_bytes - _size(result) - 64
+    content, line = [], start
+    while line <= end:
+        cost = len(lines[line - 1].encode("utf-8")) + 1
+        if content and cost > room:
+            break
+        content.append(lines[line - 1])
+        room -= cost
+        line += 1
+    result.update({"start_line": start, "end_line": line - 1, "content": "\n".join(content)})
+    if line <= end:
+        result["next_line"] = line
+    return result
@@ -0,0 +1,152 @@
+"""
+Note writes for Obsidian Assistant
+
+Inserts content into a note without rewriting what is already there when it
+can: content that lands at the end of the file is written with a plain
+append, so a one-line journal entry costs one line of I/O. Content that lands
+mid-file (under a heading followed by other sections, or after a marker) is
+written to a temp file next to the note and renamed over it, so a crash or a
+concurrent git pull never leaves a half-written note.
+
+Every write returns a NoteEdit with the inserted lines, which the indexes
+merge directly instead of re-reading the note.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from tools.note_search import section_range
+
+# Attempts before giving up when the note keeps changing underneath a rewrite.
+WRITE_RETRIES = 3
+
+
+class NoteEdit(NamedTuple):
+    """Lines inserted into a note and the note's stat signature right after the write."""
+    path: str
+    start_line: int
+    end_line: int
+    text: str
+    appended: bool
+    mtime_ns: int
+    size: int
+    inode: int
+
+
+class NoteChangedError(Exception):
+    """The note kept changing while it was being rewritten."""
+
+
+# One writer per note at a time within this process.
+_locks: Dict[str, threading.Lock] = {}
+_locks_lock = threading.Lock()
+
+
+def _note_lock(path: str) -> threading.Lock:
+    with _locks_lock:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = threading.Lock()
+        return lock
+
+
+def _signature(st: os.stat_result) -> Tuple[int, int, int]:
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def write_atomic(path: str, text: str):
+    """Writes `text` to a temp file in the note's folder and renames it over `path`."""
+    folder = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _insertion_point(text: str, heading: Optional[str], marker: Optional[str]) -> Tuple[int, str]:
+    """
+    Returns (offset, separator): where the content goes and what precedes it. Under a heading
+    it goes after the section's last non-blank line; after a marker, on the line below it;
+    otherwise at the end of the note, one blank line below the existing text.
+    """
+    lines = text.splitlines(keepends=True)
+    if heading:
+        found = section_range(text, heading)
+        if found:
+            start, end = found
+            last = end
+            while last > start and not lines[last - 1].strip():
+                last -= 1
+            return sum(len(l) for l in lines[:last]), "\n"
+    if marker:
+        at = text.find(marker)
+        if at >= 0:
+            line_end = text.find("\n", at)
+            return (len(text) if line_end < 0 else line_end + 1), "\n"
+    return len(text), "\n\n"
+
+
+def insert_into_note(path: str, content: str, heading: Optional[str] = None,
+                     marker: Optional[str] = None) -> NoteEdit:
+    """
+    Inserts `content` as whole lines at the end of the section under `heading`, below the
+    first line containing `marker`, or at the end of the note (first match wins). A heading
+    that matches nothing is started at the end of the note. Returns the inserted range;
+    raises FileNotFoundError if the note does not exist.
+    """
+    content = content.rstrip("\n") + "\n"
+    with _note_lock(os.path.abspath(path)):
+        for _ in range(WRITE_RETRIES):
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                before = _signature(os.fstat(f.fileno()))
+                text = f.read()
+            offset, separator = _insertion_point(text, heading, marker)
+            head, tail = text[:offset], text[offset:]
+            at_end = not tail.strip()
+            if at_end:
+                # Trailing blank lines stay put; the content goes after them.
+                head, tail = text, ""
+
+            if not head:
+                prefix = ""
+            elif separator == "\n\n" and at_end:
+                prefix = "\n" if head.endswith("\n") else "\n\n"
+            else:
+                prefix = "" if head.endswith("\n") else "\n"
+            body = content
+            if heading and section_range(text, heading) is None and not (marker and marker in text):
+                body = f"## {heading.strip().lstrip('#').strip()}\n" + content
+            inserted = prefix + body
+            start_line = (head + prefix).count("\n") + 1
+            end_line = start_line + body.count("\n") - 1
+
+            if at_end:
+                with open(path, "a", encoding="utf-8", newline="") as f:
+                    if _signature(os.fstat(f.fileno())) != before:
+                        continue
+                    f.write(inserted)
+                    f.flush()
+                    after = os.fstat(f.fileno())
+            else:
+                new_text = head + inserted + tail
+                if _signature(os.stat(path)) != before:
+                    continue
+                write_atomic(path, new_text)
+                after = os.stat(path)
+            return NoteEdit(path, start_line, end_line, body, at_end,
+                            after.st_mtime_ns, after.st_size, after.st_ino)
+    raise NoteChangedError(f"{path} changed during {WRITE_RETRIES} write attempts.")
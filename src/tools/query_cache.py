@@ -0,0 +1,66 @@
+"""
+Search result cache for the vault knowledge base.
+
+LRU cache keyed by (normalized query, top_k, filters, index generation). The
+generation goes up after every sync that changed the vector table, so a
+cached result is never served once the notes behind it were edited.
+"""
+
+import re
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+MAX_ENTRIES = 256
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case-folds, collapses whitespace and trims surrounding punctuation."""
+    return _SPACE_RE.sub(" ", query.casefold()).strip(" \t\n?!.,;:\"'")
+
+
+class QueryCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, List[Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, query: str, top_k: int, filters: Optional[Dict[str, Any]] = None, generation: Optional[int] = None) -> tuple:
+        filters_key = json.dumps(filters, sort_keys=True, default=str) if filters else ""
+        return (normalize_query(query), top_k, filters_key, self.generation if generation is None else generation)
+
+    def get(self, key: tuple) -> Optional[List[Any]]:
+        with self._lock:
+            results = self._entries.get(key)
+            if results is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(results)
+
+    def put(self, key: tuple, results: List[Any]):
+        with self._lock:
+            if key[-1] != self.generation:
+                # The index changed while this search ran; its results may already be stale.
+                return
+            self._entries[key] = list(results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bump(self):
+        """Starts a new index generation; everything cached so far is dropped."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "generation": self.generation, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,228 @@
+"""
+Conversation sessions for the WhatsApp bot.
+
+Maps each sender to its own agno session (a per-conversation copy of the
+workflow with its own session id) and keeps at most `max_sessions` of them,
+least recently used first out. A session idle for longer than `ttl` is ended
+on its next message or by sweep(), which start() runs every `sweep_interval`
+seconds on a background thread: its history is deleted from agent storage
+and the sender starts over with a fresh session id.
+
+Handlers hold their session through use(), which counts it as busy: busy
+sessions are never evicted or expired (the manager goes over `max_sessions`
+instead), and a busy session that is cleared ends once its last user is done.
+"""
+
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional
+
+from tools.telemetry import traced
+
+SESSION_TTL = 4 * 60 * 60
+MAX_SESSIONS = 100
+# Seconds between background sweeps for idle sessions
+SWEEP_INTERVAL = 5 * 60
+
+
+class Session:
+    def __init__(self, sender: str, session_id: str, workflow: Any, created_at: Optional[float] = None):
+        self.sender = sender
+        self.session_id = session_id
+        self.workflow = workflow
+        self.created_at = time.time() if created_at is None else created_at
+        self.last_active = self.created_at
+        # Held while the workflow is built, so concurrent first messages build it once.
+        self.lock = threading.Lock()
+        # Handlers currently inside use(); guarded by the manager's lock.
+        self.in_use = 0
+        # Set when the session was removed while busy; it ends when in_use drops to 0.
+        self.end_reason: Optional[str] = None
+
+
+class SessionManager:
+    def __init__(self, factory: Callable[[str, str], Any], ttl: float = SESSION_TTL,
+                 max_sessions: int = MAX_SESSIONS, sweep_interval: float = SWEEP_INTERVAL,
+                 clock: Callable[[], float] = time.time):
+        """
+        :param factory: Called as factory(sender, session_id) to build a session's workflow.
+            The workflow's end_session() (if any) is called when the session ends.
+        :param ttl: Seconds of inactivity after which a session ends.
+        :param max_sessions: Sessions kept; should be at least the number of dispatcher workers.
+        :param sweep_interval: Seconds between sweeps once start() was called.
+        :param clock: Returns the current time in seconds; injectable for tests.
+        """
+        self.factory = factory
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        # sender -> Session, least recently active first
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._expired = 0
+        self._evicted = 0
+        self._cleared = 0
+        self._stop_sweeping = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+
+    # ----------------- Internal Utilities -----------------
+
+    def _expired_sessions(self, now: float) -> List[Session]:
+        """Pops idle sessions past the TTL; busy ones are kept. Caller holds _lock."""
+        ended = []
+        # Ordered by last_active (_get and _release move sessions to the end), so the first
+        # one still within the TTL ends the scan.
+        for sender, session in list(self._sessions.items()):
+            if now - session.last_active <= self.ttl:
+                break
+            if session.in_use:
+                continue
+            del self._sessions[sender]
+            ended.append(session)
+        self._expired += len(ended)
+        return ended
+
+    def _evicted_sessions(self, keep: str) -> List[Session]:
+        """Pops the least recently active idle sessions over max_sessions, except `keep`'s. Caller holds _lock."""
+        evicted = []
+        for sender, session in list(self._sessions.items()):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if session.in_use or sender == keep:
+                continue
+            del self._sessions[sender]
+            evicted.append(session)
+        self._evicted += len(evicted)
+        return evicted
+
+    @traced("sessions.get")
+    def _get(self, sender: str, acquire: bool) -> Session:
+        now = self.clock()
+        with self._lock:
+            expired = self._expired_sessions(now)
+            session = self._sessions.get(sender)
+            evicted = []
+            if session is None:
+                session = Session(sender, f"{sender}:{uuid.uuid4().hex[:12]}", None, created_at=now)
+                self._sessions[sender] = session
+                self._created += 1
+            session.last_active = now
+            self._sessions.move_to_end(sender)
+            if acquire:
+                session.in_use += 1
+            if len(self._sessions) > self.max_sessions:
+                evicted = self._evicted_sessions(keep=sender)
+
+        self._end(expired, "idle")
+        self._end(evicted, "evicted")
+        if session.workflow is None:
+            # Built outside the manager's lock (it may be slow) but under the session's own.
+            with session.lock:
+                if session.workflow is None:
+                    session.workflow = self.factory(sender, session.session_id)
+        return session
+
+    def _release(self, session: Session):
+        with self._lock:
+            session.in_use -= 1
+            session.last_active = self.clock()
+            if self._sessions.get(session.sender) is session:
+                self._sessions.move_to_end(session.sender)
+            reason = session.end_reason if not session.in_use else None
+        if reason:
+            self._end([session], reason)
+
+    @staticmethod
+    def _end(sessions: List[Session], reason: str):
+        for session in sessions:
+            print(f"🧹 Ending session {session.session_id} ({reason})")
+            end_session = getattr(session.workflow, "end_session", None)
+            if end_session is None:
+                continue
+            try:
+                end_session()
+            except Exception as e:
+                print(f"⚠️ Failed to delete history of session {session.session_id}: {e}")
+
+    # ----------------- Core Methods -----------------
+
+    def get(self, sender: str) -> Session:
+        """
+        Returns the sender's session, starting a new one if there is none or it timed out.
+        The session isn't marked busy; handlers that run its workflow should use use().
+        """
+        return self._get(sender, acquire=False)
+
+    @contextmanager
+    def use(self, sender: str) -> Iterator[Session]:
+        """Like get(), and keeps the session from being evicted, expired or ended until the block exits."""
+        session = self._get(sender, acquire=True)
+        try:
+            yield session
+        finally:
+            self._release(session)
+
+    def clear(self, sender: str) -> bool:
+        """
+        Ends the sender's session and deletes its history; returns whether there was one.
+        A busy session is removed right away and ended when its handler is done.
+        """
+        with self._lock:
+            session = self._sessions.pop(sender, None)
+            if session:
+                self._cleared += 1
+                if session.in_use:
+                    session.end_reason = "cleared"
+                    return True
+        if session is None:
+            return False
+        self._end([session], "cleared")
+        return True
+
+    def sweep(self) -> int:
+        """Ends sessions idle past the TTL; returns how many ended."""
+        with self._lock:
+            expired = self._expired_sessions(self.clock())
+        self._end(expired, "idle")
+        return len(expired)
+
+    def _sweep_loop(self):
+        while not self._stop_sweeping.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"⚠️ Session sweep failed: {e}")
+
+    def start(self):
+        """Starts sweeping for idle sessions every `sweep_interval` seconds. Idempotent."""
+        if self._sweeper is not None:
+            return
+        self._stop_sweeping.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stops the background sweeps."""
+        self._stop_sweeping.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout)
+            self._sweeper = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "busy": sum(1 for session in self._sessions.values() if session.in_use),
+                "created": self._created,
+                "expired": self._expired,
+                "evicted": self._evicted,
+                "cleared": self._cleared,
+            }
@@ -0,0 +1,175 @@
+"""
+Sync index for the vault embedder.
+
+SQLite (WAL) store of path -> content hash, stat signature and chunk ids.
+Writes happen in small transactions next to the matching vector writes, so a
+crash mid-sync leaves at most a few rows for reconcile() to repair instead of
+an index that disagrees with the vector table.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+SYNC_INDEX_FILENAME = "sync_index.db"
+
+
+class SyncIndex:
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                hash TEXT,
+                mtime_ns INTEGER,
+                size INTEGER,
+                ino INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                "end" INTEGER NOT NULL,
+                heading TEXT NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
+
+    # ----------------- Internal Utilities -----------------
+
+    def _execute(self, sql: str, params: Iterable = ()):
+        with self._lock:
+            return self._conn.execute(sql, tuple(params))
+
+    @contextmanager
+    def transaction(self):
+        """Groups index writes into one atomic commit."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # ----------------- Reads -----------------
+
+    def __len__(self) -> int:
+        return self._execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def __contains__(self, path: str) -> bool:
+        return self._execute("SELECT 1 FROM files WHERE path = ?", (path,)).fetchone() is not None
+
+    def synced_count(self) -> int:
+        """Notes whose vectors are all in the table (they have their stat signature back)."""
+        return self._execute("SELECT COUNT(*) FROM files WHERE mtime_ns IS NOT NULL").fetchone()[0]
+
+    def paths(self) -> Set[str]:
+        return {row[0] for row in self._execute("SELECT path FROM files")}
+
+    def signatures(self) -> Dict[str, Tuple[int, int, int]]:
+        """Returns path -> (mtime_ns, size, inode) for every indexed note, in one query."""
+        rows = self._execute("SELECT path, mtime_ns, size, ino FROM files")
+        return {path: (mtime_ns, size, ino) for path, mtime_ns, size, ino in rows}
+
+    def get(self, path: str) -> Optional[dict]:
+        """Returns {"hash", "mtime_ns", "size", "ino", "chunks": {id: [start, end, heading]}} or None."""
+        row = self._execute("SELECT hash, mtime_ns, size, ino FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return None
+        chunks = self._execute('SELECT id, start, "end", heading FROM chunks WHERE path = ?', (path,))
+        return {
+            "hash": row[0], "mtime_ns": row[1], "size": row[2], "ino": row[3],
+            "chunks": {chunk_id: [start, end, heading] for chunk_id, start, end, heading in chunks},
+        }
+
+    def chunk_ids(self) -> Set[str]:
+        return {row[0] for row in self._execute("SELECT id FROM chunks")}
+
+    def paths_for_chunks(self, ids: Iterable[str]) -> Set[str]:
+        ids = list(ids)
+        paths = set()
+        for i in range(0, len(ids), 500):
+            part = ids[i:i + 500]
+            rows = self._execute(f"SELECT DISTINCT path FROM chunks WHERE id IN ({', '.join('?' * len(part))})", part)
+            paths.update(row[0] for row in rows)
+        return paths
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # ----------------- Writes -----------------
+
+    def set_meta(self, key: str, value: Optional[str]):
+        if value is None:
+            self._execute("DELETE FROM meta WHERE key = ?", (key,))
+        else:
+            self._execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def put_file(self, path: str, hash: Optional[str], mtime_ns: Optional[int] = None,
+                 size: Optional[int] = None, ino: Optional[int] = None):
+        self._execute(
+            "INSERT OR REPLACE INTO files (path, hash, mtime_ns, size, ino) VALUES (?, ?, ?, ?, ?)",
+            (path, hash, mtime_ns, size, ino),
+        )
+
+    def invalidate_file(self, path: str):
+        """Clears a note's stat signature so the next sync re-reads and re-diffs it."""
+        self._execute("UPDATE files SET hash = NULL, mtime_ns = NULL, size = NULL, ino = NULL WHERE path = ?", (path,))
+
+    def remove_file(self, path: str) -> List[str]:
+        """Drops a note and its chunks; returns the removed chunk ids."""
+        ids = [row[0] for row in self._execute("SELECT id FROM chunks WHERE path = ?", (path,))]
+        self._execute("DELETE FROM chunks WHERE path = ?", (path,))
+        self._execute("DELETE FROM files WHERE path = ?", (path,))
+        return ids
+
+    def put_chunks(self, path: str, chunks: Dict[str, list]):
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO chunks (id, path, start, "end", heading) VALUES (?, ?, ?, ?, ?)',
+                [(chunk_id, path, span[0], span[1], span[2]) for chunk_id, span in chunks.items()],
+            )
+
+    def remove_chunks(self, ids: Iterable[str]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", [(chunk_id,) for chunk_id in ids])
+
+    def clear(self):
+        with self.transaction():
+            self._execute("DELETE FROM chunks")
+            self._execute("DELETE FROM files")
+
+    def import_json(self, json_file: str) -> int:
+        """One-time migration from the old .vault_index.json; returns the number of imported notes."""
+        with open(json_file, encoding="utf-8") as f:
+            data = json.load(f)
+        with self.transaction():
+            for path, entry in data.items():
+                if not isinstance(entry, dict):
+                    entry = {"hash": entry}
+                if "chunks" in entry:
+                    self.put_file(path, entry.get("hash"), entry.get("mtime_ns"), entry.get("size"), entry.get("ino"))
+                    self.put_chunks(path, entry["chunks"])
+                elif entry.get("hash"):
+                    # Whole-note vector from before chunking: keep its id so the next
+                    # sync replaces it, and no stat signature so that sync re-reads the note.
+                    self.put_file(path, entry["hash"])
+                    self.put_chunks(path, {entry["hash"]: [0, 0, ""]})
+        return len(data)
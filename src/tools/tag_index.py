@@ -0,0 +1,261 @@
+"""
+Tag Index for Obsidian Assistant
+
+Persistent tag -> notes and note -> tags index for the vault.
+Each note is re-parsed only when its (mtime, size) changes, and the index is
+stored under .assistant/ so a restart does not need to read the vault again.
+"""
+
+import os
+import re
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from tools.ignore_rules import get_ignore_rules
+from tools.vault_index import REFRESH_INTERVAL, scan_markdown
+
+TAG_INDEX_FILENAME = "tag_index.json"
+TAG_INDEX_VERSION = 1
+
+_TAG_RE = re.compile(r"(?<![\w&#])#([\w][\w/-]*)")
+
+
+def extract_tags(text: str) -> List[str]:
+    """Returns the tags of a note in order of first appearance, including the leading '#'."""
+    seen = {}
+    for match in _TAG_RE.finditer(text):
+        tag = "#" + match.group(1).rstrip("/-")
+        seen.setdefault(tag.lower(), tag)
+    return list(seen.values())
+
+
+class TagIndex:
+    def __init__(self, vault_path: str):
+        self.vault_path = os.path.abspath(vault_path)
+        self.index_path = os.path.join(self.vault_path, ".assistant", TAG_INDEX_FILENAME)
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._watched = False
+        self._last_refresh = 0.0
+        # Notes changed since the last save; written out once per batch of updates.
+        self._dirty = False
+
+        # rel_path -> {"mtime_ns", "size", "tags"}
+        self._notes: Dict[str, dict] = {}
+        # lowercased tag -> notes using it
+        self._tag_notes: Dict[str, Set[str]] = {}
+        # lowercased tag -> spelling shown to the agent
+        self._display: Dict[str, str] = {}
+        # lowercased tag -> nested tags in use below it ("#a" -> {"#a/b", "#a/b/c"})
+        self._descendants: Dict[str, Set[str]] = {}
+
+    # ----------------- Internal Utilities -----------------
+
+    def _rel(self, path: str) -> str:
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.vault_path)
+        return os.path.normpath(path.lstrip("/\\"))
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == TAG_INDEX_VERSION:
+                for rel_path, entry in data.get("notes", {}).items():
+                    self._set_note(rel_path, entry)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading tag index from {self.index_path}: {e}")
+        self._dirty = False
+        self._loaded = True
+
+    def _save(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": TAG_INDEX_VERSION, "notes": self._notes}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            print(f"Error saving tag index to {self.index_path}: {e}")
+            self._dirty = True
+
+    @staticmethod
+    def _ancestors(key: str) -> List[str]:
+        """'#a/b/c' -> ['#a', '#a/b']."""
+        parts = key.split("/")
+        return ["/".join(parts[:depth]) for depth in range(1, len(parts))]
+
+    def _add_tag(self, key: str):
+        for ancestor in self._ancestors(key):
+            self._descendants.setdefault(ancestor, set()).add(key)
+
+    def _drop_tag(self, key: str):
+        del self._tag_notes[key]
+        self._display.pop(key, None)
+        for ancestor in self._ancestors(key):
+            nested = self._descendants.get(ancestor)
+            if nested is not None:
+                nested.discard(key)
+                if not nested:
+                    del self._descendants[ancestor]
+
+    def _set_note(self, rel_path: str, entry: Optional[dict]):
+        old = self._notes.pop(rel_path, None)
+        if old:
+            for tag in old["tags"]:
+                key = tag.lower()
+                notes = self._tag_notes.get(key)
+                if notes is not None:
+                    notes.discard(rel_path)
+                    if not notes:
+                        self._drop_tag(key)
+        self._dirty = self._dirty or old is not None or entry is not None
+        if entry is None:
+            return
+
+        self._notes[rel_path] = entry
+        for tag in entry["tags"]:
+            key = tag.lower()
+            if key not in self._tag_notes:
+                self._tag_notes[key] = set()
+                self._add_tag(key)
+            self._tag_notes[key].add(rel_path)
+            self._display.setdefault(key, tag)
+
+    def _parse_note(self, rel_path: str, mtime_ns: int, size: int) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.vault_path, rel_path), "r", encoding="utf-8") as f:
+                tags = extract_tags(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading file {rel_path}: {e}")
+            return None
+        return {"mtime_ns": mtime_ns, "size": size, "tags": tags}
+
+    def _update_file(self, path: str):
+        rel_path = self._rel(path)
+        if not rel_path.endswith(".md") or get_ignore_rules(self.vault_path).ignored(rel_path):
+            return
+        with self._lock:
+            if not self._loaded:
+                return
+            try:
+                st = os.stat(os.path.join(self.vault_path, rel_path))
+                old = self._notes.get(rel_path)
+                if old and old["mtime_ns"] == st.st_mtime_ns and old["size"] == st.st_size:
+                    return
+                entry = self._parse_note(rel_path, st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                entry = None
+            self._set_note(rel_path, entry)
+
+    # ----------------- Core Methods -----------------
+
+    def refresh(self, force: bool = False):
+        """Re-parses notes whose (mtime, size) changed and drops deleted notes."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                force = True
+            if not force and (self._watched or time.time() - self._last_refresh < REFRESH_INTERVAL):
+                return
+
+            current = scan_markdown(self.vault_path)
+            for rel_path in set(self._notes) - set(current):
+                self._set_note(rel_path, None)
+            for rel_path, (mtime_ns, size, _) in current.items():
+                entry = self._notes.get(rel_path)
+                if entry and entry["mtime_ns"] == mtime_ns and entry["size"] == size:
+                    continue
+                self._set_note(rel_path, self._parse_note(rel_path, mtime_ns, size))
+
+            self._save()
+            self._last_refresh = time.time()
+
+    def update_file(self, path: str):
+        """Re-parses a single note after it was created, changed or removed."""
+        with self._lock:
+            self._update_file(path)
+            self._save()
+
+    def apply_edit(self, edit):
+        """Adds the tags of lines inserted by note_writer without re-reading the note."""
+        rel_path = self._rel(edit.path)
+        with self._lock:
+            if not self._loaded:
+                return
+            old = self._notes.get(rel_path)
+            if old is None:
+                self.update_file(rel_path)
+                return
+            known = {tag.lower() for tag in old["tags"]}
+            tags = list(old["tags"]) + [tag for tag in extract_tags(edit.text) if tag.lower() not in known]
+            self._set_note(rel_path, {"mtime_ns": edit.mtime_ns, "size": edit.size, "tags": tags})
+            self._save()
+
+    def attach_watcher(self, watcher):
+        """Subscribes to the vault watcher; from then on reads skip the periodic rescans."""
+        with self._lock:
+            self._watched = True
+        watcher.subscribe(self.apply_changes)
+
+    def apply_changes(self, paths: Optional[Set[str]]):
+        """Vault watcher callback (see attach_watcher)."""
+        with self._lock:
+            self._watched = True
+            if paths is None:
+                self.refresh(force=True)
+                return
+            for path in paths:
+                self._update_file(path)
+            self._save()
+
+    def tags(self) -> List[str]:
+        self.refresh()
+        with self._lock:
+            return sorted(self._display.values(), key=str.lower)
+
+    def tag_counts(self) -> Dict[str, int]:
+        """Returns tag -> number of notes using it, most used first."""
+        self.refresh()
+        with self._lock:
+            counts = {self._display[key]: len(notes) for key, notes in self._tag_notes.items()}
+        return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0].lower())))
+
+    def notes_with_tag(self, tag: str) -> List[str]:
+        """Returns notes tagged with `tag` or one of its nested tags (tag/child)."""
+        key = "#" + tag.lstrip("#").lower()
+        self.refresh()
+        with self._lock:
+            notes = set(self._tag_notes.get(key, ()))
+            for nested in self._descendants.get(key, ()):
+                notes |= self._tag_notes[nested]
+        return sorted(notes)
+
+    def tags_for_note(self, path: str) -> List[str]:
+        self.refresh()
+        with self._lock:
+            entry = self._notes.get(self._rel(path))
+            return list(entry["tags"]) if entry else []
+
+
+_indexes: Dict[str, TagIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_tag_index(vault_path: str) -> TagIndex:
+    """Returns the tag index for a vault, loading it on first use."""
+    key = os.path.abspath(vault_path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = TagIndex(key)
+        return index
@@ -0,0 +1,279 @@
+"""
+Local tag suggester for Obsidian Assistant
+
+Suggests tags for the lines of a message from the vault's own tagging habits:
+for every word, how often lines containing it carry each tag, plus direct
+mentions of a tag's name. Lines whose best suggestion is clearly strong (tag
+it) or clearly weak (leave it) are decided locally; anything in between, and
+weak lines made mostly of words the vault has too little data on, lowers the
+confidence of the whole message so the caller can fall back to the LLM
+tagger.
+"""
+
+import os
+import re
+import math
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from tools.ignore_rules import get_ignore_rules
+from tools.tag_index import extract_tags
+from tools.vault_index import REFRESH_INTERVAL, scan_markdown
+
+# A suggestion at or above ACCEPT_SCORE is added; a line whose best suggestion is
+# below REJECT_SCORE stays untagged. Anything in between is left to the LLM.
+ACCEPT_SCORE = 0.55
+REJECT_SCORE = 0.2
+MAX_TAGS_PER_LINE = 3
+# Words seen on fewer lines than this carry no evidence.
+MIN_WORD_LINES = 2
+# A line with no candidate above REJECT_SCORE is only left untagged with confidence
+# when at least this share of its words carry evidence; otherwise it is undecided.
+MIN_KNOWN_WORD_SHARE = 0.5
+
+_TOKEN_RE = re.compile(r"\w+")
+_TAG_TOKEN_RE = re.compile(r"(?<![\w&#])#[\w][\w/-]*")
+
+
+def _words(line: str) -> Set[str]:
+    return {w for w in _TOKEN_RE.findall(_TAG_TOKEN_RE.sub(" ", line).lower()) if len(w) > 1 and not w.isdigit()}
+
+
+def _tag_words(tag: str) -> List[str]:
+    """Words of a tag's own name: '#emotion/tough_day' -> ['tough', 'day']."""
+    leaf = tag.lstrip("#").lower().rsplit("/", 1)[-1]
+    return [w for w in re.split(r"[_\-]", leaf) if w]
+
+
+def _names_tag(words: Set[str], tag: str) -> bool:
+    """Whether every word of the tag's name appears in `words` (allowing plurals like 'books')."""
+    wanted = _tag_words(tag)
+    return bool(wanted) and all(
+        any(w == want or (len(want) > 2 and w.startswith(want) and len(w) - len(want) <= 2) for w in words)
+        for want in wanted
+    )
+
+
+class LineSuggestion(NamedTuple):
+    line: str
+    tags: List[str]
+    scores: Dict[str, float]
+    confident: bool
+
+
+class TagSuggestion(NamedTuple):
+    lines: List[LineSuggestion]
+    text: str
+    confident: bool
+
+
+class TagSuggester:
+    def __init__(self, vault_path: str):
+        self.vault_path = os.path.abspath(vault_path)
+        self._lock = threading.RLock()
+        self._built = False
+        self._watched = False
+        self._last_refresh = 0.0
+
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        # rel_path -> (word -> lines, (word, tag) -> lines, tag -> lines, lines), kept to retract a note's counts
+        self._note_counts: Dict[str, tuple] = {}
+        self._word_lines: Counter = Counter()
+        self._cooc: Counter = Counter()
+        self._tag_lines: Counter = Counter()
+        self._display: Dict[str, str] = {}
+        self._lines = 0
+
+    # ----------------- Internal Utilities -----------------
+
+    def _rel(self, path: str) -> str:
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.vault_path)
+        return os.path.normpath(path.lstrip("/\\"))
+
+    def _count_note(self, text: str) -> tuple:
+        words, cooc, tags, lines = Counter(), Counter(), Counter(), 0
+        for line in text.splitlines():
+            line_words = _words(line)
+            if not line_words:
+                continue
+            lines += 1
+            words.update(line_words)
+            for tag in extract_tags(line):
+                key = tag.lower()
+                self._display.setdefault(key, tag)
+                tags[key] += 1
+                for word in line_words:
+                    cooc[(word, key)] += 1
+        return words, cooc, tags, lines
+
+    def _set_note(self, rel_path: str, counts: Optional[tuple]):
+        old = self._note_counts.pop(rel_path, None)
+        if old:
+            self._word_lines.subtract(old[0])
+            self._cooc.subtract(old[1])
+            self._tag_lines.subtract(old[2])
+            self._lines -= old[3]
+        if counts is None:
+            return
+        self._note_counts[rel_path] = counts
+        self._word_lines.update(counts[0])
+        self._cooc.update(counts[1])
+        self._tag_lines.update(counts[2])
+        self._lines += counts[3]
+
+    def _read_note(self, rel_path: str) -> Optional[tuple]:
+        try:
+            with open(os.path.join(self.vault_path, rel_path), "r", encoding="utf-8") as f:
+                return self._count_note(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading file {rel_path}: {e}")
+            return None
+
+    def _known_share(self, words: Set[str]) -> float:
+        """Share of `words` seen on enough lines of the vault to carry evidence."""
+        if not words:
+            return 0.0
+        return sum(1 for word in words if self._word_lines.get(word, 0) >= MIN_WORD_LINES) / len(words)
+
+    def _score_line(self, line: str) -> Dict[str, float]:
+        words = _words(line)
+        if not words:
+            return {}
+        scores: Dict[str, float] = {}
+
+        # Evidence from words: P(tag | word) over the vault's lines, weighted by how rare the word is.
+        total_weight = 0.0
+        evidence: Counter = Counter()
+        for word in words:
+            seen = self._word_lines.get(word, 0)
+            if seen < MIN_WORD_LINES:
+                continue
+            weight = math.log(1 + self._lines / seen)
+            total_weight += weight
+            for tag in self._tag_lines:
+                if self._tag_lines[tag] <= 0:
+                    continue
+                together = self._cooc.get((word, tag), 0)
+                if together:
+                    evidence[tag] += weight * together / seen
+        if total_weight:
+            for tag, value in evidence.items():
+                scores[tag] = value / total_weight
+
+        # A tag named in the line ("finished the book") is strong evidence on its own.
+        for tag in self._tag_lines:
+            if self._tag_lines[tag] > 0 and _names_tag(words, tag):
+                scores[tag] = max(scores.get(tag, 0.0), 0.8)
+        return {tag: round(score, 3) for tag, score in scores.items() if self._tag_lines[tag] > 0}
+
+    # ----------------- Core Methods -----------------
+
+    def refresh(self, force: bool = False):
+        """Re-reads notes whose (mtime, size) changed and drops deleted notes."""
+        with self._lock:
+            if self._built and not force and (self._watched or time.time() - self._last_refresh < REFRESH_INTERVAL):
+                return
+            current = scan_markdown(self.vault_path)
+            for rel_path in set(self._stats) - set(current):
+                self._set_note(rel_path, None)
+                del self._stats[rel_path]
+            for rel_path, (mtime_ns, size, _) in current.items():
+                if self._stats.get(rel_path) == (mtime_ns, size):
+                    continue
+                self._set_note(rel_path, self._read_note(rel_path))
+                self._stats[rel_path] = (mtime_ns, size)
+            self._built = True
+            self._last_refresh = time.time()
+
+    def update_file(self, path: str):
+        """Re-reads a single note after it was created, changed or removed."""
+        rel_path = self._rel(path)
+        if not rel_path.endswith(".md") or get_ignore_rules(self.vault_path).ignored(rel_path):
+            return
+        with self._lock:
+            if not self._built:
+                return
+            try:
+                st = os.stat(os.path.join(self.vault_path, rel_path))
+            except FileNotFoundError:
+                self._set_note(rel_path, None)
+                self._stats.pop(rel_path, None)
+                return
+            if self._stats.get(rel_path) == (st.st_mtime_ns, st.st_size):
+                return
+            self._set_note(rel_path, self._read_note(rel_path))
+            self._stats[rel_path] = (st.st_mtime_ns, st.st_size)
+
+    def apply_edit(self, edit):
+        """Counts the lines inserted by note_writer without re-reading the note."""
+        rel_path = self._rel(edit.path)
+        with self._lock:
+            if not self._built:
+                return
+            old = self._note_counts.get(rel_path)
+            if old is None:
+                self.update_file(rel_path)
+                return
+            added = self._count_note(edit.text)
+            self._set_note(rel_path, (old[0] + added[0], old[1] + added[1], old[2] + added[2], old[3] + added[3]))
+            self._stats[rel_path] = (edit.mtime_ns, edit.size)
+
+    def attach_watcher(self, watcher):
+        """Subscribes to the vault watcher; from then on reads skip the periodic rescans."""
+        with self._lock:
+            self._watched = True
+        watcher.subscribe(self.apply_changes)
+
+    def apply_changes(self, paths: Optional[Set[str]]):
+        """Vault watcher callback (see attach_watcher)."""
+        with self._lock:
+            self._watched = True
+            if paths is None:
+                self.refresh(force=True)
+                return
+            for path in paths:
+                self.update_file(path)
+
+    def suggest(self, text: str) -> TagSuggestion:
+        """
+        Suggests up to MAX_TAGS_PER_LINE existing tags for each line of `text`. Returns the
+        lines with their suggestions, the text with the accepted tags appended to each line,
+        and whether every line was decided with confidence.
+        """
+        self.refresh()
+        results, out_lines = [], []
+        with self._lock:
+            for line in text.splitlines():
+                existing = {tag.lower() for tag in extract_tags(line)}
+                scores = {t: s for t, s in self._score_line(line).items() if t not in existing}
+                ranked = sorted(scores.items(), key=lambda item: -item[1])
+                tags = [self._display[t] for t, s in ranked[:MAX_TAGS_PER_LINE] if s >= ACCEPT_SCORE]
+                # Decided: already tagged, nothing to tag, at least one clear tag, or every candidate
+                # clearly weak on words the vault knows well enough to rule tags out.
+                words = _words(line)
+                undecided = any(REJECT_SCORE <= s < ACCEPT_SCORE for _, s in ranked[:MAX_TAGS_PER_LINE])
+                rejected = not undecided and self._known_share(words) >= MIN_KNOWN_WORD_SHARE
+                confident = bool(existing) or not words or bool(tags) or rejected
+                results.append(LineSuggestion(line, tags, dict(ranked[:5]), confident))
+                out_lines.append(line + "".join(" " + tag for tag in tags) if tags else line)
+        return TagSuggestion(results, "\n".join(out_lines), all(r.confident for r in results))
+
+
+# Single suggester per vault.
+_suggesters: Dict[str, TagSuggester] = {}
+_suggesters_lock = threading.Lock()
+
+
+def get_tag_suggester(vault_path: str) -> TagSuggester:
+    """Returns the tag suggester for a vault, building it on first use."""
+    key = os.path.abspath(vault_path)
+    with _suggesters_lock:
+        suggester = _suggesters.get(key)
+        if suggester is None:
+            suggester = _suggesters[key] = TagSuggester(key)
+        return suggester
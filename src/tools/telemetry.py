@@ -0,0 +1,333 @@
+"""
+Latency tracing and metrics for Obsidian Assistant
+
+Every stage of a message (dispatch, tagging, the main agent, each tool call,
+embedding syncs and searches) and every background job (transcription, git
+sync, vector maintenance) runs inside a span. Spans nest through a context
+variable, so the spans opened while a message is handled form one tree
+rooted at the message, including work handed to pools that copy the context.
+
+Each finished span is observed into a per-stage histogram and counters.
+Each finished tree is handed to the sinks: by default a structured JSON log
+line for each message (LOGGED_TRACES; background jobs only feed the
+histograms); with METRICS_SINK=prometheus (or "log,prometheus") an HTTP
+endpoint on METRICS_HOST:METRICS_PORT (loopback by default) also serves the
+histograms in Prometheus text format, with the slow-request log at /slow.
+Trees slower than SLOW_REQUEST_SECONDS, background ones included, are
+logged in full and the most recent SLOW_LOG_SIZE of them are kept.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import functools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+# Histogram bucket upper bounds, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+METRICS_SINK = os.getenv("METRICS_SINK", "log")
+# The endpoint has no authentication; set METRICS_HOST=0.0.0.0 only behind a firewall.
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "15"))
+SLOW_LOG_SIZE = 50
+# Root spans the log sink writes a line for: one per message, not per background job.
+LOGGED_TRACES = ("dispatcher.message",)
+METRIC_PREFIX = "obsidian_assistant"
+
+_current: contextvars.ContextVar = contextvars.ContextVar("span", default=None)
+
+logger = logging.getLogger("obsidian_assistant.metrics")
+if not logger.handlers:
+    # One JSON object per line, whatever level the rest of the app logs at.
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class Span:
+    __slots__ = ("name", "attrs", "started_at", "_start", "duration", "error", "children")
+
+    def __init__(self, name: str, attrs: Optional[dict] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self.children: List["Span"] = []
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self) -> dict:
+        tree = {"name": self.name, "ms": round((self.duration or 0.0) * 1000, 1)}
+        if self.attrs:
+            tree["attrs"] = self.attrs
+        if self.error:
+            tree["error"] = self.error
+        if self.children:
+            tree["children"] = [child.to_dict() for child in list(self.children)]
+        return tree
+
+    def stages(self) -> Dict[str, float]:
+        """Total milliseconds per stage name in this tree (a stage called twice is summed)."""
+        totals: Dict[str, float] = {}
+        pending = list(self.children)
+        while pending:
+            span = pending.pop()
+            totals[span.name] = totals.get(span.name, 0.0) + (span.duration or 0.0) * 1000
+            pending.extend(span.children)
+        return {name: round(ms, 1) for name, ms in sorted(totals.items())}
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+
+    def observe(self, seconds: float, error: bool = False):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+        if error:
+            self.errors += 1
+
+
+class Metrics:
+    """Per-stage latency histograms and call/error counters."""
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, span: Span):
+        with self._lock:
+            histogram = self._histograms.get(span.name)
+            if histogram is None:
+                histogram = self._histograms[span.name] = Histogram()
+            histogram.observe(span.duration or 0.0, error=span.error is not None)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """{stage: {"count", "errors", "avg_ms"}}."""
+        with self._lock:
+            return {
+                stage: {"count": h.count, "errors": h.errors, "avg_ms": round(h.sum / h.count * 1000, 1) if h.count else 0.0}
+                for stage, h in sorted(self._histograms.items())
+            }
+
+    def render_prometheus(self) -> str:
+        name = f"{METRIC_PREFIX}_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each stage.",
+            f"# TYPE {name} histogram",
+        ]
+        errors = [
+            f"# HELP {METRIC_PREFIX}_stage_errors_total Stage runs that raised.",
+            f"# TYPE {METRIC_PREFIX}_stage_errors_total counter",
+        ]
+        with self._lock:
+            for stage, h in sorted(self._histograms.items()):
+                label = stage.replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{label}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{stage="{label}",le="+Inf"}} {h.count}')
+                lines.append(f'{name}_sum{{stage="{label}"}} {h.sum:.6f}')
+                lines.append(f'{name}_count{{stage="{label}"}} {h.count}')
+                errors.append(f'{METRIC_PREFIX}_stage_errors_total{{stage="{label}"}} {h.errors}')
+        return "\n".join(lines + errors) + "\n"
+
+
+# ----------------- Sinks -----------------
+
+class LogSink:
+    """Writes one JSON line per finished trace named in `traces`: its total time and the time per stage."""
+
+    def __init__(self, traces=LOGGED_TRACES):
+        self.traces = set(traces)
+
+    def emit(self, root: Span):
+        if root.name not in self.traces:
+            return
+        line = {"trace": root.name, "ms": round((root.duration or 0.0) * 1000, 1), "stages": root.stages()}
+        if root.attrs:
+            line["attrs"] = root.attrs
+        if root.error:
+            line["error"] = root.error
+        logger.info(json.dumps(line, ensure_ascii=False, default=str))
+
+
+class PrometheusSink:
+    """Serves the tracer's metrics at /metrics and its slow-request log at /slow."""
+
+    def __init__(self, tracer: "Tracer", port: int = METRICS_PORT, host: str = METRICS_HOST):
+        self.tracer = tracer
+        self.port = port
+        self.host = host
+        self._server = None
+
+    def start(self):
+        if self._server is not None:
+            return
+        tracer = self.tracer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] == "/metrics":
+                    body = tracer.metrics.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path.split("?")[0] == "/slow":
+                    body = json.dumps(tracer.slow_requests(), ensure_ascii=False, default=str).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"📈 Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    def emit(self, root: Span):
+        # Scrapes read the histograms directly.
+        pass
+
+
+# ----------------- Tracer -----------------
+
+class Tracer:
+    def __init__(self, slow_seconds: float = SLOW_REQUEST_SECONDS, slow_log_size: int = SLOW_LOG_SIZE):
+        self.metrics = Metrics()
+        self.sinks: list = []
+        self.slow_seconds = slow_seconds
+        self._slow = deque(maxlen=slow_log_size)
+
+    def add_sink(self, sink):
+        """Adds a sink: any object with emit(root_span), called once per finished trace."""
+        self.sinks.append(sink)
+        return sink
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Times the block as a stage named `name`, nested under the span open in this context."""
+        parent = _current.get()
+        span = Span(name, attrs)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.finish()
+            _current.reset(token)
+            self.metrics.observe(span)
+            if parent is not None:
+                parent.children.append(span)
+            else:
+                self._finish_trace(span)
+
+    def _finish_trace(self, root: Span):
+        for sink in list(self.sinks):
+            try:
+                sink.emit(root)
+            except Exception as e:
+                print(f"⚠️ Metrics sink {type(sink).__name__} failed: {e}")
+        if root.duration is not None and root.duration >= self.slow_seconds:
+            tree = {"started_at": root.started_at, **root.to_dict()}
+            self._slow.append(tree)
+            logger.warning(json.dumps({"slow_request": tree}, ensure_ascii=False, default=str))
+
+    def slow_requests(self) -> List[dict]:
+        """The most recent traces slower than slow_seconds, oldest first, with their full span trees."""
+        return list(self._slow)
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """The process-wide tracer, with the sinks named in METRICS_SINK ("log", "prometheus", both, or "none")."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+            sinks = {s.strip().lower() for s in METRICS_SINK.split(",")}
+            if "log" in sinks:
+                _tracer.add_sink(LogSink())
+            if "prometheus" in sinks:
+                try:
+                    _tracer.add_sink(PrometheusSink(_tracer)).start()
+                except OSError as e:
+                    print(f"⚠️ Could not serve metrics on {METRICS_HOST}:{METRICS_PORT}: {e}")
+        return _tracer
+
+
+def span(name: str, **attrs):
+    """Context manager timing a stage on the process-wide tracer."""
+    return get_tracer().span(name, **attrs)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator timing every call of a function as a stage on the process-wide tracer."""
+    def decorate(fn: Callable) -> Callable:
+        stage = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def trace_methods(prefix: str):
+    """
+    Class decorator timing every public function (plain or static method) as the stage
+    "<prefix>.<name>". functools.wraps keeps the signature and docstring agno builds tool
+    schemas from.
+    """
+    def decorate(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_"):
+                continue
+            if isinstance(value, staticmethod):
+                setattr(cls, attr, staticmethod(traced(f"{prefix}.{attr}")(value.__func__)))
+            elif callable(value) and not isinstance(value, type):
+                setattr(cls, attr, traced(f"{prefix}.{attr}")(value))
+        return cls
+    return decorate
+
+
+def in_current_context(fn: Callable) -> Callable:
+    """
+    Wraps `fn` to run in a copy of the caller's context, so spans it opens on a pool thread
+    nest under the caller's. Wrap once per submitted call: a context can't be entered twice.
+    """
+    context = contextvars.copy_context()
+    return functools.partial(context.run, fn)
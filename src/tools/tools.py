@@ -1,17 +1,34 @@
 import os
-from os import getenv
 import json
-import glob
-import re
 from datetime import date
 import datetime
 from dotenv import load_dotenv
+from tools.ignore_rules import get_ignore_rules
+from tools.vault_index import get_vault_index
+from tools.tag_index import get_tag_index
+from tools.tag_suggester import get_tag_suggester
+from tools import note_search
+from tools.note_search import DEFAULT_LIMIT, DEFAULT_MAX_BYTES
+from tools.note_writer import NoteChangedError, insert_into_note, write_atomic
+from tools.telemetry import trace_methods
 
 load_dotenv()
 
 VAULT_PATH = os.getenv("VAULT_PATH")
+# Where append_to_note puts content when no heading is given.
+DEFAULT_MARKER = "<!-- AI -->"
+
+def _note_changed(note_name: str, edit=None):
+    """Updates the resident indexes after a tool wrote a note; with an edit, only the inserted lines are read."""
+    for index in (get_vault_index(note_utils.vault_path), get_tag_index(note_utils.vault_path),
+                  get_tag_suggester(note_utils.vault_path)):
+        if edit is None:
+            index.update_file(note_name)
+        else:
+            index.apply_edit(edit)
 
 # TODO: all configurations including obsidian path should be configured in .env
+@trace_methods("tool")
 class note_utils:
     vault_path = VAULT_PATH
     daily_path = os.path.join(VAULT_PATH, "Daily", "Journal")
@@ -23,43 +40,77 @@ class note_utils:
             return f"Note '{note_name}' already exists."
 
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(content)
+            write_atomic(path, content)
+            _note_changed(note_name)
             return f"Note '{note_name}' created successfully."
         except Exception as e:
             return f"Error creating note '{note_name}': {str(e)}"
 
     @staticmethod
-    def append_to_note(note_name: str, content: str, marker: str = "<!-- AI -->") -> str:
+    def append_to_note(note_name: str, content: str, marker: str = None, heading: str = None) -> str:
+        """
+        Adds content to a note: at the end of the section under `heading` if given (the
+        heading is created at the end of the note if missing), otherwise on the line below
+        `marker` (default "<!-- AI -->"), otherwise at the end of the note. With a heading,
+        only an explicitly given marker is used, as the fallback when the heading is missing.
+        """
         path = os.path.join(note_utils.vault_path, f"{note_name}")
         if not os.path.exists(path):
             return f"Note '{note_name}' not found."
-        with open(path, "r+", encoding="utf-8") as f:
-            text = f.read()
-            if marker in text:
-                text = text.replace(marker, f"{marker}\n{content}")
-            else:
-                text += f"\n\n{content}"
-            f.seek(0)
-            f.write(text)
-            f.truncate()
-        return f"Appended to {note_name}.md."
+        if marker is None and not heading:
+            marker = DEFAULT_MARKER
+        try:
+            edit = insert_into_note(path, content, heading=heading, marker=marker)
+        except (OSError, NoteChangedError) as e:
+            return f"Error appending to '{note_name}': {str(e)}"
+        _note_changed(note_name, edit)
+        return f"Appended to {note_name}.md (lines {edit.start_line}-{edit.end_line})."
 
     @staticmethod
     def search_note_file(query: str) -> str:
-        matches = []
+        matches = get_vault_index(note_utils.vault_path).search(query)
 
-        for root, dirs, files in os.walk(note_utils.vault_path):
-            for f in files:
-                if query.lower() in f.lower() and f.endswith(".md"):
-                    matches.append(os.path.relpath(os.path.join(root, f), note_utils.vault_path))
+        return "\n".join(matches) if matches else "No matching note titles or content found."
 
-        for path in glob.glob(os.path.join(note_utils.vault_path, "**/*.md"), recursive=True):
-            with open(path, "r", encoding="utf-8") as f:
-                if query.lower() in f.read().lower():
-                    matches.append(os.path.relpath(path, note_utils.vault_path))
+    @staticmethod
+    def search_notes(query: str, limit: int = DEFAULT_LIMIT, cursor: str = None,
+                     max_bytes: int = DEFAULT_MAX_BYTES) -> str:
+        """
+        Searches note names and contents. Returns the best matches first, each with the
+        matching lines and the lines around them, plus "total" and a "next_cursor".
+        Pass next_cursor back with the same query to get the next page. max_bytes caps
+        the size of the answer (about 4 bytes per token).
+        """
+        try:
+            return json.dumps(note_search.search_notes(note_utils.vault_path, query, limit, cursor, max_bytes), ensure_ascii=False)
+        except ValueError as e:
+            return json.dumps({"error": str(e)}, ensure_ascii=False)
 
-        return "\n".join(set(matches)) if matches else "No matching note titles or content found."
+    @staticmethod
+    def search_tag(tag: str, limit: int = DEFAULT_LIMIT, cursor: str = None,
+                   max_bytes: int = DEFAULT_MAX_BYTES) -> str:
+        """
+        Finds notes tagged with `tag` (or a nested tag like tag/child), notes using the tag
+        itself and recently modified ones first, with the tagged lines as snippets.
+        Pass next_cursor back with the same tag to get the next page.
+        """
+        try:
+            return json.dumps(note_search.search_tag(note_utils.vault_path, tag, limit, cursor, max_bytes), ensure_ascii=False)
+        except ValueError as e:
+            return json.dumps({"error": str(e)}, ensure_ascii=False)
+
+    @staticmethod
+    def read_note_section(note_name: str, heading: str = None, start_line: int = None, end_line: int = None,
+                          max_bytes: int = DEFAULT_MAX_BYTES) -> str:
+        """
+        Reads part of a note: the section under `heading`, or lines start_line to end_line
+        (1-based, inclusive). Without either, returns the note's headings and its first lines.
+        If the part is longer than max_bytes, "next_line" says where to continue.
+        """
+        return json.dumps(
+            note_search.read_section(note_utils.vault_path, note_name.lstrip("/\\"), heading, start_line, end_line, max_bytes),
+            ensure_ascii=False,
+        )
 
     @staticmethod
     def read_note(note_name: str) -> str:
@@ -93,23 +144,22 @@ class note_utils:
 
     @staticmethod
     def search_by_tag(tag: str) -> str:
-        matches = []
-        for path in glob.glob(os.path.join(note_utils.vault_path, "**/*.md"), recursive=True):
-            with open(path, "r", encoding="utf-8") as f:
-                if f"#{tag.lower()}" in f.read().lower():
-                    matches.append(os.path.relpath(path, note_utils.vault_path))
+        matches = get_tag_index(note_utils.vault_path).notes_with_tag(tag)
 
-        return "\n".join(set(matches)) if matches else "No notes with tag found."
+        return "\n".join(matches) if matches else "No notes with tag found."
     @staticmethod
     def list_directory(dir_path: str) -> str:
         cleaned = dir_path.lstrip("/\\")
         full_path = os.path.join(note_utils.vault_path, cleaned)
+        rules = get_ignore_rules(note_utils.vault_path)
 
         try:
-            entries = [
-                f + '/' if os.path.isdir(os.path.join(full_path, f)) else f
-                for f in os.listdir(full_path)
-            ]
+            entries = []
+            for f in os.listdir(full_path):
+                is_dir = os.path.isdir(os.path.join(full_path, f))
+                if rules.ignored(os.path.join(full_path, f), is_dir=is_dir):
+                    continue
+                entries.append(f + '/' if is_dir else f)
             if entries:
                 return json.dumps({"results": entries}, ensure_ascii=False)
             else:
@@ -120,16 +170,17 @@ class note_utils:
             return json.dumps({"error": str(e)})
 
     @staticmethod
-    def get_recently_modified_notes(days: int = 7) -> str:
-        current_time = datetime.datetime.now()
-        recent_notes = []
-        time_threshold = current_time - datetime.timedelta(days=days)
+    def get_recently_modified_notes(days: int = 7, limit: int = 20) -> str:
+        """Returns up to `limit` notes modified in the last `days` days, most recent first."""
+        time_threshold = datetime.datetime.now() - datetime.timedelta(days=days)
 
         try:
-            for path in glob.glob(os.path.join(note_utils.vault_path, "**/*.md"), recursive=True):
-                modification_time = datetime.datetime.fromtimestamp(os.path.getmtime(path))
-                if modification_time > time_threshold:
-                    recent_notes.append(os.path.relpath(path, note_utils.vault_path))
+            recent = get_vault_index(note_utils.vault_path).modified_since(
+                int(time_threshold.timestamp() * 1e9), limit=limit)
+            recent_notes = [
+                {"path": rel_path, "modified": datetime.datetime.fromtimestamp(mtime_ns / 1e9).strftime("%Y-%m-%d %H:%M")}
+                for rel_path, mtime_ns in recent
+            ]
 
             if recent_notes:
                 return json.dumps({"results": recent_notes}, ensure_ascii=False)
@@ -138,54 +189,22 @@ class note_utils:
         except Exception as e:
             return json.dumps({"error": str(e)}, ensure_ascii=False)
 
-def _load_tags_from_json(file_path: str) -> set:
-    """Loads tags from a JSON file."""
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            tags = json.load(f)
-            return set(tags)
-    except FileNotFoundError:
-        return None
-    except Exception as e:
-        print(f"Error loading tags from {file_path}: {e}")
-        return None
-
-
-def _save_tags_to_json(file_path: str, tags: set):
-    """Saves tags to a JSON file."""
-    try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(list(tags), f, ensure_ascii=False, indent=4)
-    except Exception as e:
-        print(f"Error saving tags to {file_path}: {e}")
-
-
+@trace_methods("tool")
 class tag_utils:
     vault_path = VAULT_PATH
     daily_path = os.path.join(VAULT_PATH, "Daily", "Journal")
 
     def get_vault_tags() -> set:
         """
-        Scans all files in the Obsidian vault and extracts all the tags.
-        The tool should output a list of unique tags.
-        Saves all tags to .json and uses it when it exists.
+        Returns all unique tags used in the Obsidian vault.
+        Served from the tag index, which re-reads only notes changed since the last call.
+        """
+        return str(set(get_tag_index(note_utils.vault_path).tags()))
+
+    def get_tag_counts(limit: int = 50) -> str:
+        """
+        Returns the most used tags in the vault with the number of notes using each tag.
         """
-        tags_file = os.path.join(VAULT_PATH, ".assistant", "tags.json")
-        unique_tags = _load_tags_from_json(tags_file)
-
-        if unique_tags is None:
-            unique_tags = set()
-            for root, _, files in os.walk(note_utils.vault_path):
-                for file in files:
-                    if file.endswith(".md"):
-                        file_path = os.path.join(root, file)
-                        try:
-                            with open(file_path, "r", encoding="utf-8") as f:
-                                content = f.read()
-                                tags = re.findall(r"#\w+", content)
-                                unique_tags.update(tags)
-                        except Exception as e:
-                            print(f"Error reading file {file_path}: {e}")
-            _save_tags_to_json(tags_file, unique_tags)
-
-        return str(unique_tags)
\ No newline at end of file
+        counts = get_tag_index(note_utils.vault_path).tag_counts()
+        top = dict(list(counts.items())[:limit])
+        return json.dumps({"results": top}, ensure_ascii=False)
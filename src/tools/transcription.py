@@ -0,0 +1,194 @@
+"""
+Voice note transcription service.
+
+Keeps one Whisper model resident (loaded at startup, optionally in the
+background) and transcribes jobs from a bounded queue on a small pool of
+worker threads, so voice notes never block the WhatsApp callback thread and
+never pay the model load again. Workers decode audio (ffmpeg) in parallel,
+but only one runs the model at a time: Whisper's decoder installs kv-cache
+hooks on the model, so concurrent transcribe() calls on it corrupt each other.
+"""
+
+import os
+import time
+import queue
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+from tools.telemetry import span
+
+WHISPER_MODEL = "base"
+TRANSCRIBE_WORKERS = 1
+QUEUE_SIZE = 32
+# Number of recent jobs kept for the latency stats.
+LATENCY_WINDOW = 200
+
+
+class TranscriptionJob:
+    def __init__(self, voice_file_path: str, on_done: Callable[[str], None],
+                 on_error: Optional[Callable[[Exception], None]] = None):
+        self.voice_file_path = voice_file_path
+        self.on_done = on_done
+        self.on_error = on_error
+        self.enqueued_at = time.monotonic()
+
+
+class TranscriptionService:
+    def __init__(self, model_name: str = WHISPER_MODEL, workers: int = TRANSCRIBE_WORKERS,
+                 queue_size: int = QUEUE_SIZE, warmup: bool = True, device: Optional[str] = None):
+        """
+        :param workers: Transcription threads. They decode audio in parallel and take turns on
+            the one resident model.
+        :param queue_size: Jobs waiting beyond this are rejected by submit().
+        :param warmup: Load the model on a background thread in start() instead of blocking it.
+        """
+        self.model_name = model_name
+        self.workers = max(1, workers)
+        self.warmup = warmup
+        self.device = device
+        self.model = None
+        self.model_load_seconds: Optional[float] = None
+        self.load_error: Optional[Exception] = None
+
+        self._queue: "queue.Queue[Optional[TranscriptionJob]]" = queue.Queue(maxsize=queue_size)
+        self._ready = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        # Held around model.transcribe(); the model is not safe to share between threads.
+        self._model_lock = threading.Lock()
+        self._in_flight = 0
+        self._processed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._waits = deque(maxlen=LATENCY_WINDOW)
+        self._durations = deque(maxlen=LATENCY_WINDOW)
+
+    # ----------------- Internal Utilities -----------------
+
+    def _load_model(self):
+        started = time.monotonic()
+        try:
+            import whisper
+            print(f"🎙️ Loading Whisper model '{self.model_name}'...")
+            self.model = whisper.load_model(self.model_name, device=self.device)
+            self.model_load_seconds = time.monotonic() - started
+            print(f"🎙️ Whisper model loaded in {self.model_load_seconds:.1f}s")
+        except Exception as e:
+            self.load_error = e
+            print(f"❌ Failed to load Whisper model: {e}")
+        finally:
+            self._ready.set()
+
+    def _load_audio(self, voice_file_path: str):
+        import whisper
+        return whisper.load_audio(voice_file_path)
+
+    def _transcribe(self, voice_file_path: str) -> str:
+        audio = self._load_audio(voice_file_path)
+        # fp16 is not supported on CPU and only produces a warning there.
+        fp16 = getattr(self.model, "device", None) is not None and self.model.device.type != "cpu"
+        with self._model_lock:
+            result = self.model.transcribe(audio, fp16=fp16)
+        return result["text"].strip()
+
+    def _worker(self):
+        self._ready.wait()
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            started = time.monotonic()
+            with self._lock:
+                self._in_flight += 1
+                self._waits.append(started - job.enqueued_at)
+            try:
+                if self.model is None:
+                    raise RuntimeError(f"Whisper model is not available: {self.load_error}")
+                with span("whisper.transcribe"):
+                    text = self._transcribe(job.voice_file_path)
+                duration = time.monotonic() - started
+                with self._lock:
+                    self._processed += 1
+                    self._durations.append(duration)
+                print(f"🎙️ Transcribed {os.path.basename(job.voice_file_path)} in {duration:.1f}s "
+                      f"(waited {started - job.enqueued_at:.1f}s, {self._queue.qsize()} queued)")
+                job.on_done(text)
+            except Exception as e:
+                with self._lock:
+                    self._failed += 1
+                print(f"⚠️ Transcription of {job.voice_file_path} failed: {e}")
+                if job.on_error:
+                    job.on_error(e)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                self._queue.task_done()
+
+    @staticmethod
+    def _percentile(samples, fraction: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3)
+
+    # ----------------- Core Methods -----------------
+
+    def start(self):
+        """Loads the model (in the background when warmup is set) and starts the workers. Idempotent."""
+        if self._threads:
+            return
+        if self.warmup:
+            threading.Thread(target=self._load_model, name="whisper-load", daemon=True).start()
+        else:
+            self._load_model()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"whisper-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Lets queued jobs finish, then stops the workers."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, voice_file_path: str, on_done: Callable[[str], None],
+               on_error: Optional[Callable[[Exception], None]] = None) -> bool:
+        """
+        Queues a voice file; on_done(text) or on_error(exception) is called from a worker thread.
+        Returns False without queueing when the queue is full.
+        """
+        try:
+            self._queue.put_nowait(TranscriptionJob(voice_file_path, on_done, on_error))
+            return True
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            return False
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set() and self.model is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits, durations = list(self._waits), list(self._durations)
+            return {
+                "ready": self.ready,
+                "model": self.model_name,
+                "model_load_seconds": self.model_load_seconds,
+                "workers": self.workers,
+                "queue_depth": self._queue.qsize(),
+                "in_flight": self._in_flight,
+                "processed": self._processed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "wait_p50": self._percentile(waits, 0.5),
+                "wait_p95": self._percentile(waits, 0.95),
+                "transcribe_p50": self._percentile(durations, 0.5),
+                "transcribe_p95": self._percentile(durations, 0.95),
+            }
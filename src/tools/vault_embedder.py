@@ -1,17 +1,22 @@
 """
 Vault Embedder for Obsidian Assistant
 
-Embeds documents from an Obsidian vault using a pluggable vector DB.
-Supports initial sync, incremental updates, and monitoring mode.
+Embeds documents from an Obsidian vault using a pluggable vector DB: LanceDB
+(the default) or the in-process NumPy store (tools/vector_store.py), chosen
+with VECTOR_BACKEND=lancedb|numpy.
+Notes are split into heading-bounded chunks (see tools/chunking.py); only
+chunks whose text changed are re-embedded.
+Supports initial sync, incremental updates, and monitoring mode (driven by the
+vault watcher, see tools/vault_watcher.py). While monitoring, the vector table
+is compacted and indexed in the background (see tools/vector_maintenance.py).
 """
 
 import os
-import glob
 import time
 import hashlib
-import json
 import threading
-from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import io
 import sys
 
@@ -28,110 +33,552 @@ from agno.knowledge.document import DocumentKnowledgeBase
 from agno.embedder.openai import OpenAIEmbedder
 from agno.vectordb.lancedb import LanceDb, SearchType
 
+from tools.chunking import chunk_markdown
+from tools.embedding_cache import CACHE_FILENAME, CachedEmbedder, embed_texts
+from tools.ignore_rules import get_ignore_rules
+from tools.query_cache import QueryCache
+from tools.sync_index import SYNC_INDEX_FILENAME, SyncIndex
+from tools.telemetry import in_current_context, span, traced
+from tools.vector_maintenance import VectorMaintenance
+from tools.vault_index import scan_markdown
+from tools.vault_watcher import get_vault_watcher
+from tools.vector_rows import row_store
+from tools.vector_store import NumpyVectorDb
+
+# Pre-SQLite index file, migrated into the sync index on first start.
 INDEX_FILENAME = ".vault_index.json"
 
+# Embedding batches are bounded by document count and by total characters
+# (roughly 4 characters per token, well under the API's per-request limit).
+BATCH_SIZE = 64
+BATCH_CHARS = 200_000
+EMBED_WORKERS = 4
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "lancedb")
+
+
+class VaultKnowledgeBase(DocumentKnowledgeBase):
+    """DocumentKnowledgeBase whose searches are answered from a QueryCache while the index is unchanged."""
+
+    query_cache: Optional[QueryCache] = None
+
+    def search(self, query: str, num_documents: Optional[int] = None,
+               filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        with span("knowledge.search") as search_span:
+            if self.query_cache is None:
+                return super().search(query=query, num_documents=num_documents, filters=filters)
+            key = self.query_cache.key(query, num_documents or self.num_documents, filters)
+            results = self.query_cache.get(key)
+            search_span.attrs["cached"] = results is not None
+            if results is None:
+                results = super().search(query=query, num_documents=num_documents, filters=filters)
+                # agno reports search errors as an empty list, so empty results are not cached.
+                if results:
+                    self.query_cache.put(key, results)
+            return results
+
+
 class VaultEmbedder:
-    def __init__(self, vault_path: str, vector_db = None, recreate: bool = False):
+    def __init__(self, vault_path: str, vector_db = None, recreate: bool = False, embedder = None,
+                 batch_size: int = BATCH_SIZE, batch_chars: int = BATCH_CHARS, max_workers: int = EMBED_WORKERS,
+                 backend: str = None, initial_sync: bool = True):
+        """
+        :param vector_db: Vector DB to use instead of the default one for `backend`.
+        :param embedder: Embedder for the default vector DB (OpenAIEmbedder when None); it is
+            wrapped in the persistent embedding cache.
+        :param backend: "lancedb" (a table under .assistant/lancedb) or "numpy" (the in-process
+            store under .assistant/vectors). Defaults to the VECTOR_BACKEND environment variable.
+            Each backend keeps its own sync index, so switching rebuilds the new one from the
+            embedding cache without calling the embedding API again.
+        :param initial_sync: Sync the vault before returning. With False, call
+            start_initial_sync() to run it in the background; searches meanwhile are answered
+            from the notes embedded so far (see status()).
+        """
         self.vault_path = os.path.abspath(vault_path)
+        self.batch_size = batch_size
+        self.batch_chars = batch_chars
+        self.max_workers = max_workers
+        self.backend = (backend or VECTOR_BACKEND).lower()
+        if self.backend not in ("lancedb", "numpy"):
+            raise ValueError(f"Unknown vector backend '{self.backend}', expected 'lancedb' or 'numpy'.")
         print(f"Vault path: {self.vault_path}")
         self.db_path = os.path.join(vault_path, ".assistant")
-        self.db_path = os.path.join(self.db_path, "lancedb")
+        self.db_path = os.path.join(self.db_path, "lancedb" if self.backend == "lancedb" else "vectors")
         self.index = self._load_index()
+        self._sync_lock = threading.RLock()
+        self.query_cache = QueryCache()
+        self.state = "warming"
+        self.error = None
+        self._ready = threading.Event()
+        self._warmup_thread = None
+        self._sync_pending = 0
 
-        if not vector_db:
-            self.vector_db = LanceDb(
-                uri=self.db_path,
-                table_name="vault_docs",
-                search_type=SearchType.hybrid,
-                embedder=OpenAIEmbedder()
-                )
+        if vector_db is not None:
+            self.vector_db = vector_db
+        else:
+            cached_embedder = CachedEmbedder(
+                embedder=embedder or OpenAIEmbedder(),
+                cache_path=os.path.join(self.vault_path, ".assistant", CACHE_FILENAME)
+            )
+            if self.backend == "numpy":
+                self.vector_db = NumpyVectorDb(path=self.db_path, embedder=cached_embedder)
+            else:
+                self.vector_db = LanceDb(
+                    uri=self.db_path,
+                    table_name="vault_docs",
+                    search_type=SearchType.hybrid,
+                    embedder=cached_embedder,
+                    # LanceDB's native full-text index; its Tantivy one is gone from current releases.
+                    use_tantivy=False
+                    )
+        self.rows = row_store(self.vector_db)
+        self.maintenance = VectorMaintenance(self.vector_db, lock=self._sync_lock, on_change=self.query_cache.bump)
+
+        if recreate and self.vector_db.exists():
+            self.vector_db.drop()
+            if isinstance(self.vector_db, LanceDb):
+                # LanceDb.create() replaces its connection with the new table and keeps
+                # serving the dropped one, so rebuild the table here instead of in kb.load().
+                self.vector_db.table = self.vector_db._init_table()
 
-        self.kb = DocumentKnowledgeBase(documents=[], vector_db=self.vector_db, skip_existing=True)
-        self.kb.load(recreate=recreate)
+        self.kb = VaultKnowledgeBase(documents=[], vector_db=self.vector_db, skip_existing=True,
+                                     query_cache=self.query_cache)
+        self.kb.load()
+        self.maintenance.attach()
         print(f"Knowledge base loaded. Vector DB exists: {self.vector_db.exists()}")
-        try:
-            self._initial_sync(recreate=recreate)
-        except Exception as e:
-            print(f"Error during _initial_sync: {e}")
-            raise
+        self._recreate = recreate
+        if initial_sync:
+            try:
+                self._initial_sync(recreate=recreate)
+            except Exception as e:
+                print(f"Error during _initial_sync: {e}")
+                self._set_state("failed", e)
+                raise
+            self._set_state("ready")
 
     # ----------------- Internal Utilities -----------------
 
-    def _get_markdown_files(self) -> List[str]:
-        return glob.glob(os.path.join(self.vault_path, "**/*.md"), recursive=True)
+    def _set_state(self, state: str, error: Optional[Exception] = None):
+        self.state = state
+        self.error = None if error is None else f"{type(error).__name__}: {error}"
+        if state != "warming":
+            self._ready.set()
+
+    def _warm_up(self):
+        started = time.time()
+        try:
+            with span("embedder.initial_sync"):
+                self._initial_sync(recreate=self._recreate)
+        except Exception as e:
+            print(f"⚠️ Initial sync failed, searches use the notes embedded so far: {e}")
+            self._set_state("failed", e)
+            return
+        self._set_state("ready")
+        print(f"🔥 Vault index warm after {time.time() - started:.1f}s.")
 
     def _compute_md5(self, text: str) -> str:
         return hashlib.md5(text.encode("utf-8")).hexdigest()
 
-    def _load_index(self) -> dict:
-        path = os.path.join(self.db_path, INDEX_FILENAME)
+    def _load_index(self) -> SyncIndex:
+        path = os.path.join(self.db_path, SYNC_INDEX_FILENAME)
         print(f"Loading index from path: {path}")
-        try:
-            if os.path.exists(path):
-                with open(path) as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            print(f"Error loading index: {e}")
-            raise
+        index = SyncIndex(path)
+        legacy_path = os.path.join(self.db_path, INDEX_FILENAME)
+        if os.path.exists(legacy_path) and not len(index):
+            count = index.import_json(legacy_path)
+            os.replace(legacy_path, legacy_path + ".migrated")
+            print(f"Migrated {count} entries from {INDEX_FILENAME}.")
+        return index
+
+    def _stat_changes(self, paths: Optional[Iterable[str]] = None) -> Tuple[dict, List[str]]:
+        """
+        Returns (rel_path -> (mtime_ns, size, inode) for notes whose stat signature
+        changed, rel_paths of indexed notes that no longer exist).
+        """
+        signatures = self.index.signatures()
+        if paths is None:
+            current = scan_markdown(self.vault_path)
+            deleted = [p for p in signatures if p not in current]
+        else:
+            current, deleted = {}, []
+            rules = get_ignore_rules(self.vault_path)
+            for rel_path in paths:
+                if not rel_path.endswith(".md") or rules.ignored(rel_path):
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.vault_path, rel_path))
+                except FileNotFoundError:
+                    if rel_path in signatures:
+                        deleted.append(rel_path)
+                    continue
+                current[rel_path] = (st.st_mtime_ns, st.st_size, st.st_ino)
 
-    def _save_index(self):
-        path = os.path.join(self.db_path, INDEX_FILENAME)
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w") as f:
-            json.dump(self.index, f, indent=2)
+        changed = {p: stat for p, stat in current.items() if signatures.get(p) != stat}
+        return changed, deleted
 
-    def _get_modified_documents(self) -> List[Tuple[Document, Optional[str]]]:
-        docs = []
-        for file_path in self._get_markdown_files():
-            rel_path = os.path.relpath(file_path, self.vault_path)
+    def _get_modified_documents(self, paths: Optional[Iterable[str]] = None) -> Tuple[List[Tuple[str, str, dict]], List[str]]:
+        """
+        Reads and hashes only notes whose stat signature changed.
+        Returns ([(rel_path, content, new index entry)], deleted rel_paths).
+        """
+        changed, deleted = self._stat_changes(paths)
+
+        notes = []
+        for rel_path, (mtime_ns, size, ino) in changed.items():
+            file_path = os.path.join(self.vault_path, rel_path)
             try:
                 with open(file_path, encoding="utf-8") as f:
                     content = f.read().replace("\x00", "\ufffd")
                 doc_hash = self._compute_md5(content)
-                prev_hash = self.index.get(rel_path)
-                if prev_hash != doc_hash:
-                    docs.append((
-                        Document(
-                            id=doc_hash,
-                            name=rel_path,
-                            content=content,
-                            meta_data={"file_path": rel_path, "timestamp": time.time()}
-                        ),
-                        prev_hash
-                    ))
+                prev = self.index.get(rel_path) or {}
+                entry = {"hash": doc_hash, "mtime_ns": mtime_ns, "size": size, "ino": ino}
+                if prev.get("hash") == doc_hash and prev.get("mtime_ns") is not None:
+                    # Touched but not edited: remember the new signature, skip embedding.
+                    self.index.put_file(rel_path, **entry)
+                    continue
+                notes.append((rel_path, content, entry))
             except Exception as e:
                 print(f"⚠️ Error reading {rel_path}: {e}")
+        return notes, deleted
+
+    def _chunk_id(self, rel_path: str, text: str) -> str:
+        # The path is part of the id so identical text in two notes gets two rows
+        # and deleting one note's chunk never removes the other's.
+        return self._compute_md5(f"{rel_path}\x00{text}")
+
+    def _chunk_note(self, rel_path: str, content: str) -> List[Document]:
+        docs, seen = [], set()
+        for chunk in chunk_markdown(content):
+            chunk_id = self._chunk_id(rel_path, chunk.text)
+            if chunk_id in seen:
+                continue
+            seen.add(chunk_id)
+            docs.append(Document(
+                id=chunk_id,
+                name=rel_path,
+                content=chunk.text,
+                meta_data={
+                    "file_path": rel_path,
+                    "heading": chunk.heading,
+                    "chunk_start": chunk.start,
+                    "chunk_end": chunk.end,
+                    "timestamp": time.time(),
+                }
+            ))
         return docs
 
+    @staticmethod
+    def _chunk_span(doc: Document) -> list:
+        return [doc.meta_data["chunk_start"], doc.meta_data["chunk_end"], doc.meta_data["heading"]]
+
+    def _move_chunks(self, docs: List[Document]):
+        """Rewrites the stored offsets of chunks whose text is unchanged but moved within the note."""
+        by_id = {doc.id: doc for doc in docs}
+        payloads = {}
+        for row in self.rows.get_rows(by_id, vectors=False):
+            payload = row["payload"]
+            payload["meta_data"] = by_id[row["id"]].meta_data
+            payloads[row["id"]] = payload
+        self.rows.update_payloads(payloads)
+
+    def _rename_chunks(self, old_path: str, new_path: str, chunks: dict) -> dict:
+        """
+        Re-keys a note's stored vectors under its new path (chunk ids include the path) without
+        re-embedding them. Returns the moved chunks as {new id: span}.
+        """
+        moved, rows = {}, []
+        ids = list(chunks)
+        for row in self.rows.get_rows(ids):
+            payload = row["payload"]
+            new_id = self._chunk_id(new_path, payload["content"])
+            payload["name"] = new_path
+            payload["meta_data"]["file_path"] = new_path
+            rows.append({"id": new_id, "vector": row["vector"], "payload": payload})
+            moved[new_id] = chunks[row["id"]]
+        self.rows.add_rows(rows)
+        self._delete_ids(ids)
+        return moved
+
+    def _make_batches(self, docs: List[Document]) -> List[List[Document]]:
+        batches, batch, chars = [], [], 0
+        for doc in docs:
+            if batch and (len(batch) >= self.batch_size or chars + len(doc.content) > self.batch_chars):
+                batches.append(batch)
+                batch, chars = [], 0
+            batch.append(doc)
+            chars += len(doc.content)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @traced("embedder.embed_batch")
+    def _embed_batch(self, batch: List[Document]) -> List[Document]:
+        embeddings = embed_texts(self.vector_db.embedder, [doc.content for doc in batch])
+        for doc, embedding in zip(batch, embeddings):
+            doc.embedding = embedding
+        return batch
+
+    @traced("embedder.write_batch")
+    def _write_batch(self, batch: List[Document]):
+        """Writes embedded documents in one append to the vector DB."""
+        rows = []
+        for doc in batch:
+            payload = {"name": doc.name, "meta_data": doc.meta_data, "content": doc.content, "usage": doc.usage}
+            rows.append({"id": doc.id, "vector": doc.embedding, "payload": payload})
+        self.rows.add_rows(rows)
+
+    @traced("embedder.delete")
+    def _delete_ids(self, ids: List[str]):
+        self.rows.delete_ids(ids)
+
+    def _embed_documents(self, docs: List[Document], on_written=None) -> List[Document]:
+        """
+        Embeds documents in size-bounded batches on a thread pool and appends each
+        finished batch to the vector table, calling on_written(batch) after each write.
+        Returns the documents that were written.
+        """
+        batches = self._make_batches(docs)
+        total_chars = sum(len(doc.content) for doc in docs)
+        written: List[Document] = []
+        done_chars = 0
+        started = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(in_current_context(self._embed_batch), batch) for batch in batches]
+            for i, future in enumerate(as_completed(futures), start=1):
+                try:
+                    batch = future.result()
+                    self._write_batch(batch)
+                    if on_written:
+                        on_written(batch)
+                except Exception as e:
+                    print(f"⚠️ Embedding batch failed, its notes will be retried on the next sync: {e}")
+                    continue
+                written.extend(batch)
+                done_chars += sum(len(doc.content) for doc in batch)
+                elapsed = max(time.time() - started, 1e-6)
+                print(f"📦 Batch {i}/{len(batches)}: {len(written)}/{len(docs)} docs, "
+                      f"{done_chars}/{total_chars} chars, {len(written) / elapsed:.1f} docs/s")
+
+        elapsed = time.time() - started
+        print(f"⏱️ Embedded {len(written)} docs ({done_chars} chars) in {elapsed:.1f}s")
+        return written
+
     # ----------------- Core Methods -----------------
 
-    def sync(self):
-        updates = self._get_modified_documents()
+    @traced("embedder.sync")
+    def sync(self, paths: Optional[Iterable[str]] = None):
+        """
+        Embeds new or changed notes.
 
-        if not updates:
-            print("✅ Vault is already in sync.")
-            return
+        The index is updated in one transaction before the vector deletes and in one
+        transaction per written batch; a note gets its stat signature back only once
+        all of its chunks are in the table, so an interrupted sync is redone next time.
+
+        :param paths: Vault-relative paths to check. None checks the whole vault.
+        """
+        with self._sync_lock:
+            notes, deleted = self._get_modified_documents(paths)
+
+            if not notes and not deleted:
+                print("✅ Vault is already in sync.")
+                return
+
+            stale_ids: List[str] = []
+            to_embed: List[Document] = []
+            moved: List[Document] = []
+            plans = {}
+            for rel_path, content, entry in notes:
+                old_chunks = (self.index.get(rel_path) or {}).get("chunks", {})
+                chunks = self._chunk_note(rel_path, content)
+                spans = {doc.id: self._chunk_span(doc) for doc in chunks}
+                stale_ids += [i for i in old_chunks if i not in spans]
+                pending = set()
+                for doc in chunks:
+                    if doc.id not in old_chunks:
+                        to_embed.append(doc)
+                        pending.add(doc.id)
+                    elif old_chunks[doc.id] != spans[doc.id]:
+                        moved.append(doc)
+                plans[rel_path] = (entry, spans, pending)
+
+            self.index.set_meta("sync_in_progress", str(time.time()))
+            try:
+                with self.index.transaction():
+                    for rel_path in deleted:
+                        stale_ids += self.index.remove_file(rel_path)
+                    self.index.remove_chunks(stale_ids)
+                    for rel_path, (entry, spans, pending) in plans.items():
+                        kept = {i: span for i, span in spans.items() if i not in pending}
+                        self.index.put_file(rel_path, None)
+                        self.index.put_chunks(rel_path, kept)
+
+                if stale_ids:
+                    self._delete_ids(stale_ids)
+                if deleted:
+                    print(f"🗑️ Removed {len(deleted)} deleted files from the index.")
+                if moved:
+                    self._move_chunks(moved)
+
+                self._sync_pending = len(plans)
+
+                def complete(rel_path):
+                    entry = plans[rel_path][0]
+                    self.index.put_file(rel_path, **entry)
+                    self._sync_pending -= 1
+
+                with self.index.transaction():
+                    for rel_path, (_, _, pending) in plans.items():
+                        if not pending:
+                            complete(rel_path)
 
-        print(f"🔁 Syncing {len(updates)} new or updated files...")
-        for doc, old_id in updates:
-            if old_id and old_id != doc.id:
-                self.vector_db.table.delete(f"id = '{old_id}'")
-            self.kb.load_documents([doc])
-            self.index[doc.name] = doc.id
+                def on_written(batch: List[Document]):
+                    with self.index.transaction():
+                        for doc in batch:
+                            entry, spans, pending = plans[doc.name]
+                            self.index.put_chunks(doc.name, {doc.id: spans[doc.id]})
+                            pending.discard(doc.id)
+                            if not pending:
+                                complete(doc.name)
+                    # Searches made while the sync runs see each batch as it lands.
+                    self.query_cache.bump()
 
-        self._save_index()
-        print("✅ Sync complete.")
+                if to_embed:
+                    print(f"🔁 Syncing {len(to_embed)} new or changed chunks from {len(notes)} files...")
+                    self._embed_documents(to_embed, on_written=on_written)
+            finally:
+                # The table changed; searches cached so far (even ones that ran mid-sync) are stale.
+                self.query_cache.bump()
+                self._sync_pending = 0
+                self.maintenance.record(len(stale_ids) + len(moved) + len(to_embed))
+
+            self.index.set_meta("sync_in_progress", None)
+            print("✅ Sync complete.")
+
+    @traced("embedder.rename")
+    def rename(self, old_path: str, new_path: str) -> bool:
+        """
+        Moves a note's vectors and index entry to a new path. The note is left without a stat
+        signature, so the next sync of new_path re-reads it and embeds only chunks that changed.
+        Returns False when old_path was not indexed.
+        """
+        with self._sync_lock:
+            entry = self.index.get(old_path)
+            if entry is None:
+                return False
+            self.index.set_meta("sync_in_progress", str(time.time()))
+            try:
+                stale = self.index.remove_file(new_path) if new_path in self.index else []
+                if stale:
+                    self._delete_ids(stale)
+                moved = self._rename_chunks(old_path, new_path, entry["chunks"])
+                with self.index.transaction():
+                    self.index.remove_file(old_path)
+                    self.index.put_file(new_path, entry["hash"])
+                    self.index.put_chunks(new_path, moved)
+            finally:
+                self.query_cache.bump()
+            self.maintenance.record(len(stale) + 2 * len(moved))
+            self.index.set_meta("sync_in_progress", None)
+            print(f"🚚 Moved {len(moved)} chunks from {old_path} to {new_path}")
+            return True
+
+    @traced("embedder.apply_pull")
+    def apply_pull(self, changes):
+        """
+        Applies the note changes a git pull brought in (see GitAutoSync.subscribe): renames move
+        existing vectors, and only the touched paths are re-checked instead of the whole vault.
+        """
+        with self._sync_lock:
+            for old_path, new_path in changes.renamed.items():
+                self.rename(old_path, new_path)
+            self.sync(changes.paths())
+
+    def _table_ids(self) -> List[str]:
+        return self.rows.all_ids()
+
+    def _payload_names(self, ids) -> set:
+        return {row["payload"].get("name") for row in self.rows.get_rows(ids, vectors=False)}
+
+    @traced("embedder.reconcile")
+    def reconcile(self) -> dict:
+        """
+        Checks the sync index against the vector table without re-embedding anything:
+        vectors the index does not know are deleted, and chunks whose vector is missing
+        or duplicated are dropped from the index so the next sync writes them again.
+        """
+        with self._sync_lock:
+            table_ids = self._table_ids()
+            seen, duplicated = set(), set()
+            for doc_id in table_ids:
+                (duplicated if doc_id in seen else seen).add(doc_id)
+            index_ids = self.index.chunk_ids()
+
+            orphaned = seen - index_ids
+            missing = (index_ids - seen) | (duplicated & index_ids)
+            # Notes that own an orphaned vector are re-diffed too, in case the index
+            # lost a chunk row that the note still needs.
+            paths = self._payload_names(orphaned) & self.index.paths() if orphaned else set()
+            if orphaned or duplicated:
+                self._delete_ids(list(orphaned | duplicated))
+            if missing or paths:
+                with self.index.transaction():
+                    paths |= self.index.paths_for_chunks(missing)
+                    self.index.remove_chunks(missing)
+                    for rel_path in paths:
+                        self.index.invalidate_file(rel_path)
+            if orphaned or duplicated or missing:
+                self.query_cache.bump()
+            self.maintenance.record(len(orphaned | duplicated))
+
+            report = {"orphaned_vectors": len(orphaned), "duplicated_vectors": len(duplicated), "missing_vectors": len(missing)}
+            print(f"🩺 Reconciled index with vector table: {report}")
+            return report
+
+    def maintain(self) -> dict:
+        """Compacts and indexes the vector table now instead of waiting for the scheduler."""
+        return self.maintenance.run()
+
+    def table_stats(self) -> dict:
+        """Fragmentation of the vector table (see VectorMaintenance.stats)."""
+        return self.maintenance.stats()
 
     def _initial_sync(self, recreate: bool):
-        if recreate or not self.index:
+        if recreate or not len(self.index):
             print("📭 No index or recreate=True — syncing full vault.")
-            self.index = {}
+            self.index.clear()
         else:
             print("Using existing index.")
+            if self.index.get_meta("sync_in_progress"):
+                print("⚠️ Previous sync was interrupted, reconciling index with the vector table.")
+                self.reconcile()
         self.sync()
 
+    def start_initial_sync(self) -> threading.Thread:
+        """
+        Runs the initial sync in a background thread (idempotent). Until it finishes, state is
+        "warming" and searches are answered from the notes embedded so far.
+        """
+        if self._warmup_thread is None and not self._ready.is_set():
+            self._warmup_thread = threading.Thread(target=self._warm_up, name="vault-warmup", daemon=True)
+            self._warmup_thread.start()
+        return self._warmup_thread
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the initial sync finished (or failed); returns False on timeout."""
+        return self._ready.wait(timeout)
+
+    def status(self) -> dict:
+        """Readiness of the index: "warming" during the initial sync, then "ready" (or "failed")."""
+        return {
+            "state": self.state,
+            "synced_notes": self.index.synced_count(),
+            "pending_notes": self._sync_pending,
+            "error": self.error,
+        }
+
+    @traced("embedder.query")
     def query(self, query: str, top_k: int = 5):
+        """Searches the knowledge base; repeated queries are served from the cache until the next sync."""
         print(f"Querying with query: {query} and top_k: {top_k}")
         try:
             results = self.kb.search(query=query, num_documents=top_k)
@@ -145,17 +592,20 @@ class VaultEmbedder:
         """Agno-style alias."""
         return self.query(query, top_k)
 
-    def start_monitoring(self, interval: int = 300) -> threading.Thread:
-        def loop():
-            while True:
-                print(f"\n🔄 Scanning vault: {self.vault_path}")
-                self.sync()
-                print(f"⏳ Sleeping for {interval} seconds...")
-                time.sleep(interval)
-
-        thread = threading.Thread(target=loop, daemon=True)
-        thread.start()
-        return thread
+    def _on_vault_changes(self, paths):
+        print(f"\n🔄 Vault changed: {'full rescan' if paths is None else ', '.join(sorted(paths))}")
+        self.sync(paths)
+
+    def start_monitoring(self):
+        """
+        Subscribes to the vault's watcher so edits are embedded within seconds.
+        The watcher is shared per vault, so calling this repeatedly is harmless.
+        Also starts the background maintenance of the vector table.
+        """
+        watcher = get_vault_watcher(self.vault_path)
+        watcher.subscribe(self._on_vault_changes)
+        self.maintenance.start()
+        return watcher.start()
 
 if __name__ == "__main__":
     import argparse
@@ -0,0 +1,336 @@
+"""
+Vault Index for Obsidian Assistant
+
+Resident, incrementally maintained index of note file names and contents.
+Content lookups go through token postings (plus a trigram table over the
+token vocabulary for substring matches), so a query only touches the notes
+that can actually match instead of re-reading the whole vault.
+"""
+
+import os
+import re
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from tools.ignore_rules import get_ignore_rules
+from tools.mtime_index import Changes, MtimeIndex
+
+# Seconds between stat-only rescans that pick up edits made outside the tools.
+REFRESH_INTERVAL = 30
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> Set[str]:
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+def _trigrams(token: str) -> Set[str]:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def scan_markdown(vault_path: str) -> Dict[str, Tuple[int, int, int]]:
+    """Walks the vault once and returns rel_path -> (mtime_ns, size, inode) for every note that is not ignored."""
+    stats = {}
+    rules = get_ignore_rules(vault_path)
+    rules.refresh()
+    for root, _, files in rules.walk():
+        for f in files:
+            if not f.endswith(".md"):
+                continue
+            file_path = os.path.join(root, f)
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            stats[os.path.relpath(file_path, vault_path)] = (st.st_mtime_ns, st.st_size, st.st_ino)
+    return stats
+
+
+class VaultIndex:
+    def __init__(self, vault_path: str):
+        self.vault_path = os.path.abspath(vault_path)
+        self._lock = threading.RLock()
+        self._built = False
+        self._watched = False
+        self._last_refresh = 0.0
+
+        self._stats: Dict[str, Tuple[int, int, int]] = {}
+        # notes ordered by mtime, plus the change log behind changes_since()
+        self._mtimes = MtimeIndex()
+        # rel_path -> lowercased file name, the "filename table"
+        self._names: Dict[str, str] = {}
+        # rel_path -> tokens of the note, needed to retract postings on update
+        self._doc_tokens: Dict[str, frozenset] = {}
+        # token -> notes containing it
+        self._postings: Dict[str, Set[str]] = {}
+        # trigram -> vocabulary tokens containing it
+        self._vocab_grams: Dict[str, Set[str]] = {}
+
+    # ----------------- Internal Utilities -----------------
+
+    def _rel(self, path: str) -> str:
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.vault_path)
+        return os.path.normpath(path.lstrip("/\\"))
+
+    def _add_token(self, token: str, rel_path: str):
+        docs = self._postings.get(token)
+        if docs is None:
+            docs = self._postings[token] = set()
+            for gram in _trigrams(token):
+                self._vocab_grams.setdefault(gram, set()).add(token)
+        docs.add(rel_path)
+
+    def _drop_token(self, token: str, rel_path: str):
+        docs = self._postings.get(token)
+        if docs is None:
+            return
+        docs.discard(rel_path)
+        if not docs:
+            del self._postings[token]
+            for gram in _trigrams(token):
+                tokens = self._vocab_grams.get(gram)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._vocab_grams[gram]
+
+    def _index_file(self, rel_path: str, stat: Optional[Tuple[int, int, int]] = None):
+        file_path = os.path.join(self.vault_path, rel_path)
+        try:
+            if stat is None:
+                st = os.stat(file_path)
+                stat = (st.st_mtime_ns, st.st_size, st.st_ino)
+            with open(file_path, "r", encoding="utf-8") as f:
+                tokens = frozenset(_tokenize(f.read()))
+        except FileNotFoundError:
+            self._unindex_file(rel_path)
+            return
+        except Exception as e:
+            print(f"⚠️ Error indexing {rel_path}: {e}")
+            return
+
+        old_tokens = self._doc_tokens.get(rel_path, frozenset())
+        for token in old_tokens - tokens:
+            self._drop_token(token, rel_path)
+        for token in tokens - old_tokens:
+            self._add_token(token, rel_path)
+
+        self._doc_tokens[rel_path] = tokens
+        self._names[rel_path] = os.path.basename(rel_path).lower()
+        self._stats[rel_path] = stat
+        self._mtimes.set(rel_path, stat[0])
+
+    def _unindex_file(self, rel_path: str):
+        for token in self._doc_tokens.pop(rel_path, ()):
+            self._drop_token(token, rel_path)
+        self._names.pop(rel_path, None)
+        self._stats.pop(rel_path, None)
+        self._mtimes.remove(rel_path)
+
+    def _tokens_containing(self, fragment: str) -> Set[str]:
+        if len(fragment) < 3:
+            candidates = [t for t in self._postings if fragment in t]
+        else:
+            grams = sorted(_trigrams(fragment), key=lambda g: len(self._vocab_grams.get(g, ())))
+            candidates = set(self._vocab_grams.get(grams[0], ()))
+            for gram in grams[1:]:
+                if not candidates:
+                    break
+                candidates &= self._vocab_grams.get(gram, set())
+        return {t for t in candidates if fragment in t}
+
+    def _content_candidates(self, query: str) -> Optional[Set[str]]:
+        fragments = _TOKEN_RE.findall(query)
+        if not fragments:
+            return None
+
+        result: Optional[Set[str]] = None
+        # Longer fragments are more selective; starting with them keeps the intersection small.
+        for fragment in sorted(set(fragments), key=len, reverse=True):
+            docs: Set[str] = set()
+            for token in self._tokens_containing(fragment):
+                docs |= self._postings[token]
+            result = docs if result is None else result & docs
+            if not result:
+                return set()
+        return result
+
+    def _contains(self, rel_path: str, query: str) -> bool:
+        try:
+            with open(os.path.join(self.vault_path, rel_path), "r", encoding="utf-8") as f:
+                return query in f.read().lower()
+        except Exception:
+            return False
+
+    # ----------------- Core Methods -----------------
+
+    def build(self):
+        """Reads every note once and populates the index."""
+        with self._lock:
+            for rel_path, stat in scan_markdown(self.vault_path).items():
+                self._index_file(rel_path, stat)
+            self._built = True
+            self._last_refresh = time.time()
+
+    def refresh(self, force: bool = False):
+        """Re-indexes notes whose stat signature changed since the last scan."""
+        with self._lock:
+            if not self._built:
+                self.build()
+                return
+            if not force and (self._watched or time.time() - self._last_refresh < REFRESH_INTERVAL):
+                return
+
+            current = scan_markdown(self.vault_path)
+            for rel_path in set(self._stats) - set(current):
+                self._unindex_file(rel_path)
+            for rel_path, stat in current.items():
+                if self._stats.get(rel_path) != stat:
+                    self._index_file(rel_path, stat)
+            self._last_refresh = time.time()
+
+    def update_file(self, path: str):
+        """Re-indexes a single note after it was created, changed or removed."""
+        rel_path = self._rel(path)
+        if not rel_path.endswith(".md") or get_ignore_rules(self.vault_path).ignored(rel_path):
+            return
+        with self._lock:
+            if not self._built:
+                return
+            try:
+                st = os.stat(os.path.join(self.vault_path, rel_path))
+            except FileNotFoundError:
+                self._unindex_file(rel_path)
+                return
+            stat = (st.st_mtime_ns, st.st_size, st.st_ino)
+            if self._stats.get(rel_path) != stat:
+                self._index_file(rel_path, stat)
+
+    def apply_edit(self, edit):
+        """Adds the words of lines inserted by note_writer without re-reading the note."""
+        rel_path = self._rel(edit.path)
+        with self._lock:
+            if not self._built:
+                return
+            old_tokens = self._doc_tokens.get(rel_path)
+            if old_tokens is None:
+                self.update_file(rel_path)
+                return
+            tokens = frozenset(_tokenize(edit.text))
+            for token in tokens - old_tokens:
+                self._add_token(token, rel_path)
+            self._doc_tokens[rel_path] = old_tokens | tokens
+            self._stats[rel_path] = (edit.mtime_ns, edit.size, edit.inode)
+            self._mtimes.set(rel_path, edit.mtime_ns)
+
+    def attach_watcher(self, watcher):
+        """Subscribes to the vault watcher; from then on reads skip the periodic rescans."""
+        with self._lock:
+            self._watched = True
+        watcher.subscribe(self.apply_changes)
+
+    def apply_changes(self, paths: Optional[Set[str]]):
+        """Vault watcher callback (see attach_watcher)."""
+        with self._lock:
+            self._watched = True
+            if paths is None:
+                self.refresh(force=True)
+                return
+            for path in paths:
+                self.update_file(path)
+
+    def remove_file(self, path: str):
+        with self._lock:
+            self._unindex_file(self._rel(path))
+
+    def search_names(self, query: str) -> List[str]:
+        query = query.lower()
+        self.refresh()
+        with self._lock:
+            return sorted(p for p, name in self._names.items() if query in name)
+
+    def search_content(self, query: str) -> List[str]:
+        query = query.lower()
+        self.refresh()
+        with self._lock:
+            candidates = self._content_candidates(query)
+            if candidates is None:
+                candidates = set(self._stats)
+
+        # A single bare token is fully answered by the postings; anything else
+        # (phrases, punctuation) is confirmed against the candidate notes only.
+        if _TOKEN_RE.fullmatch(query):
+            return sorted(candidates)
+        return sorted(p for p in candidates if self._contains(p, query))
+
+    def search(self, query: str) -> List[str]:
+        return sorted(set(self.search_names(query)) | set(self.search_content(query)))
+
+    def recent(self, limit: int = 20) -> List[Tuple[str, int]]:
+        """The `limit` most recently modified notes as (rel_path, mtime_ns), newest first."""
+        self.refresh()
+        with self._lock:
+            return self._mtimes.recent(limit)
+
+    def modified_since(self, mtime_ns: int, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Notes modified after `mtime_ns` as (rel_path, mtime_ns), newest first."""
+        self.refresh()
+        with self._lock:
+            return self._mtimes.modified_since(mtime_ns, limit)
+
+    def cursor(self) -> str:
+        """Position in the change log; pass it to changes_since() later to get what changed after it."""
+        self.refresh()
+        with self._lock:
+            return self._mtimes.cursor()
+
+    def changes_since(self, cursor: Optional[str]) -> Changes:
+        """Notes changed or deleted after `cursor`; an unknown cursor reports every note (full=True)."""
+        self.refresh()
+        with self._lock:
+            return self._mtimes.changes_since(cursor)
+
+    def search_ranked(self, query: str) -> List[Tuple[str, float]]:
+        """
+        Same matches as search(), best first: name matches, then notes containing the query
+        words as whole words (rarer words weigh more), then recently modified notes.
+        """
+        matches = self.search(query)
+        words = _tokenize(query)
+        now_ns = time.time_ns()
+        with self._lock:
+            total = max(len(self._stats), 1)
+            idf = {w: math.log(1 + total / len(self._postings[w])) for w in words if w in self._postings}
+            ranked = []
+            for rel_path in matches:
+                name = self._names.get(rel_path, os.path.basename(rel_path).lower())
+                score = 3.0 if query.lower() in name else 0.0
+                if words:
+                    score += sum(1 for w in words if w in name) / len(words)
+                tokens = self._doc_tokens.get(rel_path, frozenset())
+                score += sum(weight for w, weight in idf.items() if w in tokens)
+                stat = self._stats.get(rel_path)
+                if stat:
+                    age_days = max(now_ns - stat[0], 0) / 86400e9
+                    score += 0.5 * math.exp(-age_days / 30)
+                ranked.append((rel_path, round(score, 4)))
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked
+
+
+_indexes: Dict[str, VaultIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_vault_index(vault_path: str) -> VaultIndex:
+    """Returns the resident index for a vault, creating it on first use."""
+    key = os.path.abspath(vault_path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = VaultIndex(key)
+        return index
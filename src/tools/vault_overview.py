@@ -0,0 +1,287 @@
+"""
+Vault Overview for Obsidian Assistant
+
+Structural overview of the vault computed from the files themselves: folder
+tree with note counts, top tags, recent activity and MOCs (maps of content).
+Per-note stats are re-read only when a note's (mtime, size) changes, so the
+overview stays current for the cost of the notes that changed.
+
+Each section has a coarse signature of its stats. An optional LLM summary is
+kept per section in .assistant/overview.json and only regenerated for
+sections whose signature changed since it was written.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import datetime
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+
+from tools.ignore_rules import get_ignore_rules
+from tools.tag_index import get_tag_index
+from tools.vault_index import REFRESH_INTERVAL, get_vault_index, scan_markdown
+
+OVERVIEW_FILENAME = "overview.md"
+OVERVIEW_STATE_FILENAME = "overview.json"
+# A note linking to at least this many notes is listed as a MOC.
+MOC_MIN_LINKS = 10
+TOP_TAGS = 20
+RECENT_NOTES = 10
+TREE_DEPTH = 2
+
+_WIKILINK_RE = re.compile(r"\[\[([^\]|#]+)")
+
+
+class Section(NamedTuple):
+    key: str
+    title: str
+    markdown: str
+    signature: str
+
+
+def _signature(*parts) -> str:
+    return hashlib.md5(json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _bucket(count: int) -> int:
+    """Rounds a count to two significant digits, so small growth doesn't count as a change."""
+    if count < 10:
+        return count
+    scale = 10 ** (len(str(count)) - 2)
+    return round(count / scale) * scale
+
+
+class VaultOverview:
+    def __init__(self, vault_path: str):
+        self.vault_path = os.path.abspath(vault_path)
+        self.overview_path = os.path.join(self.vault_path, ".assistant", OVERVIEW_FILENAME)
+        self.state_path = os.path.join(self.vault_path, ".assistant", OVERVIEW_STATE_FILENAME)
+        self._lock = threading.RLock()
+        self._built = False
+        self._watched = False
+        self._last_refresh = 0.0
+        # Position in the vault index's change log this overview has caught up to.
+        self._cursor: Optional[str] = None
+
+        # rel_path -> {"mtime_ns", "size", "links"}
+        self._notes: Dict[str, dict] = {}
+        # section key -> {"signature", "summary"}
+        self._summaries: Dict[str, dict] = self._load_summaries()
+
+    # ----------------- Internal Utilities -----------------
+
+    def _rel(self, path: str) -> str:
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.vault_path)
+        return os.path.normpath(path.lstrip("/\\"))
+
+    def _load_summaries(self) -> Dict[str, dict]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("sections", {})
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Error loading overview state from {self.state_path}: {e}")
+            return {}
+
+    def _write(self, path: str, content: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _read_note(self, rel_path: str, mtime_ns: int, size: int) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.vault_path, rel_path), "r", encoding="utf-8") as f:
+                links = {m.strip().lower() for m in _WIKILINK_RE.findall(f.read())}
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading file {rel_path}: {e}")
+            links = set()
+        return {"mtime_ns": mtime_ns, "size": size, "links": len(links)}
+
+    def _tree_section(self, notes: Dict[str, dict]) -> Section:
+        counts: Counter = Counter()
+        for rel_path in notes:
+            parts = rel_path.replace(os.sep, "/").split("/")[:-1]
+            counts["."] += 1
+            for depth in range(1, min(len(parts), TREE_DEPTH) + 1):
+                counts["/".join(parts[:depth])] += 1
+
+        lines = [f"- {counts['.']} notes in total, {sum(1 for p in notes if os.sep not in p and '/' not in p)} at the top level"]
+        for folder in sorted((f for f in counts if f != "."), key=str.lower):
+            depth = folder.count("/")
+            lines.append(f"{'  ' * depth}- {folder.rsplit('/', 1)[-1]}/ ({counts[folder]} notes)")
+        signature = _signature(sorted((f, _bucket(c)) for f, c in counts.items()))
+        return Section("tree", "Folder structure", "\n".join(lines), signature)
+
+    def _tags_section(self) -> Section:
+        counts = get_tag_index(self.vault_path).tag_counts()
+        top = list(counts.items())[:TOP_TAGS]
+        lines = [f"- {tag} ({count} notes)" for tag, count in top] or ["- No tags yet."]
+        signature = _signature(sorted(tag.lower() for tag, _ in top[:10]))
+        return Section("tags", "Top tags", "\n".join(lines), signature)
+
+    def _recent_section(self, notes: Dict[str, dict]) -> Section:
+        now = time.time()
+        recent = sorted(notes.items(), key=lambda item: -item[1]["mtime_ns"])
+        windows = {days: sum(1 for _, n in recent if now - n["mtime_ns"] / 1e9 <= days * 86400) for days in (1, 7, 30)}
+        lines = [f"- Edited in the last day: {windows[1]}, week: {windows[7]}, month: {windows[30]}"]
+        for rel_path, note in recent[:RECENT_NOTES]:
+            when = datetime.datetime.fromtimestamp(note["mtime_ns"] / 1e9).strftime("%Y-%m-%d")
+            lines.append(f"- {when} {rel_path}")
+        # Which folders are active this week, not which exact notes: summaries stay valid within a week.
+        active = sorted({p.replace(os.sep, "/").split("/")[0] for p, n in recent if now - n["mtime_ns"] / 1e9 <= 7 * 86400})
+        signature = _signature(datetime.date.today().isocalendar()[:2], active)
+        return Section("recent", "Recent activity", "\n".join(lines), signature)
+
+    def _mocs_section(self, notes: Dict[str, dict]) -> Section:
+        mocs = [
+            (rel_path, note["links"]) for rel_path, note in notes.items()
+            if "moc" in os.path.basename(rel_path).lower() or note["links"] >= MOC_MIN_LINKS
+        ]
+        mocs.sort(key=lambda item: (-item[1], item[0].lower()))
+        lines = [f"- {rel_path} (links to {links} notes)" for rel_path, links in mocs[:20]] or ["- No MOCs found."]
+        signature = _signature(sorted(rel_path for rel_path, _ in mocs[:20]))
+        return Section("mocs", "Maps of content", "\n".join(lines), signature)
+
+    # ----------------- Core Methods -----------------
+
+    def refresh(self, force: bool = False):
+        """
+        Re-reads notes changed since the last refresh and drops deleted notes. Catches up
+        through the vault index's change log; only the first refresh scans the vault.
+        """
+        with self._lock:
+            if self._built and not force and (self._watched or time.time() - self._last_refresh < REFRESH_INTERVAL):
+                return
+            changes = get_vault_index(self.vault_path).changes_since(self._cursor)
+            self._cursor = changes.cursor
+            if self._built and not changes.full:
+                for rel_path in changes.deleted:
+                    self._notes.pop(rel_path, None)
+                for rel_path in changes.changed:
+                    self.update_file(rel_path)
+                self._last_refresh = time.time()
+                return
+
+            current = scan_markdown(self.vault_path)
+            for rel_path in set(self._notes) - set(current):
+                del self._notes[rel_path]
+            for rel_path, (mtime_ns, size, _) in current.items():
+                note = self._notes.get(rel_path)
+                if note and note["mtime_ns"] == mtime_ns and note["size"] == size:
+                    continue
+                note = self._read_note(rel_path, mtime_ns, size)
+                if note:
+                    self._notes[rel_path] = note
+            self._built = True
+            self._last_refresh = time.time()
+
+    def update_file(self, path: str):
+        """Re-reads a single note after it was created, changed or removed."""
+        rel_path = self._rel(path)
+        if not rel_path.endswith(".md") or get_ignore_rules(self.vault_path).ignored(rel_path):
+            return
+        with self._lock:
+            if not self._built:
+                return
+            try:
+                st = os.stat(os.path.join(self.vault_path, rel_path))
+            except FileNotFoundError:
+                self._notes.pop(rel_path, None)
+                return
+            old = self._notes.get(rel_path)
+            if old and old["mtime_ns"] == st.st_mtime_ns and old["size"] == st.st_size:
+                return
+            note = self._read_note(rel_path, st.st_mtime_ns, st.st_size)
+            if note:
+                self._notes[rel_path] = note
+
+    def attach_watcher(self, watcher):
+        """Subscribes to the vault watcher; from then on reads skip the periodic rescans."""
+        with self._lock:
+            self._watched = True
+        watcher.subscribe(self.apply_changes)
+
+    def apply_changes(self, paths: Optional[Set[str]]):
+        """Vault watcher callback (see attach_watcher)."""
+        with self._lock:
+            self._watched = True
+            if paths is None:
+                self.refresh(force=True)
+                return
+            for path in paths:
+                self.update_file(path)
+
+    def sections(self) -> List[Section]:
+        self.refresh()
+        with self._lock:
+            notes = dict(self._notes)
+        return [self._tree_section(notes), self._tags_section(), self._recent_section(notes), self._mocs_section(notes)]
+
+    def stale_sections(self) -> List[Section]:
+        """Sections whose stats changed since their summary was written (or that have none)."""
+        with self._lock:
+            summaries = dict(self._summaries)
+        return [s for s in self.sections() if summaries.get(s.key, {}).get("signature") != s.signature]
+
+    def summarize(self, summarizer: Callable[[str, str], str]) -> List[str]:
+        """
+        Calls summarizer(title, markdown) for stale sections only and stores the results.
+        Returns the keys of the sections that were re-summarized.
+        """
+        updated = []
+        for section in self.stale_sections():
+            try:
+                summary = summarizer(section.title, section.markdown)
+            except Exception as e:
+                print(f"⚠️ Failed to summarize overview section '{section.title}': {e}")
+                continue
+            with self._lock:
+                self._summaries[section.key] = {"signature": section.signature, "summary": (summary or "").strip()}
+            updated.append(section.key)
+        if updated:
+            with self._lock:
+                self._write(self.state_path, json.dumps({"sections": self._summaries}, ensure_ascii=False, indent=2))
+        return updated
+
+    def render(self) -> str:
+        with self._lock:
+            summaries = dict(self._summaries)
+        parts = [f"# Vault overview\n\n_Updated {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}_"]
+        for section in self.sections():
+            parts.append(f"## {section.title}")
+            summary = summaries.get(section.key, {}).get("summary")
+            if summary:
+                parts.append(summary)
+            parts.append(section.markdown)
+        return "\n\n".join(parts) + "\n"
+
+    def write(self) -> str:
+        """Renders the overview to .assistant/overview.md and returns it."""
+        overview = self.render()
+        self._write(self.overview_path, overview)
+        return overview
+
+
+# Single overview per vault.
+_overviews: Dict[str, VaultOverview] = {}
+_overviews_lock = threading.Lock()
+
+
+def get_vault_overview(vault_path: str) -> VaultOverview:
+    """Returns the overview for a vault; notes are read on first use."""
+    key = os.path.abspath(vault_path)
+    with _overviews_lock:
+        overview = _overviews.get(key)
+        if overview is None:
+            overview = _overviews[key] = VaultOverview(key)
+        return overview
@@ -0,0 +1,276 @@
+"""
+Vault Watcher for Obsidian Assistant
+
+Detects note changes and hands them to subscribers (embedder, indexes) as
+debounced batches of relative paths. Uses inotify on Linux and falls back to
+a stat-only polling loop elsewhere. There is exactly one watcher per vault,
+see get_vault_watcher().
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+from tools.ignore_rules import get_ignore_rules
+from tools.vault_index import scan_markdown
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Subscribers receive a set of changed note paths (relative to the vault), or
+# None when the watcher lost track of changes and a full rescan is needed.
+ChangeCallback = Callable[[Optional[Set[str]]], None]
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, "inotify_init1") else None
+
+
+class VaultWatcher:
+    def __init__(self, vault_path: str, debounce: float = 2.0, poll_interval: float = 10.0, mode: str = "auto"):
+        """
+        :param vault_path: Path to the vault to watch.
+        :param debounce: Seconds without new events before a batch is delivered.
+        :param poll_interval: Seconds between scans when running in polling mode.
+        :param mode: "inotify", "poll", or "auto" (inotify when available).
+        """
+        self.vault_path = os.path.abspath(vault_path)
+        self.debounce = debounce
+        self.max_delay = debounce * 10
+        self.poll_interval = poll_interval
+        self.mode = mode
+
+        self._subscribers: List[ChangeCallback] = []
+        self._cond = threading.Condition()
+        self._pending: Set[str] = set()
+        self._rescan = False
+        self._first_event = 0.0
+        self._last_event = 0.0
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        self._fd = -1
+        self._watches: Dict[int, str] = {}
+        self._rules = get_ignore_rules(self.vault_path)
+
+    # ----------------- Internal Utilities -----------------
+
+    def _skip_dir(self, path: str) -> bool:
+        return self._rules.ignored(self._rel(path), is_dir=True)
+
+    def _rel(self, path: str) -> str:
+        return os.path.relpath(path, self.vault_path)
+
+    def _notify(self, rel_path: Optional[str] = None):
+        """Queues a changed path; None requests a full rescan."""
+        if rel_path is not None and (not rel_path.endswith(".md") or self._rules.ignored(rel_path)):
+            return
+        with self._cond:
+            now = time.time()
+            if not self._pending and not self._rescan:
+                self._first_event = now
+            self._last_event = now
+            if rel_path is None:
+                self._rescan = True
+            else:
+                self._pending.add(rel_path)
+            self._cond.notify()
+
+    def _dispatch(self, paths: Optional[Set[str]]):
+        for callback in list(self._subscribers):
+            try:
+                callback(paths)
+            except Exception as e:
+                print(f"⚠️ Vault watcher subscriber {callback} failed: {e}")
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            with self._cond:
+                while not (self._pending or self._rescan) and not self._stop.is_set():
+                    self._cond.wait()
+                while not self._stop.is_set():
+                    now = time.time()
+                    remaining = min(self._last_event + self.debounce, self._first_event + self.max_delay) - now
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                paths = None if self._rescan else self._pending
+                self._pending = set()
+                self._rescan = False
+            if self._stop.is_set():
+                return
+            self._dispatch(paths)
+
+    # ----------------- inotify backend -----------------
+
+    def _add_watches(self, libc, top: str, emit_existing: bool = False):
+        for root, dirs, files in os.walk(top):
+            dirs[:] = [d for d in dirs if not self._skip_dir(os.path.join(root, d))]
+            wd = libc.inotify_add_watch(self._fd, root.encode(), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOSPC:
+                    raise OSError(err, "inotify watch limit reached (fs.inotify.max_user_watches)")
+                continue
+            self._watches[wd] = root
+            if emit_existing:
+                for f in files:
+                    self._notify(self._rel(os.path.join(root, f)))
+
+    def _handle_event(self, libc, wd: int, mask: int, name: str):
+        if mask & IN_Q_OVERFLOW:
+            self._notify(None)
+            return
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+            return
+        directory = self._watches.get(wd)
+        if directory is None or not name:
+            return
+
+        path = os.path.join(directory, name)
+        if mask & IN_ISDIR:
+            if self._skip_dir(path):
+                return
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._add_watches(libc, path, emit_existing=True)
+            elif mask & IN_MOVED_FROM:
+                # A directory moved away takes its notes with it without per-file events.
+                self._notify(None)
+            return
+        self._notify(self._rel(path))
+
+    def _inotify_loop(self, libc):
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([self._fd], [], [], 1.0)
+                if not ready:
+                    continue
+                buf = os.read(self._fd, 64 * 1024)
+                offset = 0
+                while offset < len(buf):
+                    wd, mask, _, length = _EVENT_HEADER.unpack_from(buf, offset)
+                    offset += _EVENT_HEADER.size
+                    name = buf[offset:offset + length].rstrip(b"\0").decode("utf-8", "surrogateescape")
+                    offset += length
+                    self._handle_event(libc, wd, mask, name)
+        finally:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _start_inotify(self) -> Optional[threading.Thread]:
+        libc = _load_libc()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        self._fd = fd
+        try:
+            self._add_watches(libc, self.vault_path)
+        except OSError as e:
+            print(f"⚠️ inotify unavailable ({e}), falling back to polling.")
+            os.close(fd)
+            self._fd = -1
+            self._watches.clear()
+            return None
+        return threading.Thread(target=self._inotify_loop, args=(libc,), daemon=True, name="vault-watcher")
+
+    # ----------------- polling backend -----------------
+
+    def _poll_loop(self):
+        snapshot = scan_markdown(self.vault_path)
+        while not self._stop.wait(self.poll_interval):
+            current = scan_markdown(self.vault_path)
+            for rel_path in set(snapshot) - set(current):
+                self._notify(rel_path)
+            for rel_path, stat in current.items():
+                if snapshot.get(rel_path) != stat:
+                    self._notify(rel_path)
+            snapshot = current
+
+    # ----------------- Core Methods -----------------
+
+    def subscribe(self, callback: ChangeCallback):
+        """Registers a change callback. Registering the same callback twice is a no-op."""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: ChangeCallback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self) -> "VaultWatcher":
+        """Starts watching. Calling start() on a running watcher does nothing."""
+        if self.running:
+            return self
+        self._stop.clear()
+
+        source = None
+        if self.mode in ("auto", "inotify"):
+            source = self._start_inotify()
+            if source is None and self.mode == "inotify":
+                raise RuntimeError("inotify is not available on this system.")
+        if source is None:
+            source = threading.Thread(target=self._poll_loop, daemon=True, name="vault-watcher")
+            print(f"👀 Watching vault by polling every {self.poll_interval}s: {self.vault_path}")
+        else:
+            print(f"👀 Watching vault with inotify ({len(self._watches)} directories): {self.vault_path}")
+
+        flusher = threading.Thread(target=self._flush_loop, daemon=True, name="vault-watcher-flush")
+        self._threads = [source, flusher]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        self._watches.clear()
+
+
+_watchers: Dict[str, VaultWatcher] = {}
+_watchers_lock = threading.Lock()
+
+
+def get_vault_watcher(vault_path: str) -> VaultWatcher:
+    """Returns the single watcher for a vault, creating it on first use (not started)."""
+    key = os.path.abspath(vault_path)
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = _watchers[key] = VaultWatcher(key)
+        return watcher
@@ -0,0 +1,230 @@
+"""
+Vector table maintenance for Obsidian Assistant
+
+Every sync appends a small fragment to the LanceDB table and every delete
+adds a deletion file, so after months of journal edits a search opens
+hundreds of tiny files and filters tombstoned rows. The scheduler below runs
+in the background: once enough rows were written or deleted (or every
+MAINTENANCE_INTERVAL seconds when anything changed) it compacts the table,
+removes versions older than CLEANUP_OLDER_THAN and folds new rows into the
+existing indexes.
+
+It also keeps the indexes themselves: a native full-text index on the payload
+for hybrid search (built here so agno does not rebuild it on the first query
+of every process), and an IVF_PQ vector index once the table passes
+ANN_MIN_ROWS rows, retrained when the table has doubled since it was trained.
+
+For the NumPy store (tools/vector_store.py) maintenance is a compaction once
+MIN_CHANGES rows (or as many rows as are live) are dead; the store never
+compacts on its own, so a sync never waits for a rewrite. It has no indexes
+to build.
+"""
+
+import math
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, Optional
+
+from tools.telemetry import traced
+from tools.vector_store import NumpyVectorDb
+
+# Seconds between scheduled runs, when anything changed since the last one.
+MAINTENANCE_INTERVAL = 15 * 60
+# Rows written or deleted since the last run that trigger one right away.
+MIN_CHANGES = 2000
+# Table versions younger than this are kept for readers still using them.
+CLEANUP_OLDER_THAN = timedelta(hours=1)
+# Below this many rows a flat scan is fast enough and an index would only cost recall.
+ANN_MIN_ROWS = 50_000
+# Retrain the vector index once the table is this many times the size it was trained on.
+ANN_RETRAIN_GROWTH = 2.0
+FTS_COLUMN = "payload"
+VECTOR_COLUMN = "vector"
+
+
+class VectorMaintenance:
+    def __init__(self, vector_db, lock=None, on_change: Optional[Callable[[], None]] = None,
+                 interval: float = MAINTENANCE_INTERVAL, min_changes: int = MIN_CHANGES,
+                 cleanup_older_than: timedelta = CLEANUP_OLDER_THAN, ann_min_rows: int = ANN_MIN_ROWS):
+        """
+        :param lock: Held while compacting, so compaction never races a sync's deletes.
+            Index builds run outside it; rows written meanwhile are picked up by the next run.
+        :param on_change: Called after a run changed the indexes (e.g. to drop cached searches).
+        """
+        self.vector_db = vector_db
+        self.lock = lock or threading.RLock()
+        self.on_change = on_change
+        self.interval = interval
+        self.min_changes = min_changes
+        self.cleanup_older_than = cleanup_older_than
+        self.ann_min_rows = ann_min_rows
+        self._pending = 0
+        self._ann_rows = None
+        self._run_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.last_run = None
+        self.last_report = None
+
+    # ----------------- Internal Utilities -----------------
+
+    @property
+    def _is_lance(self) -> bool:
+        return not isinstance(self.vector_db, NumpyVectorDb)
+
+    def _table(self):
+        return getattr(self.vector_db, "table", None)
+
+    def _indices(self) -> dict:
+        """Index configs by column name."""
+        table = self._table()
+        if table is None:
+            return {}
+        return {column: index for index in table.list_indices() for column in index.columns}
+
+    def _build_fts(self, table):
+        from lancedb.index import FTS
+        table.create_index(FTS_COLUMN, config=FTS(), replace=True)
+        print(f"🔎 Built full-text index on {FTS_COLUMN} ({table.count_rows()} rows).")
+
+    def _build_ann(self, table, rows: int):
+        from lancedb.index import IvfPq
+        dimensions = table.schema.field(VECTOR_COLUMN).type.list_size
+        config = IvfPq(
+            distance_type="cosine",
+            num_partitions=max(1, int(math.sqrt(rows))),
+            # 16 dimensions per sub-vector; must divide the dimension count.
+            num_sub_vectors=dimensions // 16 if dimensions % 16 == 0 else 1,
+        )
+        started = time.time()
+        table.create_index(VECTOR_COLUMN, config=config, replace=True)
+        self._ann_rows = rows
+        print(f"🧭 Built vector index on {rows} rows in {time.time() - started:.1f}s.")
+
+    def _maintain_lance(self) -> dict:
+        table = self._table()
+        if table is None:
+            return {"actions": [], "indexes_changed": False}
+        actions = []
+        with self.lock:
+            before = table.stats()["fragment_stats"]["num_fragments"]
+            # Compacts small fragments, drops deleted rows, removes old versions and
+            # adds rows written since the last run to the existing indexes.
+            table.optimize(cleanup_older_than=self.cleanup_older_than)
+            after = table.stats()["fragment_stats"]["num_fragments"]
+        if after < before:
+            actions.append(f"compacted {before} fragments into {after}")
+
+        rows = table.count_rows()
+        indices = self._indices()
+        if rows and FTS_COLUMN not in indices:
+            self._build_fts(table)
+            actions.append("built full-text index")
+        if VECTOR_COLUMN in indices and self._ann_rows is None:
+            self._ann_rows = table.index_stats(indices[VECTOR_COLUMN].name).num_indexed_rows
+        if rows >= self.ann_min_rows and (
+                VECTOR_COLUMN not in indices or rows >= self._ann_rows * ANN_RETRAIN_GROWTH):
+            self._build_ann(table, rows)
+            actions.append("built vector index")
+        self.attach()
+        return {"actions": actions, "indexes_changed": any("index" in action for action in actions)}
+
+    def _maintain_numpy(self) -> dict:
+        stats = self.vector_db.stats()
+        if stats["dead"] and stats["dead"] >= min(self.min_changes, stats["live"]):
+            with self.lock:
+                self.vector_db.compact()
+            return {"actions": [f"dropped {stats['dead']} dead rows"], "indexes_changed": False}
+        return {"actions": [], "indexes_changed": False}
+
+    def _loop(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._pending and self.last_run is not None:
+                continue
+            try:
+                self.run()
+            except Exception as e:
+                print(f"⚠️ Vector table maintenance failed: {e}")
+
+    # ----------------- Core Methods -----------------
+
+    def attach(self):
+        """
+        Tells agno's LanceDb that the full-text index already exists, so its hybrid search
+        uses the maintained index instead of building one on the first query.
+        """
+        if self._is_lance and FTS_COLUMN in self._indices():
+            self.vector_db.fts_index_exists = True
+
+    def record(self, changed_rows: int):
+        """Counts rows written or deleted; wakes the scheduler once MIN_CHANGES accumulate."""
+        if changed_rows <= 0:
+            return
+        self._pending += changed_rows
+        if self._pending >= self.min_changes:
+            self._wake.set()
+
+    def start(self):
+        """Starts the background scheduler (idempotent). Its first run is right away."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="vector-maintenance", daemon=True)
+            self._thread.start()
+            self._wake.set()
+        return self._thread
+
+    @traced("vector.maintenance")
+    def run(self) -> dict:
+        """Runs maintenance now. Returns the fragmentation stats before and after, and what was done."""
+        with self._run_lock:
+            pending, self._pending = self._pending, 0
+            started = time.time()
+            before = self.stats()
+            try:
+                report = self._maintain_lance() if self._is_lance else self._maintain_numpy()
+            except Exception:
+                self._pending += pending
+                raise
+            report.update({"before": before, "after": self.stats(), "changed_rows": pending,
+                           "seconds": round(time.time() - started, 2)})
+            self.last_run = time.time()
+            self.last_report = report
+            if report["indexes_changed"] and self.on_change:
+                self.on_change()
+            print(f"🧹 Vector table maintenance: {', '.join(report['actions']) or 'nothing to do'} "
+                  f"({report['seconds']}s)")
+            return report
+
+    def stats(self) -> dict:
+        """Fragmentation of the vector table: fragments, small fragments, deleted rows, versions and indexes."""
+        if not self._is_lance:
+            return self.vector_db.stats()
+        table = self._table()
+        if table is None:
+            return {}
+        stats = table.stats()
+        fragments = stats["fragment_stats"]
+        live = stats["num_rows"]
+        # Fragment lengths count deleted rows too; the mean is rounded, so this is approximate.
+        physical = fragments["lengths"]["mean"] * fragments["num_fragments"] if fragments["num_fragments"] else 0
+        indices = {}
+        for index in table.list_indices():
+            index_stats = table.index_stats(index.name)
+            indices[index.name] = {
+                "type": str(index.index_type),
+                "columns": list(index.columns),
+                "indexed_rows": index_stats.num_indexed_rows,
+                "unindexed_rows": index_stats.num_unindexed_rows,
+            }
+        return {
+            "rows": live,
+            "deleted_rows": max(0, physical - live),
+            "bytes": stats["total_bytes"],
+            "fragments": fragments["num_fragments"],
+            "small_fragments": fragments["num_small_fragments"],
+            "fragment_rows": fragments["lengths"],
+            "versions": len(table.list_versions()),
+            "indices": indices,
+        }
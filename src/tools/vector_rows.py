@@ -0,0 +1,75 @@
+"""
+Row access to a vector DB for VaultEmbedder.
+
+agno's VectorDb interface only inserts documents (embedding them itself) and
+searches. The embedder also writes vectors it embedded in batches, moves
+rows between notes and reconciles ids, so it goes through the small row
+interface below. NumpyVectorDb implements it natively; LanceRows implements
+it on a LanceDb table. Rows are {"id", "vector", "payload"}, with the payload
+as a dict ({"name", "meta_data", "content", "usage"}).
+"""
+
+import json
+from typing import Dict, Iterable, List
+
+from tools.vector_store import NumpyVectorDb
+
+# Maximum ids per bulk LanceDB predicate.
+DELETE_CHUNK = 500
+
+
+def _quoted(ids: List[str]) -> str:
+    return ", ".join(f"'{doc_id}'" for doc_id in ids)
+
+
+class LanceRows:
+    """The row interface on a LanceDb table, in the row format LanceDb.insert uses."""
+
+    def __init__(self, vector_db):
+        self.vector_db = vector_db
+
+    @property
+    def table(self):
+        return self.vector_db.table
+
+    def add_rows(self, rows: List[dict]):
+        if rows:
+            self.table.add([{"id": row["id"], "vector": row["vector"], "payload": json.dumps(row["payload"])}
+                            for row in rows])
+
+    def get_rows(self, ids: Iterable[str], vectors: bool = True) -> List[dict]:
+        ids = sorted(set(ids))
+        columns = ["id", "vector", "payload"] if vectors else ["id", "payload"]
+        rows = []
+        for i in range(0, len(ids), DELETE_CHUNK):
+            part = ids[i:i + DELETE_CHUNK]
+            found = self.table.search().where(f"id IN ({_quoted(part)})").select(columns).limit(len(part)).to_list()
+            for row in found:
+                row["payload"] = json.loads(row["payload"])
+                rows.append(row)
+        return rows
+
+    def update_payloads(self, payloads: Dict[str, dict]):
+        rows = self.get_rows(payloads)
+        for row in rows:
+            row["payload"] = json.dumps(payloads[row["id"]])
+        if rows:
+            self.table.merge_insert("id").when_matched_update_all().execute(rows)
+
+    def delete_ids(self, ids: Iterable[str]):
+        ids = sorted(set(ids))
+        for i in range(0, len(ids), DELETE_CHUNK):
+            self.table.delete(f"id IN ({_quoted(ids[i:i + DELETE_CHUNK])})")
+
+    def all_ids(self) -> List[str]:
+        count = self.table.count_rows()
+        if not count:
+            return []
+        return self.table.search().select(["id"]).limit(count).to_arrow().column("id").to_pylist()
+
+
+def row_store(vector_db):
+    """Returns the row interface for a vector DB."""
+    if isinstance(vector_db, NumpyVectorDb):
+        return vector_db
+    return LanceRows(vector_db)
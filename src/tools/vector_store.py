@@ -0,0 +1,506 @@
+"""
+In-process vector store for Obsidian Assistant
+
+An agno VectorDb kept in two append-only files under one folder: unit-length
+float16 vectors in a flat array that searches read through a memory map, and
+a JSON-lines log of row payloads, payload updates and deletions. Opening the
+store replays the log; no server, table format or index build is involved.
+
+Search is exact: cosine similarity is a dot product against every live row
+(or, with the optional keyword pre-filter, only rows containing a query word),
+followed by a top-k partition. Converting float16 to float32 costs more than
+the dot product itself, so rows are converted once into a resident float32
+matrix (extended as rows are appended) while it fits in `resident_max_bytes`;
+past that, each query converts the memory-mapped rows block by block.
+
+Deleted and replaced rows stay in the files until compaction rewrites the
+live rows into a new generation of files; the switch is a rename of
+meta.json, so a crash leaves either the old or the new generation intact.
+Writes never compact: VectorMaintenance (tools/vector_maintenance.py) does,
+in the background, once enough rows are dead.
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from agno.document import Document
+from agno.embedder import Embedder
+from agno.vectordb.base import VectorDb
+
+META_FILENAME = "meta.json"
+STORE_VERSION = 1
+# Rows scored per NumPy block; bounds the float32 copy made of the float16 matrix.
+BLOCK_ROWS = 8192
+# Largest resident float32 matrix (about 85k rows of 1536 dimensions).
+RESIDENT_MAX_BYTES = 512 * 1024 * 1024
+# With the keyword pre-filter, a best pre-filtered score below this falls back to scoring every row.
+PREFILTER_MIN_SCORE = 0.5
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> Set[str]:
+    return {t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 2}
+
+
+def _unit(vector) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(v))
+    return v / norm if norm else v
+
+
+class NumpyVectorDb(VectorDb):
+    def __init__(self, path: str, embedder: Optional[Embedder] = None, keyword_prefilter: bool = False,
+                 resident_max_bytes: int = RESIDENT_MAX_BYTES):
+        """
+        :param path: Folder holding the store's files (created on create()).
+        :param embedder: Embedder for queries and insert(); OpenAIEmbedder when None.
+        :param keyword_prefilter: Score only rows that share a word with the query, as long as
+            there are at least `limit` of them and the best of them scores PREFILTER_MIN_SCORE;
+            otherwise every row is scored. Off by default: it is faster on large stores but
+            can miss paraphrases and inflected forms (see the recall numbers in benchmarks/run.py).
+        :param resident_max_bytes: Memory allowed for the float32 copy of the vectors; 0 always
+            scores from the memory map.
+        """
+        if embedder is None:
+            from agno.embedder.openai import OpenAIEmbedder
+
+            embedder = OpenAIEmbedder()
+        self.embedder: Embedder = embedder
+        self.dimensions: Optional[int] = self.embedder.dimensions
+        if self.dimensions is None:
+            raise ValueError("Embedder.dimensions must be set.")
+
+        self.path = os.path.abspath(path)
+        self.keyword_prefilter = keyword_prefilter
+        self.resident_max_bytes = resident_max_bytes
+        self._lock = threading.RLock()
+        self._open = False
+        self._reset()
+
+    # ----------------- Internal Utilities -----------------
+
+    def _reset(self):
+        self._generation = 0
+        self._mm: Optional[np.memmap] = None
+        # float32 copy of the first _resident_rows rows, with spare capacity for appends
+        self._resident: Optional[np.ndarray] = None
+        self._resident_rows = 0
+        # row -> id (None once deleted or replaced); rows are positions in the vector file
+        self._ids: List[Optional[str]] = []
+        self._row_of: Dict[str, int] = {}
+        self._payloads: Dict[int, dict] = {}
+        self._names: Dict[str, Set[int]] = {}
+        # word -> live rows containing it, built on the first pre-filtered search
+        self._postings: Optional[Dict[str, Set[int]]] = None
+        # live rows for full scans, rebuilt after rows change
+        self._live: Optional[np.ndarray] = None
+        self._dead = 0
+
+    def _file(self, kind: str, generation: Optional[int] = None) -> str:
+        generation = self._generation if generation is None else generation
+        return os.path.join(self.path, f"{kind}.{generation}.{'f16' if kind == 'vectors' else 'jsonl'}")
+
+    def _row_bytes(self) -> int:
+        return self.dimensions * 2
+
+    def _release(self):
+        """Drops the memory map (it is re-created on the next search)."""
+        if self._mm is not None:
+            mm, self._mm = self._mm, None
+            try:
+                mm._mmap.close()
+            except Exception:
+                pass
+
+    def _matrix(self) -> Optional[np.ndarray]:
+        if self._mm is None and self._ids:
+            self._mm = np.memmap(self._file("vectors"), dtype=np.float16, mode="r",
+                                 shape=(len(self._ids), self.dimensions))
+        return self._mm
+
+    def _resident_matrix(self) -> Optional[np.ndarray]:
+        """The float32 copy of every row, converting only rows appended since the last call."""
+        rows = len(self._ids)
+        if not rows or rows * self.dimensions * 4 > self.resident_max_bytes:
+            self._resident, self._resident_rows = None, 0
+            return None
+        if self._resident is None or len(self._resident) < rows:
+            grown = np.empty((max(rows + rows // 4, 1024), self.dimensions), dtype=np.float32)
+            if self._resident is not None:
+                grown[:self._resident_rows] = self._resident[:self._resident_rows]
+            self._resident = grown
+        matrix = self._matrix()
+        for start in range(self._resident_rows, rows, BLOCK_ROWS):
+            end = min(start + BLOCK_ROWS, rows)
+            self._resident[start:end] = matrix[start:end]
+        self._resident_rows = rows
+        return self._resident[:rows]
+
+    def _write_meta(self, generation: int):
+        tmp_path = os.path.join(self.path, META_FILENAME + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": STORE_VERSION, "dimensions": self.dimensions, "generation": generation}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.path, META_FILENAME))
+
+    def _remove_stale_files(self):
+        """Deletes files of older generations (left behind by a compaction that could not delete them)."""
+        current = {os.path.basename(self._file("vectors")), os.path.basename(self._file("rows"))}
+        for name in os.listdir(self.path):
+            if (name.startswith("vectors.") or name.startswith("rows.")) and name not in current:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+    def _load(self):
+        """Opens the current generation and replays its row log."""
+        self._reset()
+        os.makedirs(self.path, exist_ok=True)
+        meta_path = os.path.join(self.path, META_FILENAME)
+        if not os.path.exists(meta_path):
+            self._write_meta(0)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("dimensions") != self.dimensions:
+            raise ValueError(f"Vector store at {self.path} has {meta.get('dimensions')} dimensions, "
+                             f"the embedder has {self.dimensions}; drop the store to rebuild it.")
+        self._generation = meta.get("generation", 0)
+        self._remove_stale_files()
+
+        vectors_path = self._file("vectors")
+        if not os.path.exists(vectors_path):
+            open(vectors_path, "wb").close()
+        rows = os.path.getsize(vectors_path) // self._row_bytes()
+        # Vectors written after the last logged row (an interrupted append) are dead until compaction.
+        self._ids = [None] * rows
+
+        try:
+            with open(self._file("rows"), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn last line from an interrupted write.
+                        continue
+                    if "delete" in entry:
+                        self._forget(entry["delete"])
+                    elif entry.get("row", rows) < rows:
+                        self._place(entry["id"], entry["row"], entry["payload"])
+        except FileNotFoundError:
+            pass
+        self._dead = sum(1 for doc_id in self._ids if doc_id is None)
+        self._open = True
+
+    def _place(self, doc_id: str, row: int, payload: dict):
+        """Points `doc_id` at `row` (a payload update when it already points there)."""
+        old = self._row_of.get(doc_id)
+        if old is not None and old != row:
+            self._forget(doc_id)
+        if old == row:
+            self._unname(row)
+        self._ids[row] = doc_id
+        self._live = None
+        self._row_of[doc_id] = row
+        self._payloads[row] = payload
+        self._names.setdefault(payload.get("name"), set()).add(row)
+        if self._postings is not None:
+            for token in _tokens(payload.get("content", "")):
+                self._postings.setdefault(token, set()).add(row)
+
+    def _unname(self, row: int):
+        payload = self._payloads.get(row)
+        if payload is None:
+            return
+        rows = self._names.get(payload.get("name"))
+        if rows is not None:
+            rows.discard(row)
+            if not rows:
+                del self._names[payload.get("name")]
+
+    def _forget(self, doc_id: str):
+        row = self._row_of.pop(doc_id, None)
+        if row is None:
+            return
+        self._unname(row)
+        payload = self._payloads.pop(row, None)
+        if self._postings is not None and payload:
+            for token in _tokens(payload.get("content", "")):
+                rows = self._postings.get(token)
+                if rows is not None:
+                    rows.discard(row)
+        self._ids[row] = None
+        self._live = None
+        self._dead += 1
+
+    def _ensure_open(self):
+        if not self._open:
+            self._load()
+
+    def _append_log(self, entries: List[dict]):
+        with open(self._file("rows"), "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _candidates(self, query: str, limit: int, filters: Optional[Dict[str, Any]],
+                    prefilter: bool) -> Optional[np.ndarray]:
+        """Rows to score, or None for every live row."""
+        rows = None
+        if prefilter:
+            if self._postings is None:
+                self._postings = {}
+                for row, payload in self._payloads.items():
+                    for token in _tokens(payload.get("content", "")):
+                        self._postings.setdefault(token, set()).add(row)
+            matched: Set[int] = set()
+            for token in _tokens(query):
+                matched |= self._postings.get(token, set())
+            if len(matched) >= limit:
+                rows = matched
+        if filters:
+            pool = rows if rows is not None else self._payloads.keys()
+            rows = {r for r in pool
+                    if all(self._payloads[r].get("meta_data", {}).get(k) == v for k, v in filters.items())}
+        return None if rows is None else np.fromiter(sorted(rows), dtype=np.int64, count=len(rows))
+
+    def _score(self, query_vector: np.ndarray, rows: Optional[np.ndarray]) -> tuple:
+        """Returns (rows, cosine scores) for the candidate rows, or for every live row."""
+        if not self._ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        resident = self._resident_matrix()
+        if rows is None:
+            if self._live is None:
+                self._live = np.flatnonzero(np.fromiter(
+                    (doc_id is not None for doc_id in self._ids), dtype=bool, count=len(self._ids)))
+            if resident is not None:
+                return self._live, (resident @ query_vector)[self._live]
+            matrix = self._matrix()
+            scores = np.empty(len(self._ids), dtype=np.float32)
+            for start in range(0, len(self._ids), BLOCK_ROWS):
+                block = matrix[start:start + BLOCK_ROWS]
+                scores[start:start + len(block)] = block.astype(np.float32) @ query_vector
+            return self._live, scores[self._live]
+        if resident is not None:
+            return rows, resident[rows] @ query_vector
+        matrix = self._matrix()
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), BLOCK_ROWS):
+            part = rows[start:start + BLOCK_ROWS]
+            scores[start:start + len(part)] = matrix[part].astype(np.float32) @ query_vector
+        return rows, scores
+
+    def _document(self, row: int, score: Optional[float] = None) -> Document:
+        payload = self._payloads[row]
+        return Document(
+            id=self._ids[row],
+            name=payload.get("name"),
+            meta_data=payload.get("meta_data") or {},
+            content=payload.get("content", ""),
+            embedder=self.embedder,
+            usage=payload.get("usage"),
+            reranking_score=score,
+        )
+
+    # ----------------- Row access (used by VaultEmbedder) -----------------
+
+    def add_rows(self, rows: List[dict]):
+        """
+        Appends rows of {"id", "vector", "payload": dict}. An id that is already stored is
+        replaced; its old row becomes dead.
+        """
+        if not rows:
+            return
+        with self._lock:
+            self._ensure_open()
+            vectors = np.stack([_unit(row["vector"]) for row in rows]).astype(np.float16)
+            if vectors.shape[1] != self.dimensions:
+                raise ValueError(f"Expected {self.dimensions}-dimensional vectors, got {vectors.shape[1]}.")
+            self._release()
+            first = len(self._ids)
+            with open(self._file("vectors"), "ab") as f:
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self._ids.extend([None] * len(rows))
+            entries = [{"id": row["id"], "row": first + i, "payload": row["payload"]} for i, row in enumerate(rows)]
+            self._append_log(entries)
+            for entry in entries:
+                self._place(entry["id"], entry["row"], entry["payload"])
+
+    def get_rows(self, ids: Iterable[str], vectors: bool = True) -> List[dict]:
+        """Stored rows for `ids` as {"id", "payload", "vector"} (missing ids are skipped)."""
+        with self._lock:
+            self._ensure_open()
+            found = [(doc_id, self._row_of[doc_id]) for doc_id in ids if doc_id in self._row_of]
+            matrix = self._matrix() if vectors else None
+            return [
+                {"id": doc_id, "payload": self._payloads[row],
+                 **({"vector": matrix[row].astype(np.float32).tolist()} if vectors else {})}
+                for doc_id, row in found
+            ]
+
+    def update_payloads(self, payloads: Dict[str, dict]):
+        """Replaces the payloads of stored ids without touching their vectors."""
+        with self._lock:
+            self._ensure_open()
+            entries = [{"id": doc_id, "row": self._row_of[doc_id], "payload": payload}
+                       for doc_id, payload in payloads.items() if doc_id in self._row_of]
+            if entries:
+                self._append_log(entries)
+                for entry in entries:
+                    self._place(entry["id"], entry["row"], entry["payload"])
+
+    def delete_ids(self, ids: Iterable[str]):
+        with self._lock:
+            self._ensure_open()
+            ids = [doc_id for doc_id in set(ids) if doc_id in self._row_of]
+            if not ids:
+                return
+            self._append_log([{"delete": doc_id} for doc_id in ids])
+            for doc_id in ids:
+                self._forget(doc_id)
+
+    def all_ids(self) -> List[str]:
+        with self._lock:
+            self._ensure_open()
+            return list(self._row_of)
+
+    # ----------------- Maintenance -----------------
+
+    def compact(self):
+        """Rewrites the live rows into a new generation of files and drops the dead ones."""
+        with self._lock:
+            self._ensure_open()
+            live = [row for row, doc_id in enumerate(self._ids) if doc_id is not None]
+            generation = self._generation + 1
+            matrix = self._matrix()
+            with open(self._file("vectors", generation), "wb") as f:
+                for start in range(0, len(live), BLOCK_ROWS):
+                    f.write(np.ascontiguousarray(matrix[live[start:start + BLOCK_ROWS]]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._file("rows", generation), "w", encoding="utf-8") as f:
+                for new_row, row in enumerate(live):
+                    entry = {"id": self._ids[row], "row": new_row, "payload": self._payloads[row]}
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._release()
+            self._write_meta(generation)
+            dead = self._dead
+            self._load()
+            print(f"🧹 Compacted vector store: {len(live)} rows kept, {dead} dead rows dropped.")
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._ensure_open()
+            return {
+                "rows": len(self._ids),
+                "live": len(self._row_of),
+                "dead": self._dead,
+                "generation": self._generation,
+                "bytes": len(self._ids) * self._row_bytes(),
+                "resident_bytes": 0 if self._resident is None else self._resident.nbytes,
+            }
+
+    # ----------------- VectorDb interface -----------------
+
+    def create(self) -> None:
+        with self._lock:
+            self._ensure_open()
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.path, META_FILENAME))
+
+    def drop(self) -> None:
+        with self._lock:
+            self._release()
+            if os.path.isdir(self.path):
+                for name in os.listdir(self.path):
+                    if name == META_FILENAME or name.startswith("vectors.") or name.startswith("rows."):
+                        os.remove(os.path.join(self.path, name))
+            self._reset()
+            self._open = False
+
+    def delete(self) -> bool:
+        self.drop()
+        return True
+
+    def get_count(self) -> int:
+        with self._lock:
+            self._ensure_open()
+            return len(self._row_of)
+
+    def optimize(self) -> None:
+        self.compact()
+
+    def id_exists(self, id: str) -> bool:
+        with self._lock:
+            self._ensure_open()
+            return id in self._row_of
+
+    def doc_exists(self, document: Document) -> bool:
+        cleaned_content = document.content.replace("\x00", "\ufffd")
+        return self.id_exists(document.id or hashlib.md5(cleaned_content.encode()).hexdigest())
+
+    def name_exists(self, name: str) -> bool:
+        with self._lock:
+            self._ensure_open()
+            return bool(self._names.get(name))
+
+    def insert(self, documents: List[Document], filters: Optional[Dict[str, Any]] = None) -> None:
+        rows = []
+        for document in documents:
+            document.embed(embedder=self.embedder)
+            cleaned_content = document.content.replace("\x00", "\ufffd")
+            rows.append({
+                "id": document.id or hashlib.md5(cleaned_content.encode()).hexdigest(),
+                "vector": document.embedding,
+                "payload": {"name": document.name, "meta_data": document.meta_data,
+                            "content": cleaned_content, "usage": document.usage},
+            })
+        self.add_rows(rows)
+
+    def upsert_available(self) -> bool:
+        return True
+
+    def upsert(self, documents: List[Document], filters: Optional[Dict[str, Any]] = None) -> None:
+        # add_rows replaces ids that are already stored.
+        self.insert(documents, filters)
+
+    def _search(self, query: str, limit: int, filters: Optional[Dict[str, Any]], prefilter: bool) -> List[Document]:
+        query_embedding = self.embedder.get_embedding(query)
+        if not query_embedding:
+            return []
+        query_vector = _unit(query_embedding)
+        with self._lock:
+            self._ensure_open()
+            candidates = self._candidates(query, limit, filters, prefilter)
+            rows, scores = self._score(query_vector, candidates)
+            if prefilter and candidates is not None and (not len(scores) or scores.max() < PREFILTER_MIN_SCORE):
+                rows, scores = self._score(query_vector, self._candidates(query, limit, filters, False))
+            if not len(rows):
+                return []
+            if len(scores) > limit:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top])]
+            return [self._document(int(rows[i]), float(scores[i])) for i in top]
+
+    def search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Top `limit` rows by cosine similarity; filters match meta_data keys exactly."""
+        return self._search(query, limit, filters, self.keyword_prefilter)
+
+    def vector_search(self, query: str, limit: int = 5) -> List[Document]:
+        """Scores every live row, without the keyword pre-filter."""
+        return self._search(query, limit, None, prefilter=False)
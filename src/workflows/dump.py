@@ -3,6 +3,9 @@ from agno.workflow import RunResponse, Workflow
 
 import logging
 import os
+import copy
+import threading
+import time
 
 from prompts import *
 from agno.models.openai import OpenAIChat
@@ -15,99 +18,156 @@ from agno.storage.agent.sqlite import SqliteAgentStorage
 from agno.memory.db.sqlite import SqliteMemoryDb
 from prompts import TaggingAgent
 from tools.vault_embedder import VaultEmbedder
-from tools.git_auto_sync import GitAutoSync
+from tools.git_auto_sync import get_git_sync
+from tools.vault_index import get_vault_index
+from tools.tag_index import get_tag_index
+from tools.tag_suggester import get_tag_suggester
+from tools.vault_overview import get_vault_overview
+from tools.vault_watcher import get_vault_watcher
+from tools.telemetry import span, traced
 from agno.memory.agent import AgentMemory
 
 load_dotenv()
 logging.basicConfig(level=logging.WARNING)
 
-OVERVIEW_FILENAME = "overview.md"
-
 # remove setup workflow as much as possible
 # deconstruct agents to simple as possible (i dont want to see init stuff and hacky fixations like memory and obsidian path, vault sync etc..)
 
 VAULT_PATH = os.getenv("VAULT_PATH")
+# Messages only mark the overview stale; it is re-summarized at most this often (seconds).
+OVERVIEW_REFRESH_INTERVAL = 10 * 60
 
-db_path = os.path.join(VAULT_PATH, ".assistant", "agent_storage.db")
-memory_db = SqliteMemoryDb(table_name="memory", db_file=db_path)
-memory = AgentMemory(
-        db = memory_db,
-        create_user_memories = True,
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_memory() -> AgentMemory:
+    """The agents' shared memory, opened on first use."""
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            db_path = os.path.join(VAULT_PATH, ".assistant", "agent_storage.db")
+            memory_db = SqliteMemoryDb(table_name="memory", db_file=db_path)
+            _memory = AgentMemory(
+                    db = memory_db,
+                    create_user_memories = True,
+
+                )
+        return _memory
+
+
+class _LazyAgent:
+    """
+    Workflow attribute whose agent (with its model, storage and memory) is built on first
+    use, so creating the workflow doesn't wait on any of them. Assigning the attribute, as
+    for_session does, replaces the agent.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self.lock = threading.Lock()
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, workflow, owner=None):
+        if workflow is None:
+            return self
+        agent = workflow.__dict__.get(self.name)
+        if agent is None:
+            with self.lock:
+                agent = workflow.__dict__.get(self.name)
+                if agent is None:
+                    agent = workflow.__dict__[self.name] = self.build(workflow)
+        return agent
+
+    def __set__(self, workflow, agent):
+        workflow.__dict__[self.name] = agent
 
-    )
 
 class ObsidianWorkflow(Workflow):
     name = "Obsidian Workflow"
     description = "Orchestrates the main agent and tagging agent to create and tag notes."
     overviewed = False
 
-    vault_overview_agent: Agent = Agent(
+    def _build_vault_overview_agent(self) -> Agent:
+        return Agent(
+            model=OpenAIChat(id="gpt-4.1-mini"),
+            memory=get_memory(),
+            storage=SqliteAgentStorage(table_name="vault_overview_agent_sessions", db_file=os.path.join(self.vault_path, ".assistant", "vault_overview_agent_storage.db")),
+            add_history_to_messages=True,  # Adds recent chat history when generating a reply
+            num_history_responses=3,
+            tools=[
+                note_utils.list_directory,
+                note_utils.search_note_file,
+                note_utils.search_by_tag,
+                note_utils.read_note,
+            ],
+            markdown=True,
+            name="Vault Overview Agent",
+            role="Vault Structure and Content Overview Agent",
+            debug_mode=True,
+            # show_tool_calls=True,
+            description = VaultOverviewAgent.description,
+            instructions = VaultOverviewAgent.instructions
+        )
+
+    def _build_main_agent(self) -> Agent:
+        return Agent(
         model=OpenAIChat(id="gpt-4.1-mini"),
-        memory=memory,
-        storage=SqliteAgentStorage(table_name="vault_overview_agent_sessions", db_file="vault_overview_agent_storage.db"),
+        memory=get_memory(),
+        storage=SqliteAgentStorage(table_name="agent_sessions", db_file=os.path.join(self.vault_path, ".assistant", "agent_storage.db")),
+        # Searches the notes embedded so far while the initial sync is still running.
+        knowledge=self.vault.kb,
         add_history_to_messages=True,  # Adds recent chat history when generating a reply
         num_history_responses=3,
         tools=[
+            # WebsiteTools(),
+            note_utils.get_daily_note,
+            note_utils.search_tag,
+            # search_content,
+            note_utils.search_notes,
+            note_utils.append_to_note,
             note_utils.list_directory,
-            note_utils.search_note_file,
-            note_utils.search_by_tag,
+            note_utils.get_recently_modified_notes,
+            note_utils.read_note_section,
             note_utils.read_note,
+            note_utils.create_note
         ],
         markdown=True,
-        name="Vault Overview Agent",
-        role="Vault Structure and Content Overview Agent",
-        debug_mode=True,
-        # show_tool_calls=True,
-        description = VaultOverviewAgent.description,
-        instructions = VaultOverviewAgent.instructions
-    )
-    
-    main_agent: Agent = Agent(
-    model=OpenAIChat(id="gpt-4.1-mini"),
-    memory=memory,
-    storage=SqliteAgentStorage(table_name="agent_sessions", db_file="agent_storage.db"),
-    add_history_to_messages=True,  # Adds recent chat history when generating a reply
-    num_history_responses=3,
-    tools=[
-        # WebsiteTools(),
-        note_utils.get_daily_note,
-        note_utils.search_by_tag,
-        # search_content,
-        note_utils.search_note_file,
-        note_utils.append_to_note,
-        note_utils.list_directory,
-        note_utils.get_recently_modified_notes,
-        note_utils.read_note,
-        note_utils.create_note
-    ],
-    markdown=True,
-    name="obsidian-cli-agent",
-    role="Smart Personal Knowledge Assistant for Obsidian",
-    debug_mode=True,
-    show_tool_calls=True,
-    description = ObsidianAgent.description,
-    instructions = ObsidianAgent.instructions
-)
-
-    tagging_agent: Agent = Agent(
-        model=OpenAIChat(id="gpt-4.1-mini"),
-        storage=SqliteAgentStorage(table_name="tagging_agent_sessions", db_file="tagging_agent_storage.db"),
-        memory = memory,
-        add_history_to_messages=True,
-        num_history_responses=3,
-        tools=[
-            tag_utils.get_vault_tags,
-            # note_utils.append_to_note
-        ],
-        markdown=True,
-        name="tagging-agent",
-        role="Agent responsible for tagging notes with existing tags from the vault",
+        name="obsidian-cli-agent",
+        role="Smart Personal Knowledge Assistant for Obsidian",
         debug_mode=True,
         show_tool_calls=True,
-        description = TaggingAgent.description,
-        instructions = TaggingAgent.instructions
+        description = ObsidianAgent.description,
+        instructions = ObsidianAgent.instructions
     )
 
+    def _build_tagging_agent(self) -> Agent:
+        return Agent(
+            model=OpenAIChat(id="gpt-4.1-mini"),
+            storage=SqliteAgentStorage(table_name="tagging_agent_sessions", db_file=os.path.join(self.vault_path, ".assistant", "tagging_agent_storage.db")),
+            memory = get_memory(),
+            add_history_to_messages=True,
+            num_history_responses=3,
+            tools=[
+                tag_utils.get_vault_tags,
+                tag_utils.get_tag_counts,
+                # note_utils.append_to_note
+            ],
+            markdown=True,
+            name="tagging-agent",
+            role="Agent responsible for tagging notes with existing tags from the vault",
+            debug_mode=True,
+            show_tool_calls=True,
+            description = TaggingAgent.description,
+            instructions = TaggingAgent.instructions
+        )
+
+    vault_overview_agent = _LazyAgent(_build_vault_overview_agent)
+    main_agent = _LazyAgent(_build_main_agent)
+    tagging_agent = _LazyAgent(_build_tagging_agent)
+
     def __init__(self, vault_path=None, *args, **kwargs):
         super().__init__(*args, **kwargs)  # Call to the superclass constructor
         
@@ -120,52 +180,151 @@ class ObsidianWorkflow(Workflow):
         if not os.path.exists(assitant_path):
             os.makedirs(assitant_path)
 
-        self.git = GitAutoSync(self.vault_path)
+        # Commits, pushes and pulls happen in the background; runs only mark the vault dirty.
+        self.git = get_git_sync(self.vault_path)
         # Move to obsidian file, this will handle all the tools setup, 
         # workflows, etc.
 
-        vault_overview_path = os.path.join(self.vault_path, ".assistant", OVERVIEW_FILENAME)
-        if os.path.exists(vault_overview_path):
-            self.vault_overview = open(vault_overview_path, "r", encoding="utf-8").read()
+        # Built from the file index; the overview agent only summarizes sections whose stats changed.
+        self.overview = get_vault_overview(self.vault_path)
+        self._overview_lock = threading.Lock()
+        # Shared with the copies made by for_session; one worker refreshes the overview.
+        self._overview_stale = threading.Event()
+        if os.path.exists(self.overview.overview_path):
+            self.vault_overview = open(self.overview.overview_path, "r", encoding="utf-8").read()
             self.overviewed = True
 
-        self.vault = VaultEmbedder(self.vault_path)
-        self.vault.sync()
-        self.vault.start_monitoring(interval=1800)
-        self.main_agent.knowledge = self.vault.kb
+        # The initial sync runs in the background; until it's done, searches see the notes embedded so far.
+        self.vault = VaultEmbedder(self.vault_path, initial_sync=False)
+        self.vault.start_initial_sync()
+
+        watcher = get_vault_watcher(self.vault_path)
+        get_vault_index(self.vault_path).attach_watcher(watcher)
+        get_tag_index(self.vault_path).attach_watcher(watcher)
+        suggester = get_tag_suggester(self.vault_path)
+        suggester.attach_watcher(watcher)
+        self.overview.attach_watcher(watcher)
+        # Learn the vault's tagging habits in the background so the first message doesn't wait.
+        threading.Thread(target=suggester.refresh, daemon=True).start()
+        watcher.subscribe(self.git.mark_dirty)
+        # Pulled commits update the indexes from the diff, without waiting for the watcher.
+        self.git.subscribe(self.vault.apply_pull)
+        self.git.subscribe(lambda changes: get_vault_index(self.vault_path).apply_changes(changes.paths()))
+        self.git.subscribe(lambda changes: get_tag_index(self.vault_path).apply_changes(changes.paths()))
+        self.git.subscribe(lambda changes: suggester.apply_changes(changes.paths()))
+        self.git.subscribe(lambda changes: self.overview.apply_changes(changes.paths()))
+        self.git.start()
+        self.vault.start_monitoring()
+        self._overview_stale.set()
+        threading.Thread(target=self._overview_worker, name="overview-refresh", daemon=True).start()
+
+    def for_session(self, session_id: str, user_id: str = None) -> "ObsidianWorkflow":
+        """
+        Returns a copy of this workflow for one conversation. The copy has its own agents bound
+        to session_id and shares the vault embedder, knowledge base and git sync with this
+        instance, so copies for different conversations can run at the same time.
+        """
+        session = copy.copy(self)
+        session.session_id = session_id
+        session.user_id = user_id
+        session.memory = None
+        session.workflow_session = None
+        session.run_id = session.run_input = session.run_response = None
+        for name in ("vault_overview_agent", "main_agent", "tagging_agent"):
+            agent = getattr(self, name)
+            setattr(session, name, agent.deep_copy(update={
+                "session_id": session_id,
+                "user_id": user_id,
+                "knowledge": agent.knowledge,
+            }))
+        # Rebind run() to the copy; copy.copy kept the original's bound method.
+        session.update_run_method()
+        return session
+
+    def end_session(self):
+        """Deletes this session's history from agent storage (for a copy made by for_session)."""
+        for name in ("vault_overview_agent", "main_agent", "tagging_agent"):
+            agent = getattr(self, name)
+            if agent.storage is not None and agent.session_id:
+                agent.storage.delete_session(session_id=agent.session_id)
+            agent.memory.clear()
+
+    def _overview_worker(self):
+        """Refreshes the overview when it is marked stale, at most once per OVERVIEW_REFRESH_INTERVAL."""
+        while True:
+            self._overview_stale.wait()
+            self._overview_stale.clear()
+            try:
+                self.refresh_overview()
+            except Exception as e:
+                logging.warning(f"Vault overview refresh failed: {e}")
+            time.sleep(OVERVIEW_REFRESH_INTERVAL)
+
+    @traced("workflow.refresh_overview")
+    def refresh_overview(self, summarize: bool = True) -> str:
+        """
+        Rewrites .assistant/overview.md from the current vault stats. With summarize, the
+        overview agent first re-summarizes the sections whose stats changed since their last
+        summary; a refresh already running in another thread is not repeated.
+        """
+        if summarize and self._overview_lock.acquire(blocking=False):
+            try:
+                updated = self.overview.summarize(
+                    lambda title, stats: self.vault_overview_agent.run(
+                        VaultOverviewAgent.section_prompt.format(title=title, stats=stats)
+                    ).content
+                )
+                if updated:
+                    logging.info(f"Re-summarized overview sections: {', '.join(updated)}")
+            finally:
+                self._overview_lock.release()
+        self.vault_overview = self.overview.write()
+        self.overviewed = True
+        return self.vault_overview
+
+    def status(self) -> dict:
+        """Readiness of the vault index ("warming" while the initial sync runs, then "ready")."""
+        return self.vault.status()
 
     def sync_vault(self):
+        """Syncs the vault now, waiting for the background initial sync first."""
+        self.vault.wait_ready()
         self.vault.sync()
-        self.vault.start_monitoring(interval=1800)
-        self.main_agent.knowledge = self.vault.kb
+        self.vault.start_monitoring()
 
+    @traced("workflow.run")
     def run(self, query: str) -> RunResponse:
-        vault_overview_path = os.path.join(self.vault_path, ".assistant", OVERVIEW_FILENAME)
-    
         logging.info(f"Running Obsidian workflow with query: {query}")
 
         if not query or query.strip() == "":
             logging.error("Query is empty or contains only whitespace.")
             return RunResponse(content="Error: Query cannot be empty.")
 
-        self.git.sync()
+        if self.vault.state == "warming":
+            logging.info(f"Vault index is still warming, searching the notes embedded so far: {self.vault.status()}")
 
         if not self.overviewed:
+            # The structural part is computed from the index; summaries follow in the background.
             logging.info("Vault overview file does not exist, creating a new one.")
-            overview = self.vault_overview_agent.run("Create an overview for the vault.").content
-            
-            with open(vault_overview_path, "w", encoding="utf-8") as f:
-                f.write(overview)
-
-            self.vault_overview = overview
-            self.overviewed = True
+            self.refresh_overview(summarize=False)
         
         # self.main_agent.description = ObsidianAgent.description[0] + "\n" + self.vault_overview
 
-        tagged = self.tagging_agent.run(query).content
+        # Tag locally when the vault's own tagging habits decide every line; otherwise ask the tagging agent.
+        with span("workflow.suggest_tags"):
+            suggestion = get_tag_suggester(self.vault_path).suggest(query)
+        if suggestion.confident:
+            logging.info("Tagged message locally.")
+            tagged = suggestion.text
+        else:
+            with span("agent.tagging"):
+                tagged = self.tagging_agent.run(query).content
         
     
-        res = self.main_agent.run(tagged)
-        self.git.sync()
+        # Tool calls run on this thread, so each tool's span nests under this one.
+        with span("agent.main"):
+            res = self.main_agent.run(tagged)
+        self.git.mark_dirty()
+        self._overview_stale.set()
 
         return res
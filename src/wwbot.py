@@ -1,11 +1,17 @@
 from whatsapp_client.client import WhatsAppWebClient
-from datetime import datetime, timedelta
 from obsidian import create_agent
+from tools.transcription import TranscriptionService
+from tools.dispatcher import MessageDispatcher
+from tools.sessions import SessionManager
+from tools.telemetry import get_tracer, span
 from dotenv import load_dotenv
 from os import getenv
 
 load_dotenv()
 
+# Per-stage latency: a JSON line per message, plus /metrics and /slow with METRICS_SINK=log,prometheus.
+get_tracer()
+
 # add unregister when stopping
 
 # Create the WhatsApp client
@@ -13,52 +19,78 @@ whatsapp = WhatsAppWebClient(setup_node=False,
                              node_server_url = getenv("NODE_SERVER_URL", "http://localhost:3000"),
                              callback_host = getenv("CALLBACK_HOST", "http://localhost:8001"))
 
-def load_model():
-    import whisper
-    return whisper.load_model("base")
+# Whisper stays loaded for the life of the bot; voice notes are transcribed off the callback thread.
+transcriber = TranscriptionService(model_name=getenv("WHISPER_MODEL", "base"),
+                                   workers=int(getenv("WHISPER_WORKERS", "1")),
+                                   queue_size=int(getenv("WHISPER_QUEUE_SIZE", "32")))
+transcriber.start()
 
-def transcribe_audio(voice_file_path, model):
-    return model.transcribe(voice_file_path)
+# Session handling: one agno session per sender, ended after SESSION_TIMEOUT idle seconds.
+sessions = SessionManager(lambda sender, session_id: agent.for_session(session_id, user_id=sender),
+                          ttl=float(getenv("SESSION_TIMEOUT", 4 * 60 * 60)),
+                          max_sessions=int(getenv("MAX_SESSIONS", "100")))
+sessions.start()
 
-# Session handling
-user_sessions = {}
-SESSION_TIMEOUT = timedelta(hours=4)
+BUSY_REPLY = "I'm handling a lot of messages right now, please try again in a minute."
 
 def voice_message_callback(sender, voice_file_path):
-    model = load_model()
-    
-    result = transcribe_audio(voice_file_path, model)
-    print(f"voice: {result['text']}")
-    
-    message_handler(sender, result["text"])
+    # Hold the sender's place in line so messages sent after the voice note wait for it.
+    slot = dispatcher.reserve(sender)
+    if slot is None:
+        whatsapp.send(sender, BUSY_REPLY)
+        return
+
+    def on_done(text):
+        print(f"voice: {text}")
+        dispatcher.fill(slot, text)
+
+    def on_error(error):
+        dispatcher.cancel(slot)
+        whatsapp.send(sender, "Sorry, I couldn't transcribe that voice message.")
+
+    if not transcriber.submit(voice_file_path, on_done, on_error):
+        dispatcher.cancel(slot)
+        print(f"⚠️ Transcription queue full: {transcriber.stats()}")
+        whatsapp.send(sender, "I'm busy transcribing other voice messages, please try again in a minute.")
 
 def message_handler(sender, message):
+    # Runs on the WhatsApp callback thread: queue and return right away.
+    if not dispatcher.submit(sender, message):
+        print(f"⚠️ Dispatcher overloaded: {dispatcher.stats()}")
+        whatsapp.send(sender, BUSY_REPLY)
+
+def handle_message(sender, message):
     user_id = sender
     user_message = message.strip()
 
     # Handle "/clear" command
     if user_message == "/clear":
-        #agent.storage.delete_session(user_id)
-        #user_sessions.pop(user_id, None)
+        sessions.clear(user_id)
         whatsapp.send(user_id, "Your session has been cleared.")
         return
 
-    # Manage session timeout
-    if user_id in user_sessions:
-        last_active = user_sessions[user_id]['last_active']
-        if datetime.now() - last_active > SESSION_TIMEOUT:
-            #agent.storage.delete_session(user_id)
-            user_sessions[user_id] = {'last_active': datetime.now()}
-    else:
-        user_sessions[user_id] = {'last_active': datetime.now()}
-
-    user_sessions[user_id]['last_active'] = datetime.now()
+    # Handle "/status" command: how far the initial vault sync got
+    if user_message == "/status":
+        status = agent.status()
+        pending = f", {status['pending_notes']} to go" if status["pending_notes"] else ""
+        whatsapp.send(user_id, f"Vault index {status['state']}: {status['synced_notes']} notes embedded{pending}.")
+        return
 
-    # Run the agent and send response
-    response = agent.run(user_message)
-    whatsapp.send(user_id, response)
+    # Timed-out sessions are ended here and the sender gets a fresh one. The session counts
+    # as busy until the reply is sent, so eviction can't delete its history mid-run.
+    with sessions.use(user_id) as session:
+        # Run the agent and send response
+        response = session.workflow.run(user_message)
+        with span("whatsapp.send"):
+            whatsapp.send(user_id, response)
 
 agent = create_agent(getenv("VAULT_PATH"))
 
+dispatcher = MessageDispatcher(handle_message,
+                               workers=int(getenv("BOT_WORKERS", "4")),
+                               max_queue_per_sender=int(getenv("BOT_MAX_QUEUE_PER_SENDER", "10")),
+                               max_pending=int(getenv("BOT_MAX_PENDING", "200")))
+dispatcher.start()
+
 # Start the bot
 whatsapp.run(quiet=False, callback=message_handler, voice_callback=voice_message_callback, groupname="Obsidian")
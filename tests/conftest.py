@@ -0,0 +1,36 @@
+import hashlib
+import os
+import re
+import sys
+from dataclasses import dataclass
+
+import pytest
+
+# The app imports its modules as top-level packages (tools.*, workflows.*) from src/.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+DIMENSIONS = 32
+
+
+@pytest.fixture
+def embedder():
+    """Offline, deterministic embedder: a bag of hashed words. Counts the texts it embeds."""
+    from agno.embedder.base import Embedder
+
+    @dataclass
+    class HashEmbedder(Embedder):
+        dimensions: int = DIMENSIONS
+        id: str = "hash"
+        calls: int = 0
+
+        def get_embedding(self, text):
+            self.calls += 1
+            vector = [0.01] * DIMENSIONS
+            for word in re.findall(r"\w+", text.lower()):
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % DIMENSIONS] += 1
+            return vector
+
+        def get_embedding_and_usage(self, text):
+            return self.get_embedding(text), None
+
+    return HashEmbedder()
@@ -0,0 +1,34 @@
+from tools.chunking import _sections, chunk_markdown, iter_headings
+
+
+def headings(text):
+    return [(level, title) for _, level, title in iter_headings(text.splitlines())]
+
+
+def test_headings_inside_backtick_and_tilde_fences_are_skipped():
+    text = "# A\n```\n# code\n```\n~~~python\n# more code\n~~~\n## B\n"
+    assert headings(text) == [(1, "A"), (2, "B")]
+
+
+def test_fence_closes_only_on_same_marker():
+    # A backtick fence inside a tilde block, and a shorter fence inside a longer one, don't close it.
+    text = "~~~\n```\n# inside\n~~~\n````\n```\n# inside too\n````\n# C\n"
+    assert headings(text) == [(1, "C")]
+
+
+def test_sections_cover_the_whole_note_with_heading_paths():
+    text = "intro\n# A\na\n## B\nb\n```\n# not a heading\n```\n# C\nc\n"
+    sections = _sections(text)
+    assert [heading for _, _, heading in sections] == ["", "A", "A > B", "C"]
+    assert sections[0][0] == 0 and sections[-1][1] == len(text)
+    assert all(end == start for (_, end, _), (start, _, _) in zip(sections, sections[1:]))
+    assert "# not a heading" in text[sections[2][0]:sections[2][1]]
+
+
+def test_long_sections_split_on_blank_lines():
+    text = "# A\n" + "\n\n".join("x" * 50 for _ in range(10))
+    chunks = chunk_markdown(text, max_chars=120)
+    assert len(chunks) > 1
+    assert all(len(chunk.text) <= 120 for chunk in chunks)
+    assert all(chunk.heading == "A" for chunk in chunks)
+    assert "".join(chunk.text for chunk in chunks) == text
@@ -0,0 +1,87 @@
+import threading
+
+from tools.dispatcher import MessageDispatcher
+
+
+class Recorder:
+    def __init__(self, expected: int):
+        self.messages = []
+        self.expected = expected
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, sender, message):
+        with self._lock:
+            self.messages.append((sender, message))
+            if len(self.messages) >= self.expected:
+                self.done.set()
+
+
+def test_slots_filled_out_of_order_are_handled_in_send_order():
+    handler = Recorder(expected=3)
+    dispatcher = MessageDispatcher(handler, workers=2)
+    dispatcher.start()
+    voice = dispatcher.reserve("alice")
+    later = dispatcher.reserve("alice")
+    last = dispatcher.reserve("alice")
+
+    # The later messages finish "transcribing" first but must wait behind the first slot.
+    dispatcher.fill(last, "third")
+    dispatcher.fill(later, "second")
+    assert not handler.done.wait(0.1)
+    assert handler.messages == []
+
+    dispatcher.fill(voice, "first")
+    assert handler.done.wait(5)
+    dispatcher.stop(timeout=5)
+    assert handler.messages == [("alice", "first"), ("alice", "second"), ("alice", "third")]
+
+
+def test_cancelled_slot_does_not_block_later_messages():
+    handler = Recorder(expected=1)
+    dispatcher = MessageDispatcher(handler, workers=1)
+    dispatcher.start()
+    slot = dispatcher.reserve("alice")
+    assert dispatcher.submit("alice", "after the failed voice note")
+    dispatcher.cancel(slot)
+
+    assert handler.done.wait(5)
+    dispatcher.stop(timeout=5)
+    assert handler.messages == [("alice", "after the failed voice note")]
+    stats = dispatcher.stats()
+    assert stats["handled"] == 1
+    assert stats["pending"] == 0
+
+
+def test_full_queues_reject_messages():
+    dispatcher = MessageDispatcher(lambda sender, message: None, max_queue_per_sender=2, max_pending=3)
+    # Not started, so nothing drains.
+    assert dispatcher.submit("alice", "1")
+    assert dispatcher.submit("alice", "2")
+    assert not dispatcher.submit("alice", "3")
+    assert dispatcher.reserve("alice") is None
+
+    assert dispatcher.submit("bob", "1")
+    assert not dispatcher.submit("carol", "1")
+    assert dispatcher.stats()["rejected"] == 3
+    assert dispatcher.stats()["pending"] == 3
+
+
+def test_failing_handler_does_not_stop_the_sender_queue():
+    seen = []
+    done = threading.Event()
+
+    def handler(sender, message):
+        seen.append(message)
+        if message == "boom":
+            raise ValueError(message)
+        done.set()
+
+    dispatcher = MessageDispatcher(handler, workers=1)
+    dispatcher.start()
+    dispatcher.submit("alice", "boom")
+    dispatcher.submit("alice", "ok")
+    assert done.wait(5)
+    dispatcher.stop(timeout=5)
+    assert seen == ["boom", "ok"]
+    assert dispatcher.stats()["failed"] == 1
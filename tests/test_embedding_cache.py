@@ -0,0 +1,53 @@
+import pytest
+
+from tools.embedding_cache import CachedEmbedder
+
+
+def stored_bytes(cache):
+    return cache._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+
+@pytest.fixture
+def cache(tmp_path, embedder):
+    return CachedEmbedder(embedder=embedder, cache_path=str(tmp_path / "cache.db"))
+
+
+def test_texts_are_embedded_once(cache, embedder):
+    first = cache.get_embeddings(["a", "b", "a"])
+    assert embedder.calls == 2
+    again = cache.get_embeddings(["b", "a", "c"])
+    assert embedder.calls == 3
+    assert again[:2] == [pytest.approx(first[1], rel=1e-3), pytest.approx(first[0], rel=1e-3)]
+    assert (cache.hits, cache.misses) == (3, 3)
+
+
+def test_cache_survives_reopening(tmp_path, cache, embedder):
+    vector = cache.get_embedding("persisted")
+    reopened = CachedEmbedder(embedder=embedder, cache_path=str(tmp_path / "cache.db"))
+    calls = embedder.calls
+    assert reopened.get_embedding("persisted") == pytest.approx(vector, rel=1e-3)
+    assert embedder.calls == calls
+    assert reopened.stats()["bytes"] == stored_bytes(reopened)
+
+
+def test_storing_a_key_twice_does_not_inflate_the_byte_count(cache):
+    key = cache._key("same")
+    cache._store([(key, [1.0] * 32)])
+    cache._store([(key, [2.0] * 32)])
+    cache._store([(key, [3.0] * 32), (key, [3.0] * 32)])
+    assert cache.stats()["entries"] == 1
+    assert cache._bytes == stored_bytes(cache) == 64
+
+
+def test_eviction_drops_least_recently_used(tmp_path, embedder):
+    cache = CachedEmbedder(embedder=embedder, cache_path=str(tmp_path / "cache.db"), max_bytes=64 * 10)
+    for i in range(10):
+        cache._store([(f"k{i}", [float(i)] * 32)])
+    # Re-storing existing keys must not push the cache over its budget.
+    for i in range(10):
+        cache._store([(f"k{i}", [float(i)] * 32)])
+    assert cache.stats()["entries"] == 10
+    cache._store([("k10", [1.0] * 32)])
+    # Only the oldest entries go, down to 90% of the budget.
+    assert cache._bytes == stored_bytes(cache) == 64 * 9
+    assert cache._lookup(["k10"]) and not cache._lookup(["k0", "k1"])
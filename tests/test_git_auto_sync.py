@@ -0,0 +1,148 @@
+import os
+
+import pytest
+
+git = pytest.importorskip("git")
+
+from tools import git_auto_sync
+from tools.git_auto_sync import GitAutoSync, diff_markdown
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = git.Repo.init(tmp_path)
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "test")
+        config.set_value("user", "email", "test@example.com")
+    return repo
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def sync(repo, clock):
+    return GitAutoSync(repo.working_tree_dir, interval=300, debounce=30, max_delay=120, clock=clock)
+
+
+def test_commit_waits_for_quiet_time_after_the_last_write(sync, clock):
+    assert sync._commit_due(clock()) is None
+    sync.mark_dirty()
+    assert sync._commit_due(clock()) == 30
+
+    clock.now += 20
+    sync.mark_dirty("note.md")
+    assert sync._commit_due(clock()) == 30
+    clock.now += 30
+    assert sync._commit_due(clock()) == 0
+
+
+def test_steady_writes_commit_by_max_delay(sync, clock):
+    sync.mark_dirty()
+    for _ in range(6):
+        clock.now += 20
+        sync.mark_dirty()
+    # Debounce alone would wait another 30s; the batch is capped at 120s after its first write.
+    assert sync._commit_due(clock()) == 0
+
+
+def test_failures_back_off_exponentially_until_the_remote_is_back(sync, clock, monkeypatch):
+    calls = []
+
+    def push():
+        calls.append(clock())
+        if len(calls) <= 3:
+            raise git.GitCommandError("push", 128)
+
+    monkeypatch.setattr(sync, "_commit", lambda: True)
+    monkeypatch.setattr(sync, "_pull", lambda: None)
+    monkeypatch.setattr(sync, "_push", push)
+    sync._next_pull = clock() + 1000
+
+    delays = []
+    for _ in range(3):
+        assert not sync._cycle(pull=False, commit=True)
+        delays.append(sync._next_wakeup(clock()))
+    base = git_auto_sync.BACKOFF_BASE
+    assert delays == [base, 2 * base, 4 * base]
+    assert sync.status()["failures"] == 3
+    # A failed push asks for a pull before the retry.
+    assert sync._pull_requested
+    # Writes in the meantime don't cut the backoff short.
+    sync.mark_dirty()
+    clock.now += 5
+    assert sync._next_wakeup(clock()) == 4 * base - 5
+
+    clock.now += 4 * base
+    assert sync._cycle(pull=True, commit=True)
+    status = sync.status()
+    assert status["failures"] == 0 and status["last_error"] is None and not status["unpushed"]
+
+
+def test_backoff_is_capped(sync, clock, monkeypatch):
+    def fail():
+        raise git.GitCommandError("pull", 128)
+
+    monkeypatch.setattr(sync, "_pull", fail)
+    sync._next_pull = clock()
+    for _ in range(12):
+        sync._cycle(pull=True, commit=False)
+    assert sync._next_wakeup(clock()) == git_auto_sync.BACKOFF_MAX
+
+
+def commit(repo, files, message, remove=(), moves=()):
+    root = repo.working_tree_dir
+    for old, new in moves:
+        os.makedirs(os.path.dirname(os.path.join(root, new)), exist_ok=True)
+        repo.git.mv(old, new)
+    for rel, text in files.items():
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    for rel in remove:
+        repo.git.rm(rel)
+    repo.git.add("-A")
+    repo.index.commit(message)
+    return repo.head.commit.hexsha
+
+
+BODY = "\n".join(f"line {i} of a note long enough for rename detection" for i in range(20)) + "\n"
+
+
+def test_classifies_changed_deleted_and_renamed_notes(repo):
+    before = commit(repo, {"a.md": BODY, "b.md": "b\n", "c.md": "c\n", "image.png": "png"}, "initial")
+    after = commit(repo, {"c.md": "c changed\n", "new.md": "new\n", "image.png": "changed"}, "edit",
+                   remove=["b.md"], moves=[("a.md", "folder/renamed.md")])
+
+    changes = diff_markdown(repo, before, after)
+    assert changes.renamed == {"a.md": "folder/renamed.md"}
+    assert changes.changed == {"c.md", "new.md"}
+    assert changes.deleted == {"b.md"}
+    assert (changes.before, changes.after) == (before, after)
+
+
+def test_rename_across_extensions_is_a_delete_or_an_add(repo):
+    before = commit(repo, {"a.md": BODY, "b.txt": BODY + "b\n"}, "initial")
+    after = commit(repo, {}, "rename", moves=[("a.md", "a.txt"), ("b.txt", "b.md")])
+
+    changes = diff_markdown(repo, before, after)
+    assert changes.renamed == {}
+    assert changes.deleted == {"a.md"}
+    assert changes.changed == {"b.md"}
+
+
+def test_paths_with_spaces_and_unicode(repo):
+    before = commit(repo, {"old name.md": BODY}, "initial")
+    after = commit(repo, {}, "rename", moves=[("old name.md", "יומן חדש.md")])
+    assert diff_markdown(repo, before, after).renamed == {"old name.md": "יומן חדש.md"}
@@ -0,0 +1,78 @@
+import pytest
+
+from tools.ignore_rules import IgnoreRules, compile_rule
+
+
+def matches(pattern, path):
+    regex, _, _ = compile_rule(pattern)
+    return bool(regex.match(path))
+
+
+@pytest.mark.parametrize("pattern, path, expected", [
+    ("*.log", "keep.log", True),
+    ("*.log", "logs/keep.log", True),
+    ("*.log", "keep.log.md", False),
+    ("/todo.md", "todo.md", True),
+    ("/todo.md", "daily/todo.md", False),
+    ("daily/*.md", "daily/a.md", True),
+    ("daily/*.md", "daily/sub/a.md", False),
+    ("**/drafts", "a/b/drafts", True),
+    ("**/drafts", "drafts", True),
+    ("archive/**", "archive/2020/a.md", True),
+    ("a/**/b.md", "a/b.md", True),
+    ("a/**/b.md", "a/x/y/b.md", True),
+    ("note?.md", "note1.md", True),
+    ("note?.md", "note10.md", False),
+    ("[ab].md", "a.md", True),
+    ("[!ab].md", "a.md", False),
+    ("[!ab].md", "c.md", True),
+    ("\\#hash.md", "#hash.md", True),
+])
+def test_glob_patterns(pattern, path, expected):
+    assert matches(pattern, path) is expected
+
+
+def test_blank_lines_and_comments_compile_to_nothing():
+    assert compile_rule("") is None
+    assert compile_rule("# comment") is None
+    assert compile_rule("/") is None
+
+
+def test_negation_and_directory_only_flags():
+    _, negated, dir_only = compile_rule("!keep/")
+    assert negated and dir_only
+
+
+def test_rules_from_gitignore(tmp_path):
+    (tmp_path / ".gitignore").write_text("*.tmp\nprivate/\n!important.tmp\n", encoding="utf-8")
+    rules = IgnoreRules(str(tmp_path))
+    assert rules.ignored("a.tmp")
+    assert not rules.ignored("important.tmp")
+    assert rules.ignored("private/note.md")
+    # Directory-only: a file named like the folder is kept.
+    assert not rules.ignored("private")
+    assert rules.ignored(".assistant/index.json")
+    assert rules.ignored(".git/config")
+    assert not rules.ignored("notes/a.md")
+    assert rules.ignored(str(tmp_path / "x.tmp"))
+
+
+def test_refresh_picks_up_gitignore_changes(tmp_path):
+    rules = IgnoreRules(str(tmp_path))
+    assert not rules.ignored("a.tmp")
+    (tmp_path / ".gitignore").write_text("*.tmp\n", encoding="utf-8")
+    assert rules.refresh()
+    assert rules.ignored("a.tmp")
+    assert not rules.refresh()
+
+
+def test_walk_skips_ignored_folders_and_files(tmp_path):
+    (tmp_path / ".gitignore").write_text("skip/\n*.tmp\n", encoding="utf-8")
+    for rel in ("a.md", "b.tmp", "skip/c.md", "keep/d.md", ".assistant/e.json"):
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_text("x", encoding="utf-8")
+    found = {
+        f"{root[len(str(tmp_path)):].strip('/')}/{name}".lstrip("/")
+        for root, _, files in IgnoreRules(str(tmp_path)).walk() for name in files
+    }
+    assert found == {".gitignore", "a.md", "keep/d.md"}
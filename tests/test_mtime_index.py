@@ -0,0 +1,53 @@
+from tools.mtime_index import MtimeIndex
+
+
+def test_recent_and_modified_since():
+    index = MtimeIndex()
+    for i, path in enumerate(["a.md", "b.md", "c.md"]):
+        index.set(path, 100 + i)
+    index.set("a.md", 200)
+    assert index.recent(2) == [("a.md", 200), ("c.md", 102)]
+    assert index.modified_since(101) == [("a.md", 200), ("c.md", 102)]
+    assert index.modified_since(101, limit=1) == [("a.md", 200)]
+    assert index.recent(0) == []
+    assert len(index) == 3
+
+
+def test_changes_since_cursor():
+    index = MtimeIndex()
+    index.set("a.md", 1)
+    index.set("b.md", 2)
+    cursor = index.cursor()
+    assert index.changes_since(cursor).changed == set()
+
+    index.set("c.md", 3)
+    index.remove("b.md")
+    changes = index.changes_since(cursor)
+    assert changes.changed == {"c.md"}
+    assert changes.deleted == {"b.md"}
+    assert not changes.full
+
+    # The returned cursor continues from there.
+    index.set("b.md", 4)
+    later = index.changes_since(changes.cursor)
+    assert later.changed == {"b.md"} and later.deleted == set()
+    assert index.changes_since(later.cursor).changed == set()
+
+
+def test_unknown_cursor_reports_everything():
+    index = MtimeIndex()
+    index.set("a.md", 1)
+    index.set("b.md", 2)
+    index.remove("b.md")
+    for cursor in (None, "", "garbage", MtimeIndex().cursor()):
+        changes = index.changes_since(cursor)
+        assert changes.full
+        assert changes.changed == {"a.md"}
+        assert changes.cursor == index.cursor()
+
+
+def test_removing_unknown_note_is_not_logged():
+    index = MtimeIndex()
+    cursor = index.cursor()
+    index.remove("missing.md")
+    assert index.cursor() == cursor
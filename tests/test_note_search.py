@@ -0,0 +1,59 @@
+import pytest
+
+from tools.note_search import decode_cursor, encode_cursor, read_section, search_notes, section_range
+
+
+@pytest.fixture
+def vault(tmp_path):
+    for i in range(12):
+        (tmp_path / f"habit {i:02}.md").write_text(f"# Habit {i}\nworked on the habit today\n", encoding="utf-8")
+    (tmp_path / "other.md").write_text("nothing here\n", encoding="utf-8")
+    return str(tmp_path)
+
+
+def test_cursor_pages_cover_every_result_once(vault):
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = search_notes(vault, "habit", limit=5, cursor=cursor)
+        assert page["total"] == 12
+        assert len(page["results"]) <= 5
+        seen.extend(result["path"] for result in page["results"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 12
+    assert "other.md" not in seen
+
+
+def test_byte_budget_ends_page_early_but_returns_one_result(vault):
+    page = search_notes(vault, "habit", limit=10, max_bytes=300)
+    assert 1 <= len(page["results"]) < 10
+    assert page["next_cursor"] is not None
+    tiny = search_notes(vault, "habit", limit=10, max_bytes=1)
+    assert len(tiny["results"]) == 1 and tiny.get("truncated")
+
+
+def test_cursor_from_another_search_is_rejected(vault):
+    cursor = search_notes(vault, "habit", limit=5)["next_cursor"]
+    with pytest.raises(ValueError):
+        search_notes(vault, "today", limit=5, cursor=cursor)
+    with pytest.raises(ValueError):
+        decode_cursor("notes:habit", "not a cursor")
+    assert decode_cursor("k", encode_cursor("k", 7)) == 7
+    assert decode_cursor("k", None) == 0
+
+
+def test_section_range_skips_headings_in_code_blocks():
+    text = "# A\na\n~~~\n# B\n~~~\n## C\nc\n# B\nb\n"
+    assert section_range(text, "A") == (1, 7)
+    assert section_range(text, "## c") == (6, 7)
+    assert section_range(text, "b") == (8, 9)
+    assert section_range(text, "missing") is None
+
+
+def test_read_section_by_heading(tmp_path):
+    (tmp_path / "n.md").write_text("# A\na\n# B\nb\n", encoding="utf-8")
+    result = read_section(str(tmp_path), "n.md", heading="B")
+    assert (result["start_line"], result["end_line"], result["content"]) == (3, 4, "# B\nb")
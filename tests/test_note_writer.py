@@ -0,0 +1,95 @@
+import pytest
+
+from tools import note_writer
+from tools.note_writer import NoteChangedError, insert_into_note
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8", newline="")
+
+
+def read(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def test_appends_at_end_of_note(tmp_path):
+    note = tmp_path / "a.md"
+    write(note, "# Journal\nfirst\n")
+    edit = insert_into_note(str(note), "second")
+    assert read(note) == "# Journal\nfirst\n\nsecond\n"
+    assert edit.appended
+    assert (edit.start_line, edit.end_line) == (4, 4)
+
+
+def test_inserts_at_end_of_section_before_next_heading(tmp_path):
+    note = tmp_path / "a.md"
+    write(note, "# Tasks\n- one\n\n# Ideas\n- idea\n")
+    edit = insert_into_note(str(note), "- two", heading="tasks")
+    assert read(note) == "# Tasks\n- one\n- two\n\n# Ideas\n- idea\n"
+    assert not edit.appended
+    assert (edit.start_line, edit.end_line) == (3, 3)
+
+
+def test_heading_inside_code_block_is_not_a_section(tmp_path):
+    note = tmp_path / "a.md"
+    write(note, "~~~\n# Tasks\n~~~\n# Tasks\n- one\n")
+    insert_into_note(str(note), "- two", heading="Tasks")
+    assert read(note) == "~~~\n# Tasks\n~~~\n# Tasks\n- one\n- two\n"
+
+
+def test_missing_heading_is_started_at_end(tmp_path):
+    note = tmp_path / "a.md"
+    write(note, "text\n")
+    edit = insert_into_note(str(note), "entry", heading="## Log")
+    assert read(note) == "text\n\n## Log\nentry\n"
+    assert edit.text == "## Log\nentry\n"
+
+
+def test_inserts_below_marker(tmp_path):
+    note = tmp_path / "a.md"
+    write(note, "top\n<!-- inbox -->\nbottom\n")
+    insert_into_note(str(note), "new", marker="<!-- inbox -->")
+    assert read(note) == "top\n<!-- inbox -->\nnew\nbottom\n"
+
+
+def test_missing_note_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        insert_into_note(str(tmp_path / "missing.md"), "x")
+
+
+def test_retries_when_note_changes_during_rewrite(tmp_path, monkeypatch):
+    note = tmp_path / "a.md"
+    write(note, "# A\na\n# B\nb\n")
+    real = note_writer._insertion_point
+    calls = []
+
+    def racing(text, heading, marker):
+        calls.append(text)
+        if len(calls) == 1:
+            # Someone else edits the note between our read and our write.
+            write(note, "# A\na\nconcurrent\n# B\nb\n")
+        return real(text, heading, marker)
+
+    monkeypatch.setattr(note_writer, "_insertion_point", racing)
+    insert_into_note(str(note), "mine", heading="A")
+    assert len(calls) == 2
+    assert read(note) == "# A\na\nconcurrent\nmine\n# B\nb\n"
+
+
+def test_gives_up_when_note_keeps_changing(tmp_path, monkeypatch):
+    note = tmp_path / "a.md"
+    write(note, "# A\na\n# B\nb\n")
+    real = note_writer._insertion_point
+    calls = []
+
+    def racing(text, heading, marker):
+        calls.append(text)
+        write(note, text + "x" * len(calls) + "\n")
+        return real(text, heading, marker)
+
+    monkeypatch.setattr(note_writer, "_insertion_point", racing)
+    with pytest.raises(NoteChangedError):
+        insert_into_note(str(note), "mine", heading="A")
+    assert len(calls) == note_writer.WRITE_RETRIES
+    assert "mine" not in read(note)
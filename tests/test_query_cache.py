@@ -0,0 +1,53 @@
+from tools.query_cache import QueryCache, normalize_query
+from tools.vault_embedder import VaultEmbedder
+
+
+def test_normalized_queries_share_an_entry():
+    assert normalize_query("  What did I   READ? ") == "what did i read"
+    cache = QueryCache()
+    cache.put(cache.key("What did I read?", 5), ["hit"])
+    assert cache.get(cache.key("what did i  read", 5)) == ["hit"]
+    assert cache.get(cache.key("what did i read", 3)) is None
+    assert cache.get(cache.key("what did i read", 5, {"file_path": "a.md"})) is None
+
+
+def test_generation_bump_invalidates_hits():
+    cache = QueryCache()
+    key = cache.key("q", 5)
+    cache.put(key, ["old"])
+    assert cache.get(key) == ["old"]
+    cache.bump()
+    assert cache.get(key) is None
+    assert cache.get(cache.key("q", 5)) is None
+    assert cache.stats()["generation"] == 1
+
+
+def test_results_of_a_search_that_raced_a_sync_are_not_cached():
+    cache = QueryCache()
+    key = cache.key("q", 5)
+    cache.bump()  # a sync finished while the search ran
+    cache.put(key, ["stale"])
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_bound():
+    cache = QueryCache(max_entries=2)
+    for q in ("a", "b"):
+        cache.put(cache.key(q, 1), [q])
+    cache.get(cache.key("a", 1))
+    cache.put(cache.key("c", 1), ["c"])
+    assert cache.get(cache.key("b", 1)) is None
+    assert cache.get(cache.key("a", 1)) == ["a"]
+
+
+def test_sync_invalidates_cached_knowledge_searches(tmp_path, embedder):
+    (tmp_path / "a.md").write_text("# A\nthe garden needs water\n", encoding="utf-8")
+    ve = VaultEmbedder(str(tmp_path), embedder=embedder, backend="numpy")
+    first = ve.query("garden water", top_k=3)
+    calls = embedder.calls
+    assert [d.id for d in ve.query("Garden  water?", top_k=3)] == [d.id for d in first]
+    assert ve.query_cache.hits == 1 and embedder.calls == calls
+
+    (tmp_path / "b.md").write_text("# B\nwater the garden daily\n", encoding="utf-8")
+    ve.sync()
+    assert {d.name for d in ve.query("garden water", top_k=3)} == {"a.md", "b.md"}
@@ -0,0 +1,131 @@
+import threading
+import time
+
+from tools.sessions import SessionManager
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Workflow:
+    def __init__(self, sender, session_id):
+        self.sender = sender
+        self.session_id = session_id
+        self.ended = False
+
+    def end_session(self):
+        self.ended = True
+
+
+def make_manager(**kwargs):
+    clock = Clock()
+    return SessionManager(Workflow, clock=clock, **kwargs), clock
+
+
+def test_idle_session_expires_after_ttl():
+    sessions, clock = make_manager(ttl=60)
+    first = sessions.get("alice")
+    clock.now += 30
+    assert sessions.get("alice") is first
+
+    clock.now += 61
+    second = sessions.get("alice")
+    assert second is not first
+    assert second.session_id != first.session_id
+    assert first.workflow.ended
+    assert sessions.stats()["expired"] == 1
+
+
+def test_sweep_ends_sessions_released_out_of_order():
+    sessions, clock = make_manager(ttl=60)
+    with sessions.use("alice"):
+        sessions.get("bob")
+        clock.now += 30
+    # alice was released after bob's last activity, so bob is now the oldest.
+    bob = sessions._sessions["bob"]
+    clock.now += 40
+    assert sessions.sweep() == 1
+    assert bob.workflow.ended
+    assert "alice" in sessions._sessions
+
+    clock.now += 30
+    assert sessions.sweep() == 1
+    assert len(sessions) == 0
+
+
+def test_least_recently_used_session_is_evicted():
+    sessions, clock = make_manager(max_sessions=2)
+    alice = sessions.get("alice")
+    clock.now += 1
+    bob = sessions.get("bob")
+    clock.now += 1
+    sessions.get("alice")
+    clock.now += 1
+    sessions.get("carol")
+
+    assert bob.workflow.ended
+    assert not alice.workflow.ended
+    assert set(sessions._sessions) == {"alice", "carol"}
+    assert sessions.stats()["evicted"] == 1
+
+
+def test_busy_sessions_are_never_evicted_or_expired():
+    sessions, clock = make_manager(ttl=60, max_sessions=1)
+    with sessions.use("alice") as alice:
+        clock.now += 1
+        bob = sessions.get("bob")
+        # alice is busy, so the manager goes over max_sessions rather than evict it.
+        assert len(sessions) == 2
+        assert not alice.workflow.ended
+
+        clock.now += 120
+        sessions.sweep()
+        assert not alice.workflow.ended
+        assert bob.workflow.ended
+
+        assert sessions.clear("alice")
+        assert not alice.workflow.ended
+    assert alice.workflow.ended
+
+
+def test_concurrent_first_messages_build_one_workflow():
+    built = []
+    gate = threading.Event()
+
+    def factory(sender, session_id):
+        built.append(session_id)
+        gate.wait(1)
+        return Workflow(sender, session_id)
+
+    sessions = SessionManager(factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(sessions.get("alice"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(built) == 1
+    assert len({id(session.workflow) for session in results}) == 1
+
+
+def test_start_sweeps_in_the_background():
+    sessions, clock = make_manager(ttl=60, sweep_interval=0.01)
+    alice = sessions.get("alice")
+    clock.now += 120
+    sessions.start()
+    try:
+        deadline = time.monotonic() + 5
+        while len(sessions) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        sessions.stop(timeout=5)
+    assert alice.workflow.ended
+    assert len(sessions) == 0
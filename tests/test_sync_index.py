@@ -0,0 +1,128 @@
+import json
+import os
+
+import pytest
+
+from tools.sync_index import SyncIndex
+from tools.vault_embedder import INDEX_FILENAME, VaultEmbedder
+
+
+def write(vault, rel, text):
+    path = vault / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def index(tmp_path):
+    return SyncIndex(str(tmp_path / "index" / "sync_index.db"))
+
+
+def test_aborted_transaction_rolls_back_files_and_chunks(index):
+    index.put_file("a.md", "h1", 1, 2, 3)
+    index.put_chunks("a.md", {"c1": [0, 5, "A"]})
+    with pytest.raises(RuntimeError):
+        with index.transaction():
+            index.remove_chunks(["c1"])
+            index.put_file("a.md", None)
+            index.put_file("b.md", "h2")
+            index.put_chunks("b.md", {"c2": [0, 1, ""]})
+            raise RuntimeError("crash mid-batch")
+    assert index.paths() == {"a.md"}
+    assert index.get("a.md") == {"hash": "h1", "mtime_ns": 1, "size": 2, "ino": 3, "chunks": {"c1": [0, 5, "A"]}}
+    assert index.chunk_ids() == {"c1"}
+    # The connection is usable again after the rollback.
+    with index.transaction():
+        index.put_file("b.md", "h2")
+    assert "b.md" in index
+
+
+def test_import_json_handles_chunked_and_whole_note_entries(index, tmp_path):
+    legacy = tmp_path / INDEX_FILENAME
+    legacy.write_text(json.dumps({
+        "old.md": "hash-old",
+        "chunked.md": {"hash": "h", "mtime_ns": 5, "size": 6, "ino": 7, "chunks": {"x": [0, 3, "T"]}},
+    }), encoding="utf-8")
+    assert index.import_json(str(legacy)) == 2
+    # A whole-note vector keeps its id, and no signature so the next sync re-reads the note.
+    assert index.get("old.md") == {"hash": "hash-old", "mtime_ns": None, "size": None, "ino": None,
+                                   "chunks": {"hash-old": [0, 0, ""]}}
+    assert index.get("chunked.md")["chunks"] == {"x": [0, 3, "T"]}
+    assert index.synced_count() == 1
+
+
+def test_legacy_json_index_is_migrated_once(tmp_path, embedder):
+    write(tmp_path, "a.md", "# A\nalpha\n")
+    store = tmp_path / ".assistant" / "vectors"
+    store.mkdir(parents=True)
+    (store / INDEX_FILENAME).write_text(json.dumps({"a.md": "legacy-hash"}), encoding="utf-8")
+
+    ve = VaultEmbedder(str(tmp_path), embedder=embedder, backend="numpy", initial_sync=False)
+    assert ve.index.get("a.md")["chunks"] == {"legacy-hash": [0, 0, ""]}
+    assert not (store / INDEX_FILENAME).exists()
+    assert (store / (INDEX_FILENAME + ".migrated")).exists()
+
+    # A stale JSON file showing up again is not imported over the live index.
+    (store / INDEX_FILENAME).write_text(json.dumps({"b.md": "other"}), encoding="utf-8")
+    again = VaultEmbedder(str(tmp_path), embedder=embedder, backend="numpy", initial_sync=False)
+    assert again.index.paths() == {"a.md"}
+    assert (store / INDEX_FILENAME).exists()
+
+
+@pytest.fixture
+def ve(tmp_path, embedder):
+    write(tmp_path, "a.md", "# A\nalpha\n# A2\nmore alpha\n")
+    write(tmp_path, "b.md", "# B\nbeta\n")
+    return VaultEmbedder(str(tmp_path), embedder=embedder, backend="numpy", batch_size=1, max_workers=1)
+
+
+def test_failed_batch_commit_rolls_back_and_is_redone(ve, tmp_path, monkeypatch):
+    write(tmp_path, "a.md", "# A\nalpha, edited\n# A2\nmore alpha, edited\n")
+    real_put_file = ve.index.put_file
+
+    def crash_on_complete(path, hash, mtime_ns=None, **kwargs):
+        if path == "a.md" and mtime_ns is not None:
+            raise RuntimeError("crash while completing a.md")
+        return real_put_file(path, hash, mtime_ns, **kwargs)
+
+    monkeypatch.setattr(ve.index, "put_file", crash_on_complete)
+    ve.sync()
+    entry = ve.index.get("a.md")
+    # The batch that would have completed the note rolled back: no signature, and its chunk row is gone.
+    assert entry["mtime_ns"] is None
+    assert len(entry["chunks"]) == 1
+    assert ve.index.get("b.md")["mtime_ns"] is not None
+
+    monkeypatch.setattr(ve.index, "put_file", real_put_file)
+    ve.sync()
+    entry = ve.index.get("a.md")
+    assert entry["mtime_ns"] is not None and len(entry["chunks"]) == 2
+    assert set(ve.rows.all_ids()) == ve.index.chunk_ids()
+
+
+def test_reconcile_drops_orphans_and_redoes_missing_vectors(ve):
+    a_chunks = set(ve.index.get("a.md")["chunks"])
+    lost = sorted(a_chunks)[0]
+    row = ve.rows.get_rows([lost])[0]
+    ve.rows.add_rows([{**row, "id": "orphan"}])
+    ve.rows.delete_ids([lost])
+
+    report = ve.reconcile()
+    assert report == {"orphaned_vectors": 1, "duplicated_vectors": 0, "missing_vectors": 1}
+    assert "orphan" not in ve.rows.all_ids()
+    assert lost not in ve.index.chunk_ids()
+    assert ve.index.get("a.md")["mtime_ns"] is None
+
+    ve.sync()
+    assert set(ve.index.get("a.md")["chunks"]) == a_chunks
+    assert set(ve.rows.all_ids()) == ve.index.chunk_ids()
+    assert ve.reconcile() == {"orphaned_vectors": 0, "duplicated_vectors": 0, "missing_vectors": 0}
+
+
+def test_interrupted_sync_is_reconciled_on_start(ve, tmp_path, embedder):
+    ve.rows.add_rows([{**ve.rows.get_rows(ve.rows.all_ids()[:1])[0], "id": "orphan"}])
+    ve.index.set_meta("sync_in_progress", "1")
+    again = VaultEmbedder(str(tmp_path), embedder=embedder, backend="numpy")
+    assert "orphan" not in again.rows.all_ids()
+    assert again.index.get_meta("sync_in_progress") is None
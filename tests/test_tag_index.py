@@ -0,0 +1,89 @@
+import json
+import os
+
+import pytest
+
+from tools.note_writer import insert_into_note
+from tools.tag_index import TagIndex, extract_tags
+
+
+def write(vault, rel, text):
+    path = vault / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def vault(tmp_path):
+    write(tmp_path, "a.md", "Ran 5k #sport/running and #Health\n")
+    write(tmp_path, "b.md", "Swim #sport/swimming/pool\n")
+    write(tmp_path, "c.md", "Match #sport\n")
+    write(tmp_path, "d.md", "No tags, just an &#35; entity\n")
+    return tmp_path
+
+
+@pytest.fixture
+def index(vault):
+    index = TagIndex(str(vault))
+    index.refresh()
+    return index
+
+
+def test_extract_tags_keeps_first_spelling_and_skips_entities():
+    assert extract_tags("#Work then #work/meeting and #work/ x&#35; #1st") == ["#Work", "#work/meeting", "#1st"]
+
+
+def test_nested_tag_lookup(index):
+    assert index.notes_with_tag("sport") == ["a.md", "b.md", "c.md"]
+    assert index.notes_with_tag("#sport/swimming") == ["b.md"]
+    assert index.notes_with_tag("SPORT/RUNNING") == ["a.md"]
+    assert index.notes_with_tag("spo") == []
+    assert index.tag_counts()["#Health"] == 1
+
+
+def test_add_rename_and_delete_invalidate_lookups(index, vault):
+    write(vault, "e.md", "Climb #sport/climbing\n")
+    index.apply_changes({"e.md"})
+    assert index.notes_with_tag("sport") == ["a.md", "b.md", "c.md", "e.md"]
+
+    os.rename(vault / "b.md", vault / "renamed.md")
+    index.apply_changes({"b.md", "renamed.md"})
+    assert index.notes_with_tag("sport/swimming") == ["renamed.md"]
+
+    os.remove(vault / "renamed.md")
+    index.apply_changes({"renamed.md"})
+    assert index.notes_with_tag("sport/swimming") == []
+    assert "#sport/swimming/pool" not in {t.lower() for t in index.tags()}
+    # The last nested tag under an ancestor leaves its descendants map too.
+    assert "#sport/swimming" not in index._descendants
+
+    write(vault, "a.md", "Ran 5k, no tags today\n")
+    index.update_file("a.md")
+    assert index.notes_with_tag("sport") == ["c.md", "e.md"]
+    assert index.notes_with_tag("health") == []
+
+
+def test_apply_edit_adds_tags_without_rereading(index, vault, monkeypatch):
+    edit = insert_into_note(str(vault / "d.md"), "Yoga #sport/yoga")
+    monkeypatch.setattr(index, "_parse_note", lambda *args: pytest.fail("note was re-read"))
+    index.apply_edit(edit)
+    assert index.notes_with_tag("sport/yoga") == ["d.md"]
+    assert index.tags_for_note("d.md") == ["#sport/yoga"]
+
+
+def test_index_is_saved_once_per_batch_and_reloaded(index, vault, monkeypatch):
+    saves = []
+    real_replace = os.replace
+    monkeypatch.setattr(os, "replace", lambda src, dst: (saves.append(dst), real_replace(src, dst)))
+    for i in range(3):
+        write(vault, f"n{i}.md", f"#batch/{i}\n")
+    index.apply_changes({f"n{i}.md" for i in range(3)})
+    assert saves == [index.index_path]
+    index.apply_changes({"n0.md"})  # unchanged: nothing to save
+    assert saves == [index.index_path]
+
+    with open(index.index_path, encoding="utf-8") as f:
+        assert json.load(f)["notes"]["n1.md"]["tags"] == ["#batch/1"]
+    reloaded = TagIndex(str(vault))
+    assert reloaded.notes_with_tag("batch") == ["n0.md", "n1.md", "n2.md"]
@@ -0,0 +1,51 @@
+from tools.tag_suggester import TagSuggester
+
+NOTE = """went to the gym for a workout #health
+morning workout at the gym #health
+gym session with weights #health
+called mom about dinner plans
+called mom about the weekend
+dinner plans with friends
+coffee with friends #social
+coffee and a walk
+coffee meeting downtown #social
+coffee alone at home
+"""
+
+
+def make_suggester(tmp_path):
+    (tmp_path / "journal.md").write_text(NOTE, encoding="utf-8")
+    return TagSuggester(str(tmp_path))
+
+
+def test_strong_evidence_accepts_the_tag(tmp_path):
+    suggestion = make_suggester(tmp_path).suggest("a long gym workout")
+    assert suggestion.confident
+    assert suggestion.lines[0].tags == ["#health"]
+    assert suggestion.text == "a long gym workout #health"
+
+
+def test_known_words_without_tags_reject_confidently(tmp_path):
+    suggestion = make_suggester(tmp_path).suggest("called mom about dinner")
+    assert suggestion.confident
+    assert suggestion.lines[0].tags == []
+    assert suggestion.text == "called mom about dinner"
+
+
+def test_middling_evidence_is_undecided(tmp_path):
+    # "coffee" lines are tagged #social half the time.
+    suggestion = make_suggester(tmp_path).suggest("coffee downtown")
+    assert not suggestion.confident
+    assert suggestion.lines[0].tags == []
+    assert 0.2 <= suggestion.lines[0].scores["#social"] < 0.55
+
+
+def test_unknown_words_are_undecided(tmp_path):
+    assert not make_suggester(tmp_path).suggest("quantum zebra xylophone").confident
+
+
+def test_one_undecided_line_makes_the_message_unconfident(tmp_path):
+    suggestion = make_suggester(tmp_path).suggest("gym workout\nalready #health tagged\ncoffee downtown")
+    assert [line.confident for line in suggestion.lines] == [True, True, False]
+    assert not suggestion.confident
+    assert suggestion.text.splitlines()[1] == "already #health tagged"
@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import logging
+
+import pytest
+
+from tools import telemetry
+from tools.telemetry import LogSink, Tracer, in_current_context
+
+
+class Collect:
+    def __init__(self):
+        self.roots = []
+
+    def emit(self, root):
+        self.roots.append(root)
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer(slow_seconds=60)
+    tracer.sink = tracer.add_sink(Collect())
+    return tracer
+
+
+def test_spans_on_pool_threads_nest_under_the_caller(tracer):
+    def work(i):
+        with tracer.span("embed", batch=i):
+            with tracer.span("embed.request"):
+                pass
+        return i
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with tracer.span("dispatcher.message"):
+            with tracer.span("agent.run"):
+                futures = [pool.submit(in_current_context(work), i) for i in range(3)]
+                assert [f.result() for f in futures] == [0, 1, 2]
+        # Without the context copy, a pool span is a trace of its own.
+        pool.submit(work, 9).result()
+
+    message, orphan = tracer.sink.roots
+    assert message.name == "dispatcher.message"
+    (agent,) = message.children
+    assert agent.name == "agent.run"
+    assert sorted(child.attrs["batch"] for child in agent.children) == [0, 1, 2]
+    assert all([c.name for c in child.children] == ["embed.request"] for child in agent.children)
+    assert orphan.name == "embed" and orphan.attrs == {"batch": 9}
+    assert set(message.stages()) == {"agent.run", "embed", "embed.request"}
+
+
+def test_errors_are_recorded_and_reraised(tracer):
+    with pytest.raises(ValueError):
+        with tracer.span("outer"):
+            with tracer.span("inner"):
+                raise ValueError("boom")
+    (root,) = tracer.sink.roots
+    assert root.error == "ValueError: boom"
+    assert root.children[0].error == "ValueError: boom"
+    assert tracer.metrics.snapshot()["inner"] == {"count": 1, "errors": 1, "avg_ms": pytest.approx(0.0, abs=50)}
+
+
+def test_prometheus_rendering(tracer):
+    for _ in range(2):
+        with tracer.span('tool."quoted"'):
+            pass
+    with pytest.raises(RuntimeError):
+        with tracer.span("git.push"):
+            raise RuntimeError("offline")
+
+    text = tracer.metrics.render_prometheus()
+    lines = text.splitlines()
+    assert "# TYPE obsidian_assistant_stage_duration_seconds histogram" in lines
+    assert "# TYPE obsidian_assistant_stage_errors_total counter" in lines
+    assert 'obsidian_assistant_stage_duration_seconds_bucket{stage="git.push",le="+Inf"} 1' in lines
+    assert 'obsidian_assistant_stage_duration_seconds_count{stage="tool.\\"quoted\\""} 2' in lines
+    assert 'obsidian_assistant_stage_errors_total{stage="git.push"} 1' in lines
+    assert 'obsidian_assistant_stage_errors_total{stage="tool.\\"quoted\\""} 0' in lines
+    # Buckets are cumulative and end at the total count.
+    buckets = [int(line.rsplit(" ", 1)[1]) for line in lines if line.startswith(
+        'obsidian_assistant_stage_duration_seconds_bucket{stage="tool.')]
+    assert buckets == sorted(buckets) and buckets[-1] == 2
+    assert text.endswith("\n")
+
+
+def test_log_sink_writes_one_line_per_message():
+    tracer = Tracer(slow_seconds=60)
+    tracer.add_sink(LogSink())
+    records = []
+
+    class Capture(logging.Handler):
+        def emit(self, record):
+            records.append(record.getMessage())
+
+    capture = Capture()
+    telemetry.logger.addHandler(capture)
+    try:
+        with tracer.span("dispatcher.message", queue_wait_ms=3):
+            with tracer.span("agent.run"):
+                pass
+        with tracer.span("git.sync"):
+            pass
+    finally:
+        telemetry.logger.removeHandler(capture)
+
+    assert len(records) == 1
+    assert '"trace": "dispatcher.message"' in records[0]
+    assert '"agent.run"' in records[0] and '"queue_wait_ms": 3' in records[0]
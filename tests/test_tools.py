@@ -0,0 +1,50 @@
+import importlib
+
+import pytest
+
+
+@pytest.fixture
+def note_utils(tmp_path, monkeypatch):
+    # tools.tools reads VAULT_PATH when it is imported.
+    monkeypatch.setenv("VAULT_PATH", str(tmp_path))
+    tools = importlib.import_module("tools.tools")
+    monkeypatch.setattr(tools.note_utils, "vault_path", str(tmp_path))
+    return tools.note_utils
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8", newline="")
+
+
+def read(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def test_append_goes_below_the_default_marker(tmp_path, note_utils):
+    note = tmp_path / "inbox.md"
+    write(note, "# Inbox\n<!-- AI -->\nolder\n")
+    note_utils.append_to_note("inbox.md", "new")
+    assert read(note) == "# Inbox\n<!-- AI -->\nnew\nolder\n"
+
+
+def test_heading_wins_over_the_default_marker(tmp_path, note_utils):
+    note = tmp_path / "inbox.md"
+    write(note, "# Inbox\n<!-- AI -->\n\n## Tasks\n- one\n")
+    note_utils.append_to_note("inbox.md", "- two", heading="Tasks")
+    assert read(note) == "# Inbox\n<!-- AI -->\n\n## Tasks\n- one\n- two\n"
+
+    # A missing heading is started at the end rather than falling back to the marker.
+    note_utils.append_to_note("inbox.md", "idea", heading="Ideas")
+    assert read(note) == "# Inbox\n<!-- AI -->\n\n## Tasks\n- one\n- two\n\n## Ideas\nidea\n"
+
+
+def test_explicit_marker_is_the_fallback_for_a_missing_heading(tmp_path, note_utils):
+    note = tmp_path / "inbox.md"
+    write(note, "# Inbox\n<!-- inbox -->\nolder\n")
+    note_utils.append_to_note("inbox.md", "new", marker="<!-- inbox -->", heading="Ideas")
+    assert read(note) == "# Inbox\n<!-- inbox -->\nnew\nolder\n"
+
+
+def test_missing_note(note_utils):
+    assert note_utils.append_to_note("nope.md", "x") == "Note 'nope.md' not found."
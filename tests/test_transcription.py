@@ -0,0 +1,63 @@
+import threading
+import time
+
+from tools.transcription import TranscriptionService
+
+
+class FakeModel:
+    """Stands in for a Whisper model; records how many transcribe() calls overlap."""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def transcribe(self, audio, fp16=False):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return {"text": f" {audio} "}
+
+
+def test_workers_decode_in_parallel_but_share_the_model_one_at_a_time(monkeypatch):
+    service = TranscriptionService(workers=4, warmup=False)
+    model = FakeModel()
+    decoding = []
+    monkeypatch.setattr(service, "_load_model", lambda: (setattr(service, "model", model), service._ready.set()))
+
+    def load_audio(path):
+        decoding.append(path)
+        time.sleep(0.02)
+        return path.upper()
+
+    monkeypatch.setattr(service, "_load_audio", load_audio)
+    service.start()
+    results, done = [], threading.Event()
+
+    def on_done(text):
+        results.append(text)
+        if len(results) == 8:
+            done.set()
+
+    for i in range(8):
+        assert service.submit(f"v{i}.ogg", on_done)
+    assert done.wait(5)
+    service.stop(timeout=5)
+    assert sorted(results) == sorted(f"V{i}.OGG" for i in range(8))
+    assert model.max_active == 1
+    assert service.stats()["processed"] == 8
+
+
+def test_jobs_fail_cleanly_without_a_model(monkeypatch):
+    service = TranscriptionService(workers=1, warmup=False)
+    monkeypatch.setattr(service, "_load_model", lambda: (setattr(service, "load_error", OSError("no model")),
+                                                         service._ready.set()))
+    service.start()
+    errors = []
+    service.submit("v.ogg", lambda text: None, errors.append)
+    service._queue.join()
+    service.stop(timeout=5)
+    assert isinstance(errors[0], RuntimeError) and "no model" in str(errors[0])
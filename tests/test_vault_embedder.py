@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from tools.vault_embedder import VaultEmbedder
+
+
+def write(vault, rel, text):
+    path = vault / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def vault(tmp_path):
+    write(tmp_path, "a.md", "# A\nalpha\n")
+    write(tmp_path, "b.md", "# B\nbeta\n")
+    write(tmp_path, "sub/c.md", "# C\ngamma\n")
+    return tmp_path
+
+
+@pytest.fixture
+def ve(vault, embedder):
+    return VaultEmbedder(str(vault), embedder=embedder, backend="numpy")
+
+
+def test_stat_fast_path_skips_unchanged_notes(ve, vault, monkeypatch):
+    assert ve.index.synced_count() == 3
+    reads = []
+    real_open = open
+    monkeypatch.setattr("builtins.open", lambda path, *a, **k: (reads.append(str(path)), real_open(path, *a, **k))[1])
+    assert ve._get_modified_documents() == ([], [])
+    assert not [p for p in reads if p.endswith(".md")]
+
+
+def test_touched_but_unchanged_note_is_not_reembedded(ve, vault, embedder):
+    calls = embedder.calls
+    stat = os.stat(vault / "a.md")
+    os.utime(vault / "a.md", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    notes, deleted = ve._get_modified_documents()
+    assert (notes, deleted) == ([], [])
+    # The new signature is remembered, so the next pass doesn't even read it.
+    assert ve.index.get("a.md")["mtime_ns"] == stat.st_mtime_ns + 10**9
+    assert ve._stat_changes() == ({}, [])
+    assert embedder.calls == calls
+
+
+def test_edited_and_deleted_notes(ve, vault):
+    write(vault, "b.md", "# B\nbeta, edited\n")
+    os.remove(vault / "sub/c.md")
+    notes, deleted = ve._get_modified_documents()
+    assert [rel for rel, _, _ in notes] == ["b.md"]
+    assert deleted == [os.path.join("sub", "c.md")]
+
+    ve.sync()
+    assert ve.index.paths() == {"a.md", "b.md"}
+    assert {row["payload"]["name"] for row in ve.rows.get_rows(ve.rows.all_ids(), vectors=False)} == {"a.md", "b.md"}
+
+
+def test_paths_limit_the_check(ve, vault):
+    write(vault, "a.md", "# A\nchanged\n")
+    write(vault, "b.md", "# B\nchanged too\n")
+    changed, deleted = ve._stat_changes(["a.md", "missing.md", ".assistant/x.md"])
+    assert list(changed) == ["a.md"] and deleted == []
+
+
+def test_editing_one_section_reembeds_only_its_chunk(ve, vault, embedder):
+    write(vault, "long.md", "# One\nfirst section\n# Two\nsecond section\n")
+    ve.sync()
+    ids = set(ve.index.get("long.md")["chunks"])
+    calls = embedder.calls
+
+    write(vault, "long.md", "# One\nfirst section\n# Two\nsecond section, edited\n")
+    ve.sync()
+    new_ids = set(ve.index.get("long.md")["chunks"])
+    assert embedder.calls == calls + 1
+    assert len(ids & new_ids) == 1 and len(new_ids) == 2
+    assert set(ve.rows.all_ids()) >= new_ids and not (ids - new_ids) & set(ve.rows.all_ids())
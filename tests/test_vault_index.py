@@ -0,0 +1,112 @@
+import os
+import time
+
+import pytest
+
+from tools.note_writer import insert_into_note
+from tools.vault_index import VaultIndex
+
+
+def write(vault, rel, text, age_days=0):
+    path = vault / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    if age_days:
+        stamp = time.time() - age_days * 86400
+        os.utime(path, (stamp, stamp))
+    return path
+
+
+@pytest.fixture
+def vault(tmp_path):
+    write(tmp_path, "daily/2024-01-01.md", "Went running with Dana.\nFeeling great!\n")
+    write(tmp_path, "projects/garden.md", "Plant tomatoes and basil in spring.\n")
+    write(tmp_path, "ideas.md", "A running list of ideas.\n")
+    write(tmp_path, ".assistant/skip.md", "running\n")
+    return tmp_path
+
+
+@pytest.fixture
+def index(vault):
+    index = VaultIndex(str(vault))
+    index.build()
+    return index
+
+
+def test_token_substring_and_phrase_search(index):
+    assert index.search_content("running") == ["daily/2024-01-01.md", "ideas.md"]
+    # Substrings of indexed words go through the trigram table.
+    assert index.search_content("toma") == ["projects/garden.md"]
+    assert index.search_content("un") == ["daily/2024-01-01.md", "ideas.md"]
+    # Phrases are confirmed against the note text, not just the word postings.
+    assert index.search_content("running with") == ["daily/2024-01-01.md"]
+    assert index.search_content("with running") == []
+    assert index.search_content("great!") == ["daily/2024-01-01.md"]
+    assert index.search_content("missing") == []
+
+
+def test_ignored_folders_are_not_indexed(index):
+    assert ".assistant/skip.md" not in index.search("skip")
+
+
+def test_name_search(index):
+    assert index.search_names("GARD") == ["projects/garden.md"]
+    assert index.search("garden") == ["projects/garden.md"]
+
+
+def test_update_file_reindexes_one_note(index, vault):
+    write(vault, "projects/garden.md", "Plant peppers.\n")
+    write(vault, "new.md", "tomatoes again\n")
+    index.update_file("projects/garden.md")
+    index.update_file(str(vault / "new.md"))
+    assert index.search_content("tomatoes") == ["new.md"]
+    assert index.search_content("peppers") == ["projects/garden.md"]
+    # Words that left the vault leave the vocabulary and its trigrams too.
+    assert "basil" not in index._postings
+    assert not any("basil" in tokens for tokens in index._vocab_grams.values())
+
+
+def test_update_file_drops_deleted_notes(index, vault):
+    os.remove(vault / "ideas.md")
+    index.update_file("ideas.md")
+    assert index.search("running") == ["daily/2024-01-01.md"]
+    assert index.search_names("ideas") == []
+    changes = index.changes_since(None)
+    assert "ideas.md" not in changes.changed
+
+
+def test_apply_edit_adds_inserted_words_without_rereading(index, vault, monkeypatch):
+    edit = insert_into_note(str(vault / "ideas.md"), "Learn pottery")
+    monkeypatch.setattr(index, "_index_file", lambda *args, **kwargs: pytest.fail("note was re-read"))
+    index.apply_edit(edit)
+    assert index.search_content("pottery") == ["ideas.md"]
+    assert index.search_content("running") == ["daily/2024-01-01.md", "ideas.md"]
+    assert index._stats["ideas.md"][:2] == (edit.mtime_ns, edit.size)
+    assert index.recent(1) == [("ideas.md", edit.mtime_ns)]
+
+
+def test_refresh_picks_up_changes_by_stat_signature(index, vault):
+    write(vault, "late.md", "running late\n")
+    os.remove(vault / "projects/garden.md")
+    index.refresh(force=True)
+    assert index.search_content("running") == ["daily/2024-01-01.md", "ideas.md", "late.md"]
+    assert index.search_content("tomatoes") == []
+
+
+def test_search_ranked_orders_name_then_rare_words_then_recency(tmp_path):
+    write(tmp_path, "habit tracker.md", "nothing relevant\n", age_days=300)
+    write(tmp_path, "old.md", "habit streak\n", age_days=200)
+    write(tmp_path, "recent.md", "habit streak\n")
+    write(tmp_path, "common.md", "habit\n")
+    for i in range(5):
+        write(tmp_path, f"filler{i}.md", "habit\n", age_days=400)
+    index = VaultIndex(str(tmp_path))
+    index.build()
+
+    ranked = [path for path, _ in index.search_ranked("habit")]
+    assert ranked[0] == "habit tracker.md"
+    assert ranked.index("common.md") < ranked.index("filler0.md")
+
+    ranked = index.search_ranked("streak")
+    assert [path for path, _ in ranked] == ["recent.md", "old.md"]
+    assert ranked[0][1] > ranked[1][1]
@@ -0,0 +1,58 @@
+from tools.vault_overview import VaultOverview
+
+
+class Summarizer:
+    def __init__(self):
+        self.titles = []
+
+    def __call__(self, title, markdown):
+        self.titles.append(title)
+        return f"Summary of {title}"
+
+
+def make_vault(tmp_path):
+    (tmp_path / "projects").mkdir()
+    (tmp_path / "projects" / "plan.md").write_text("# Plan\n#work\n", encoding="utf-8")
+    (tmp_path / "index.md").write_text("# Index\n", encoding="utf-8")
+    return tmp_path
+
+
+def test_summarize_only_reruns_changed_sections(tmp_path):
+    vault = make_vault(tmp_path)
+    overview = VaultOverview(str(vault))
+    summarizer = Summarizer()
+    assert sorted(overview.summarize(summarizer)) == ["mocs", "recent", "tags", "tree"]
+
+    summarizer.titles.clear()
+    assert overview.summarize(summarizer) == []
+    assert summarizer.titles == []
+
+    # Linking to many notes turns the index into a MOC; folders, tags and activity stay the same.
+    links = "\n".join(f"- [[note {i}]]" for i in range(12))
+    (vault / "index.md").write_text(f"# Index\n{links}\n", encoding="utf-8")
+    overview.update_file("index.md")
+    assert overview.summarize(summarizer) == ["mocs"]
+    assert summarizer.titles == ["Maps of content"]
+    assert "Summary of Maps of content" in overview.render()
+
+
+def test_summaries_persist_across_instances(tmp_path):
+    vault = make_vault(tmp_path)
+    VaultOverview(str(vault)).summarize(Summarizer())
+
+    summarizer = Summarizer()
+    assert VaultOverview(str(vault)).summarize(summarizer) == []
+    assert summarizer.titles == []
+
+
+def test_failed_section_is_retried_next_time(tmp_path):
+    vault = make_vault(tmp_path)
+    overview = VaultOverview(str(vault))
+
+    def flaky(title, markdown):
+        if title == "Top tags":
+            raise RuntimeError("rate limited")
+        return "ok"
+
+    assert "tags" not in overview.summarize(flaky)
+    assert overview.summarize(Summarizer()) == ["tags"]
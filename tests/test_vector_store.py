@@ -0,0 +1,101 @@
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import pytest
+
+from agno.embedder.base import Embedder
+from tools.vector_store import NumpyVectorDb
+
+DIMENSIONS = 32
+
+
+@dataclass
+class HashEmbedder(Embedder):
+    """Bag of hashed words; deterministic and offline."""
+    dimensions: int = DIMENSIONS
+
+    def get_embedding(self, text):
+        vector = np.full(DIMENSIONS, 0.01)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % DIMENSIONS] += 1
+        return vector.tolist()
+
+    def get_embedding_and_usage(self, text):
+        return self.get_embedding(text), None
+
+
+def rows(texts, prefix="doc"):
+    embedder = HashEmbedder()
+    return [{"id": f"{prefix}{i}", "vector": embedder.get_embedding(text),
+             "payload": {"name": f"{prefix}{i}", "meta_data": {"i": i}, "content": text}}
+            for i, text in enumerate(texts)]
+
+
+TEXTS = ["deep work habit", "sleep schedule", "morning run in the park", "reading a book", "cooking pasta"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    db = NumpyVectorDb(str(tmp_path / "vectors"), embedder=HashEmbedder())
+    db.create()
+    db.add_rows(rows(TEXTS))
+    return db
+
+
+def reopen(db):
+    return NumpyVectorDb(db.path, embedder=HashEmbedder())
+
+
+def test_add_search_and_reopen(store):
+    assert store.get_count() == len(TEXTS)
+    assert store.search("park run", limit=1)[0].content == "morning run in the park"
+    again = reopen(store)
+    assert sorted(again.all_ids()) == sorted(store.all_ids())
+    assert again.search("pasta", limit=1)[0].name == "doc4"
+    assert again.get_rows(["doc1"])[0]["payload"]["content"] == "sleep schedule"
+
+
+def test_replace_and_delete_leave_dead_rows(store):
+    store.add_rows([{**rows(["sleep schedule and naps"])[0], "id": "doc1"}])
+    store.delete_ids(["doc3", "missing"])
+    stats = store.stats()
+    assert (stats["rows"], stats["live"], stats["dead"]) == (6, 4, 2)
+    assert not store.id_exists("doc3")
+    assert store.get_rows(["doc1"])[0]["payload"]["content"] == "sleep schedule and naps"
+    again = reopen(store)
+    assert again.stats()["dead"] == 2
+    assert sorted(again.all_ids()) == ["doc0", "doc1", "doc2", "doc4"]
+
+
+def test_writes_never_compact_on_their_own(store):
+    for _ in range(3):
+        store.add_rows(rows(TEXTS))
+    assert store.stats()["generation"] == 0
+    assert store.stats()["dead"] == 3 * len(TEXTS)
+
+
+def test_compact_keeps_live_rows_and_search_results(store):
+    store.delete_ids(["doc0", "doc2"])
+    before = [(d.id, round(d.reranking_score or 0, 3)) for d in store.search("book sleep", limit=3)]
+    vectors = {row["id"]: row["vector"] for row in store.get_rows(store.all_ids())}
+    store.compact()
+    stats = store.stats()
+    assert (stats["rows"], stats["live"], stats["dead"], stats["generation"]) == (3, 3, 0, 1)
+    after = [(d.id, round(d.reranking_score or 0, 3)) for d in store.search("book sleep", limit=3)]
+    assert after == before
+    again = reopen(store)
+    assert {row["id"]: row["vector"] for row in again.get_rows(again.all_ids())} == vectors
+    # Only the new generation's files are left.
+    assert sorted(n for n in os.listdir(store.path) if n != "meta.json") == ["rows.1.jsonl", "vectors.1.f16"]
+
+
+def test_filters_and_prefilter_fallback(tmp_path):
+    db = NumpyVectorDb(str(tmp_path / "vectors"), embedder=HashEmbedder(), keyword_prefilter=True)
+    db.create()
+    db.add_rows(rows(TEXTS))
+    assert [d.id for d in db.search("park", limit=5, filters={"i": 3})] == ["doc3"]
+    # No row shares a word with the query: falls back to scoring every row.
+    assert len(db.search("zzz", limit=2)) == 2